@@ -0,0 +1,216 @@
+'''
+Scaling benchmark of the iAuditor report generator.
+
+For every size, a synthetic export (see synthetic_export.py) is processed in a new Python process by the same
+function the GUI uses (create_iAuditor_report_from_db, or create_iAuditor_report_from_csv with --source csv).
+The time of every stage, taken from the progress updates of the pipeline, and the peak memory (RSS) of the
+process are reported. One JSON line per run of this script is appended to the results file, and every size is
+compared with the last run with the same options, so a change that makes a stage slower shows up.
+
+    python benchmarks/scaling.py
+    python benchmarks/scaling.py --sizes 1e3 1e4 1e5 1e6 1e7 --source csv --workers 0
+
+The synthetic exports are kept in --work-dir, so the next runs don't generate them again.
+'''
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+REPOSITORY_DIR = Path(__file__).resolve().parent.parent
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+DEFAULT_RESULTS_FILE = BENCHMARKS_DIR / 'scaling_results.jsonl'
+DEFAULT_WORK_DIR = Path(tempfile.gettempdir()) / 'iauditor_benchmark_exports'
+DEFAULT_SIZES = ['1e3', '1e4', '1e5']
+
+# progress of the output writers, that write the output files at the same time (see iauditor_report.outputs):
+# they are timed as one stage
+OUTPUT_WRITER_STAGES = ('Writing output files', 'Writing MS Excel file', 'Writing table ')
+
+
+def peak_memory_mb():
+    # Peak resident memory of this process
+    if sys.platform == 'win32':
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD), ('PeakWorkingSetSize', ctypes.c_size_t),
+                        ('WorkingSetSize', ctypes.c_size_t), ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPagedPoolUsage', ctypes.c_size_t), ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaNonPagedPoolUsage', ctypes.c_size_t), ('PagefileUsage', ctypes.c_size_t),
+                        ('PeakPagefileUsage', ctypes.c_size_t)]
+
+        counters = PROCESS_MEMORY_COUNTERS(cb=ctypes.sizeof(PROCESS_MEMORY_COUNTERS))
+        ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb)
+        return counters.PeakWorkingSetSize / (1024 * 1024)
+
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class StageTimer:
+    """
+    Progress callback that measures the time spent in every stage: a stage ends when the progress of
+    another one is reported. The output files are timed together, from the progress of all the output writers.
+    """
+    def __init__(self):
+        self.stages = {}
+        self.stage = 'start-up'
+        self.stage_start = time.perf_counter()
+
+    def __call__(self, stage, done=None, total=None):
+        if stage == 'Building output files' and done is not None:
+            stage = f'{stage}: split main table and KPIs' if done == 0 else None
+        elif stage.startswith(OUTPUT_WRITER_STAGES):  # progress of write_output_files, write_report_database and write_summary_workbook
+            stage = 'Writing output files'
+        if stage != self.stage:
+            self.finish()
+            self.stage = stage
+
+    def finish(self):
+        now = time.perf_counter()
+        if self.stage is not None:
+            timing = self.stages.setdefault(self.stage, {'seconds': 0.0})
+            timing['seconds'] += now - self.stage_start
+            timing['peak_memory_mb'] = peak_memory_mb()  # peak of the process so far
+        self.stage_start = now
+
+
+def run_one(input_file, source, workers, result_file):
+    # Process one export in this process and write the timings into result_file (JSON)
+    sys.path.insert(0, str(REPOSITORY_DIR))
+    from iauditor_report.progress import set_progress_callbacks
+    from iauditor_report.result_cache import set_result_cache
+
+    timer = StageTimer()
+    set_progress_callbacks(lambda text: None, lambda message, warning: None, timer)
+    set_result_cache(None)  # every run processes the file, not the results of the previous run
+    start = time.perf_counter()
+    from iauditor_report.report import create_iAuditor_report_from_csv, create_iAuditor_report_from_db
+    with tempfile.TemporaryDirectory() as output_dir:
+        output_file = os.path.join(output_dir, 'benchmark.csv')
+        if source == 'csv':
+            successful = create_iAuditor_report_from_csv(input_file, output_file, output_dir, None, workers)
+        else:
+            successful = create_iAuditor_report_from_db(input_file, output_file, workers=workers)
+        timer.finish()
+        seconds = time.perf_counter() - start
+    result = {'successful': bool(successful), 'seconds': seconds, 'peak_memory_mb': peak_memory_mb(), 'stages': timer.stages}
+    Path(result_file).write_text(json.dumps(result))
+
+
+def export_files(size, seed, work_dir):
+    # Synthetic export of size items (generated the first time): db file, csv file, number of items and reports
+    from synthetic_export import generate_export
+
+    work_dir.mkdir(parents=True, exist_ok=True)
+    db_file = work_dir / f'synthetic_{size}_{seed}.db'
+    csv_file = work_dir / f'synthetic_{size}_{seed}_inspection_items.csv'
+    info_file = work_dir / f'synthetic_{size}_{seed}.json'
+    if not (db_file.exists() and csv_file.exists() and info_file.exists()):
+        print(f'Generating a synthetic export of {size:,} items...', flush=True)
+        number_of_items, number_of_reports = generate_export(db_file, size, csv_file, seed)
+        info_file.write_text(json.dumps({'items': number_of_items, 'reports': number_of_reports}))
+    info = json.loads(info_file.read_text())
+    return db_file, csv_file, info['items'], info['reports']
+
+
+def previous_results(results_file, source, workers):
+    # size -> result of the last run with the same options in results_file
+    previous = {}
+    if Path(results_file).exists():
+        for line in Path(results_file).read_text().splitlines():
+            record = json.loads(line)
+            if record.get('source') == source and record.get('workers') == workers:
+                previous = {result['size']: result for result in record['results']}
+    return previous
+
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPOSITORY_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_result(result, previous_result):
+    def change(new, old):
+        return f' ({100 * (new - old) / old:+.0f}%)' if old else ''
+
+    old_stages = previous_result['stages'] if previous_result else {}
+    print(f"{result['items']:>12,} items {result['reports']:>9,} reports   total {result['seconds']:8.2f} s"
+          f"{change(result['seconds'], previous_result and previous_result['seconds'])}   "
+          f"{result['items'] / max(result['seconds'], 1e-9):>10,.0f} items/s   peak {result['peak_memory_mb']:,.0f} MB"
+          f"{change(result['peak_memory_mb'], previous_result and previous_result['peak_memory_mb'])}"
+          + ('' if result['successful'] else '   FAILED'))
+    for stage, timing in result['stages'].items():
+        old_seconds = old_stages.get(stage, {}).get('seconds')
+        print(f"{'':<14}{stage:<48} {timing['seconds']:8.2f} s{change(timing['seconds'], old_seconds)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Scaling benchmark of the iAuditor report generator on synthetic exports')
+    parser.add_argument('--sizes', nargs='+', default=DEFAULT_SIZES, help='numbers of inspection_items records (e.g. 1e3 1e5 1e7)')
+    parser.add_argument('--source', choices=['db', 'csv'], default='db', help="process the 'sqlite.db' file or the inspection_items csv file")
+    parser.add_argument('--workers', type=int, default=1, help='processes that wrangle the reports (0 = one per CPU core)')
+    parser.add_argument('--repeat', type=int, default=1, help='runs of each size, the fastest is reported')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic exports')
+    parser.add_argument('--work-dir', default=str(DEFAULT_WORK_DIR), help='directory of the synthetic exports')
+    parser.add_argument('--results-file', default=str(DEFAULT_RESULTS_FILE), help='JSON lines file the results are appended to')
+    parser.add_argument('--run-one', nargs=2, metavar=('INPUT_FILE', 'RESULT_FILE'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_one:
+        run_one(args.run_one[0], args.source, args.workers, args.run_one[1])
+        return 0
+
+    previous = previous_results(args.results_file, args.source, args.workers)
+    results = []
+    for size in sorted(int(float(size)) for size in args.sizes):
+        db_file, csv_file, number_of_items, number_of_reports = export_files(size, args.seed, Path(args.work_dir))
+        input_file = csv_file if args.source == 'csv' else db_file
+        runs = []
+        for _ in range(args.repeat):
+            with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as result_file:
+                pass
+            try:
+                # a new process per run, so the peak memory is the one of this size only
+                subprocess.run([sys.executable, __file__, '--source', args.source, '--workers', str(args.workers),
+                                '--run-one', str(input_file), result_file.name],
+                               cwd=REPOSITORY_DIR, check=True, stdout=subprocess.DEVNULL)
+                runs.append(json.loads(Path(result_file.name).read_text()))
+            finally:
+                os.unlink(result_file.name)
+        result = dict(min(runs, key=lambda run: run['seconds']), size=size, items=number_of_items, reports=number_of_reports)
+        print_result(result, previous.get(size))
+        results.append(result)
+
+    record = {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'commit': current_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'source': args.source,
+        'workers': args.workers,
+        'repeat': args.repeat,
+        'results': results,
+    }
+    with open(args.results_file, 'a') as results_file:
+        results_file.write(json.dumps(record) + '\n')
+    print(f'Results appended to {os.path.relpath(args.results_file)}')
+    return 0 if all(result['successful'] for result in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+'''
+Start-up time benchmark of the iAuditor report generator.
+
+Each target is run in a new Python process several times and the best and median wall times are
+reported. One JSON line per run of this script is appended to the results file, so the import cost can
+be followed over time (compare the lines of different commits).
+
+    python benchmarks/startup_time.py
+    python benchmarks/startup_time.py --repeat 10 --budget 1.0 --importtime
+
+The GUI target imports what "iAuditor_report_generator BUENO.py" imports before the window is shown
+(the window itself needs a display, so it is not created). The 'processing' target is the cost that
+is paid in the background (GUI) or when the first file is processed (command line).
+'''
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+REPOSITORY_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_RESULTS_FILE = Path(__file__).resolve().parent / 'startup_time_results.jsonl'
+
+# target name -> (python arguments, counts against the start-up budget)
+TARGETS = {
+    'gui': (['-c', 'import tkinter, tkinter.ttk, tkinter.scrolledtext, tkinter.filedialog; '
+                   'import iauditor_report.constants, iauditor_report.progress'], True),
+    'cli --help': (['-m', 'iauditor_report', '--help'], True),
+    'package': (['-c', 'import iauditor_report'], True),
+    'processing': (['-c', 'import iauditor_report.report, iauditor_report.incremental'], False),
+}
+HEAVY_MODULES = ['tkinter', 'pandas', 'numpy', 'matplotlib', 'seaborn', 'reportlab', 'PyPDF2', 'openpyxl', 'dateparser']
+
+
+def time_target(arguments, repeat):
+    # Wall time of a new python process running the target
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + arguments, cwd=REPOSITORY_DIR, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return {'best': min(times), 'median': statistics.median(times)}
+
+
+def import_time_report(arguments, top=10):
+    # Slowest top-level imports according to python -X importtime (cumulative microseconds)
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + arguments, cwd=REPOSITORY_DIR,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_time, cumulative, name = line[len('import time:'):].split('|')
+        if not name.startswith('  '):  # top-level imports only
+            imports.append((int(cumulative), name.strip()))
+    loaded = {name for cumulative, name in imports}
+    return {
+        'slowest_imports': [{'module': name, 'seconds': cumulative / 1e6} for cumulative, name in sorted(imports, reverse=True)[:top]],
+        'heavy_modules_loaded': [name for name in HEAVY_MODULES if name in loaded],
+    }
+
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPOSITORY_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Start-up time benchmark of the iAuditor report generator')
+    parser.add_argument('--repeat', type=int, default=5, help='number of runs of each target')
+    parser.add_argument('--budget', type=float, default=1.0, help='maximum median start-up time in seconds of the GUI and command line targets')
+    parser.add_argument('--importtime', action='store_true', help='also report the slowest imports of each target')
+    parser.add_argument('--results-file', default=str(DEFAULT_RESULTS_FILE), help='JSON lines file the results are appended to')
+    args = parser.parse_args(argv)
+
+    # Baseline: an empty python process
+    baseline = time_target(['-c', 'pass'], args.repeat)
+    print(f"{'python -c pass':<14} best {baseline['best']:.3f} s   median {baseline['median']:.3f} s")
+
+    results = {}
+    over_budget = []
+    for name, (arguments, in_budget) in TARGETS.items():
+        results[name] = time_target(arguments, args.repeat)
+        if args.importtime:
+            results[name].update(import_time_report(arguments))
+        if in_budget and results[name]['median'] > args.budget:
+            over_budget.append(name)
+        print(f"{name:<14} best {results[name]['best']:.3f} s   median {results[name]['median']:.3f} s"
+              + ('   OVER BUDGET' if name in over_budget else ''))
+        if args.importtime:
+            print(f"{'':<14} heavy modules loaded: {', '.join(results[name]['heavy_modules_loaded']) or 'none'}")
+
+    record = {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'commit': current_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'baseline': baseline,
+        'targets': results,
+    }
+    with open(args.results_file, 'a') as results_file:
+        results_file.write(json.dumps(record) + '\n')
+    print(f'Results appended to {os.path.relpath(args.results_file)}')
+
+    return 1 if over_budget else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,241 @@
+'''
+Synthetic iAuditor exports for the benchmarks.
+
+Writes a 'sqlite.db' file (tables inspection_items and inspections, with the schema of the real export) and,
+optionally, the csv file of the inspection_items table, with about the number of items asked for. The reports
+look like the real ones: sections and categories with the parent_ids chains, questions followed by
+"if response is |...|" smartfields and "Anomaly?" questions, numbered "Part Data n" and "Device n" groups,
+service dates in the layouts iAuditor writes, information and signature items that are filtered out, and
+two templates with different numbers of questions. The same arguments always give the same export.
+
+    python benchmarks/synthetic_export.py 100000 synthetic.db
+    python benchmarks/synthetic_export.py 1e6 synthetic.db --csv synthetic_inspection_items.csv
+'''
+
+import argparse
+import csv
+import random
+import sqlite3
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+REPOSITORY_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPOSITORY_DIR))
+
+from iauditor_report.constants import DEVICE_FIELDS, PART_DATA_FIELDS
+
+INSPECTION_ITEMS_SCHEMA = (
+    'CREATE TABLE `inspection_items` (`id` text,`item_id` text,`audit_id` text,`item_index` integer,`template_id` text,'
+    '`parent_id` text,`created_at` datetime,`modified_at` datetime,`exported_at` datetime,`type` text,`category` text,'
+    '`category_id` text,`organisation_id` text,`parent_ids` text,`label` text,`response` text,`response_id` text,'
+    '`response_set_id` text,`is_failed_response` numeric,`comment` text,`media_files` text,`media_ids` text,'
+    '`media_hypertext_reference` text,`score` real,`max_score` real,`score_percentage` real,`combined_score` real,'
+    '`combined_max_score` real,`combined_score_percentage` real,`mandatory` numeric,`inactive` numeric,'
+    '`location_latitude` real,`location_longitude` real,`primeelement_id` text,`primeelement_index` integer,PRIMARY KEY (`id`))')
+INSPECTIONS_SCHEMA = (
+    'CREATE TABLE `inspections` (`audit_id` text,`name` text,`archived` numeric,`owner_name` text,`owner_id` text,'
+    '`author_name` text,`author_id` text,`score` real,`max_score` real,`score_percentage` real,`duration` integer,'
+    '`template_id` text,`organisation_id` text,`template_name` text,`template_author` text,`site_id` text,'
+    '`date_started` datetime,`date_completed` datetime,`date_modified` datetime,`created_at` datetime,'
+    '`modified_at` datetime,`exported_at` datetime,`document_no` text,`prepared_by` text,`location` text,'
+    '`conducted_on` datetime,`personnel` text,`client_site` text,`latitude` real,`longitude` real,'
+    '`web_report_link` text,`deleted` numeric,`asset_id` text,PRIMARY KEY (`audit_id`))')
+ITEM_COLUMNS = ['id', 'item_id', 'audit_id', 'item_index', 'template_id', 'parent_id', 'created_at', 'modified_at',
+                'exported_at', 'type', 'category', 'organisation_id', 'parent_ids', 'label', 'response']
+INSPECTION_COLUMNS = ['audit_id', 'name', 'archived', 'score', 'max_score', 'score_percentage', 'duration', 'template_id',
+                      'organisation_id', 'template_name', 'date_started', 'date_completed', 'date_modified', 'created_at',
+                      'modified_at', 'conducted_on', 'latitude', 'longitude', 'deleted']
+
+ORGANISATION_ID = 'role_00000000000000000000000000000000'
+# template id -> (template name, number of checklist questions)
+TEMPLATES = {
+    'template_5a1d0c8e3b9f4e6aa2c47d1f0e8b9a31': ('INVERTER PREVENTIVE SERVICE', 12),
+    'template_9e4b7f2a6c1d48b3a5e0f9c2d7b6a184': ('INVERTER CORRECTIVE SERVICE', 30),
+}
+TECHNICIANS = ['Paula', 'Raúl', 'Srishti', 'Jordan', 'Mei', 'Tomás', 'Aisha', 'Lars']
+MODELS = ['Type A', 'Type B', 'Type C', 'Type D']
+TECHNOLOGIES = ['IGBT', 'SiC', 'Hybrid']
+PART_NUMBERS = ['part A', 'part B', 'part C', 'part D']
+DEVICE_TYPES = ['Multimeter', 'Thermal camera', 'Insulation tester']
+BATCH_SIZE = 50000  # rows inserted at a time
+
+
+def item_uuid(*names):
+    # Same item_id for the same question of a template, as in the real exports
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, '/'.join(map(str, names))))
+
+
+def report_items(rng, template_id, number_of_checks, report_number):
+    """
+    Items of one report: list of (item_id, parent ids nearest first, type, category, label, response).
+    """
+    items = []
+
+    def add(item_id, parents, item_type, category, label, response=None):
+        items.append((item_id, parents, item_type, category, label, response))
+        return [item_id] + parents
+
+    def template_item(*path):
+        return item_uuid(template_id, *path)
+
+    def report_item(*path):
+        return item_uuid(template_id, report_number, *path)
+
+    service_date = datetime(2022, 1, 1, tzinfo=timezone.utc) + timedelta(seconds=rng.randrange(4 * 365 * 24 * 3600))
+    service_date_text = (service_date.strftime('%Y-%m-%dT%H:%M:%SZ') if rng.random() < 0.6
+                         else service_date.strftime('%Y-%m-%dT%H:%M:%S.') + f'{rng.randrange(1000):03d}Z')
+
+    title = add(template_item('title'), [], 'section', 'Title Page', 'Title Page')
+    add(template_item('information'), title, 'information', 'Title Page', 'Fill in all the fields marked with *')
+    general = add(template_item('general'), title, 'category', 'General Information', 'General Information')
+    for label, item_type, response in [
+            ('Technician Name*', 'textsingle', rng.choice(TECHNICIANS)),
+            ('Service Date (YYYY-MM-DD)*', 'datetime', service_date_text),
+            ('Inverter Serial Number', 'textsingle', f'SN{rng.randrange(10 ** 6):06d}'),
+            ('Model', 'textsingle', rng.choice(MODELS)),
+            ('Type of Service', 'question', rng.choice(['Preventive', 'Corrective'])),
+            ('Case Number', 'textsingle', str(rng.randrange(1000, 99999))),
+            ('Case Creation date', 'datetime', (service_date - timedelta(days=rng.randrange(30))).strftime('%Y-%m-%dT%H:%M:%SZ')),
+            ('Is the Inverter Producing Power on arrival?', 'question', rng.choice(['Yes', 'No', None]))]:
+        add(template_item('general', label), general, item_type, 'General Information', label, response)
+    site = add(template_item('site'), title, 'category', 'Site Information', 'Site Information')
+    site_number = rng.randrange(1, 500)
+    for label, item_type, response in [
+            ('Site Name*', 'textsingle', f'{site_number} Solar Park' if rng.random() < 0.9 else 'Unknown site'),
+            ('Site Address or GPS Coordinates', 'address', f'{rng.uniform(-40, 60):.5f}, {rng.uniform(-120, 150):.5f}'),
+            ('Works completed', 'text', rng.choice(['Done', 'Pending', 'Partially done']))]:
+        add(template_item('site', label), site, item_type, 'Site Information', label, response)
+
+    actions = add(template_item('actions'), [], 'section', 'Inverter Preventive Actions', 'Inverter Preventive Actions')
+    checklist_category = 'Inverter Preventive Actions - Checklist'
+    checklist = add(template_item('checklist'), actions, 'category', checklist_category, 'Checklist')
+    add(template_item('checklist', 'technology'), checklist, 'question', checklist_category, 'Select Inverter technology', rng.choice(TECHNOLOGIES))
+    for check in range(1, number_of_checks + 1):
+        answer = 'No' if rng.random() < 0.2 else 'Yes'
+        question = add(template_item('check', check), checklist, 'question', checklist_category, f'Check {check}', answer)
+        if_no = add(template_item('check', check, 'if no'), question, 'smartfield', checklist_category, 'if response is |No|',
+                    'true' if answer == 'No' else 'false')
+        if answer == 'No':
+            anomaly = rng.choice(['Pass', 'Fail'])
+            anomaly_item = add(template_item('check', check, 'anomaly'), if_no, 'question', checklist_category, 'Anomaly?', anomaly)
+            add(template_item('check', check, 'if pass'), anomaly_item, 'smartfield', checklist_category, 'if response is |Pass|',
+                'true' if anomaly == 'Pass' else 'false')
+
+    result_category = 'Action Taken and Result*'
+    result = add(template_item('result'), actions, 'category', result_category, result_category)
+    number_of_parts = rng.choice([0, 0, 1, 1, 2, 3, 5])
+    part_replaced = add(template_item('result', 'part replaced'), result, 'question', result_category, 'Part Replaced',
+                        'Yes' if number_of_parts else 'No')
+    if_yes = add(template_item('result', 'if yes'), part_replaced, 'smartfield', result_category, 'if response is |Yes|',
+                 'true' if number_of_parts else 'false')
+    if number_of_parts:
+        part_data = add(template_item('part data'), if_yes, 'dynamicfield', 'Part Data', 'Part Data')
+        for part in range(1, number_of_parts + 1):
+            category = f'Part Data {part}'
+            element = add(report_item('part', part, 'element'), part_data, 'element', category, None)
+            part_number = rng.choice(PART_NUMBERS)
+            for field in PART_DATA_FIELDS:
+                response = {'Part Number': part_number, 'Quantity': str(rng.randrange(1, 4)),
+                            'Part Reference Designator (ex. PP601)': f'PP{rng.randrange(100, 999)}'}.get(field, f'{rng.randrange(10 ** 7)}')
+                item = add(report_item('part', part, field), element, 'question' if field == 'Part Number' else 'textsingle', category, field, response)
+                if field == 'Part Number':
+                    add(report_item('part', part, 'if part A'), item, 'smartfield', category, 'if response is one of |part A|',
+                        'true' if part_number == 'part A' else 'false')
+
+    number_of_devices = rng.choice([0, 1, 1, 2, 3])
+    if number_of_devices:
+        devices = add(template_item('device'), actions, 'dynamicfield', 'Device', 'Device')
+        for device in range(1, number_of_devices + 1):
+            category = f'Device {device}'
+            element = add(report_item('device', device, 'element'), devices, 'element', category, None)
+            for field, response in zip(DEVICE_FIELDS, [rng.choice(['Tool', 'Instrument']), f'D{rng.randrange(10 ** 5)}', rng.choice(DEVICE_TYPES)]):
+                add(report_item('device', device, field), element, 'textsingle', category, field, response)
+    add(template_item('signature'), actions, 'signature', result_category, 'Technician signature', 'signature.png')
+    return items, service_date
+
+
+def generate_export(db_file, number_of_items, csv_file=None, seed=0):
+    """
+    Write a synthetic export with about number_of_items inspection_items records (whole reports) into db_file
+    (replaced if it exists) and, if csv_file is given, the inspection_items table into csv_file.
+    Returns the number of items and reports written.
+    """
+    rng = random.Random(seed)
+    db_file = Path(db_file)
+    db_file.unlink(missing_ok=True)
+    conn = sqlite3.connect(db_file)
+    conn.execute('PRAGMA journal_mode = OFF')
+    conn.execute('PRAGMA synchronous = OFF')
+    conn.execute(INSPECTION_ITEMS_SCHEMA)
+    conn.execute(INSPECTIONS_SCHEMA)
+    insert_items = f"INSERT INTO inspection_items ({', '.join(ITEM_COLUMNS)}) VALUES ({', '.join('?' * len(ITEM_COLUMNS))})"
+    insert_inspections = f"INSERT INTO inspections ({', '.join(INSPECTION_COLUMNS)}) VALUES ({', '.join('?' * len(INSPECTION_COLUMNS))})"
+
+    csv_handle = open(csv_file, 'w', newline='', encoding='utf-8') if csv_file else None
+    csv_writer = csv.writer(csv_handle) if csv_handle else None
+    if csv_writer:
+        csv_writer.writerow(ITEM_COLUMNS)
+
+    number_of_written_items = 0
+    number_of_reports = 0
+    item_rows = []
+    inspection_rows = []
+    try:
+        while number_of_written_items < number_of_items:
+            template_id = rng.choice(list(TEMPLATES))
+            template_name, number_of_checks = TEMPLATES[template_id]
+            audit_id = 'audit_' + uuid.UUID(int=rng.getrandbits(128)).hex
+            items, service_date = report_items(rng, template_id, number_of_checks, number_of_reports)
+            modified_at = (service_date + timedelta(hours=rng.randrange(1, 48))).isoformat()
+            exported_at = (service_date + timedelta(days=rng.randrange(1, 60))).isoformat()
+            for item_index, (item_id, parents, item_type, category, label, response) in enumerate(items):
+                item_rows.append((f'{audit_id}_{item_id}', item_id, audit_id, item_index, template_id, parents[0] if parents else None,
+                                  service_date.isoformat(), modified_at, exported_at, item_type, category, ORGANISATION_ID,
+                                  ','.join(parents), label, response))
+            duration = rng.randrange(120, 7200)
+            score = rng.randrange(0, number_of_checks + 1)
+            inspection_rows.append((audit_id, f'{template_name} {number_of_reports + 1}', 0, score, number_of_checks,
+                                    100.0 * score / number_of_checks, duration, template_id, ORGANISATION_ID, template_name,
+                                    service_date.isoformat(), (service_date + timedelta(seconds=duration)).isoformat(), modified_at,
+                                    service_date.isoformat(), modified_at, service_date.isoformat(),
+                                    round(rng.uniform(-40, 60), 5), round(rng.uniform(-120, 150), 5), 0))
+            number_of_written_items += len(items)
+            number_of_reports += 1
+
+            if len(item_rows) >= BATCH_SIZE or number_of_written_items >= number_of_items:
+                conn.executemany(insert_items, item_rows)
+                conn.executemany(insert_inspections, inspection_rows)
+                if csv_writer:
+                    csv_writer.writerows(item_rows)
+                item_rows.clear()
+                inspection_rows.clear()
+        conn.execute('CREATE INDEX `idx_ins_itm_modified_at` ON `inspection_items`(`modified_at` desc,`exported_at`,`organisation_id`)')
+        conn.execute('CREATE INDEX `idx_ins_modified_at` ON `inspections`(`organisation_id`,`modified_at` desc,`exported_at`)')
+        conn.commit()
+    finally:
+        conn.close()
+        if csv_handle:
+            csv_handle.close()
+    return number_of_written_items, number_of_reports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Synthetic iAuditor export (sqlite.db and inspection_items csv) for the benchmarks')
+    parser.add_argument('items', type=float, help='number of inspection_items records (e.g. 1e6)')
+    parser.add_argument('db_file', help="'sqlite.db' file to create (replaced if it exists)")
+    parser.add_argument('--csv', dest='csv_file', help='also write the inspection_items table into this csv file')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the random answers')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    number_of_items, number_of_reports = generate_export(args.db_file, int(args.items), args.csv_file, args.seed)
+    print(f'{number_of_items:,} items in {number_of_reports:,} reports written in {time.perf_counter() - start:.1f} s: {args.db_file}'
+          + (f' and {args.csv_file}' if args.csv_file else ''))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,51 @@
+'''
+Processing functions of the iAuditor Export Report Generator, without GUI.
+
+They can be imported by other jobs, or run from the command line with: python -m iauditor_report --help
+Progress messages are printed to the console unless other functions are registered with set_progress_callbacks.
+This package doesn't import tkinter, matplotlib, seaborn, reportlab or PyPDF2.
+
+The processing functions are imported the first time they are used (pandas takes most of the start-up
+time), so importing iauditor_report.constants or iauditor_report.progress is fast.
+'''
+
+import importlib
+
+from .constants import VERSION, PROGRAM_TITLE
+from .outputs import set_output_options
+from .profiling import set_profiling_options
+from .result_cache import set_result_cache
+from .progress import set_progress_callbacks, clear_printed_text, get_printed_text
+
+
+# name -> module of the functions imported on first use
+LAZY_FUNCTIONS = {
+    'read_inspection_items_chunks': 'readers',
+    'export_inspection_items_csv': 'readers',
+    'build_main_table_from_db': 'readers',
+    'wrangle_inspection_items': 'wrangling',
+    'pivot_inspection_items': 'wrangling',
+    'split_main_table': 'wrangling',
+    'create_iAuditor_report': 'report',
+    'create_iAuditor_report_from_csv': 'report',
+    'create_iAuditor_report_from_db': 'report',
+    'update_iAuditor_report_incrementally': 'incremental',
+    'write_output_table': 'columnar',
+    'compute_kpis': 'kpis',
+    'set_template_cache_file': 'template_cache',
+    'set_inspection_filter': 'inspections',
+}
+
+__all__ = ['VERSION', 'PROGRAM_TITLE', 'set_progress_callbacks', 'clear_printed_text', 'get_printed_text', 'set_profiling_options',
+           'set_output_options', 'set_result_cache'] + list(LAZY_FUNCTIONS)
+
+
+def __getattr__(name):
+    if name in LAZY_FUNCTIONS:
+        module = importlib.import_module('.' + LAZY_FUNCTIONS[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return __all__
@@ -0,0 +1,181 @@
+'''
+Command line (headless) mode of the iAuditor Export Report Generator.
+
+Examples:
+    python -m iauditor_report sqlite.db
+    python -m iauditor_report exports_folder --output-dir reports
+    python -m iauditor_report sqlite.db --mode incremental
+    python -m iauditor_report sqlite.db --workers 0          (one process per CPU core)
+    python -m iauditor_report sqlite.db --format parquet     (columnar output files, needs pyarrow)
+    python -m iauditor_report sqlite.db --by-template        (output files and tables per template)
+    python -m iauditor_report sqlite.db --trace-memory --cprofile   (peak memory per stage and cProfile dump in the run report)
+    python -m iauditor_report sqlite.db --no-result-cache    (process the file again even if its results are in the result cache)
+    python -m iauditor_report sqlite.db --template-cache     (reuse the combined labels of the previous runs from ~/.iauditor_report)
+    python -m iauditor_report sqlite.db --outputs sqlite     (only the sqlite database, without the other output files)
+    python -m iauditor_report sqlite.db --completed-from 2024-01-01 --exclude-archived   (only the reports selected by their inspection metadata)
+'''
+
+import argparse
+import os
+from datetime import datetime
+from pathlib import Path
+
+from .constants import *
+from .outputs import set_output_options
+from .profiling import set_profiling_options
+from .progress import PrintException, printToScreen, set_progress_callbacks, clear_printed_text
+from .result_cache import get_result_cache_directory, set_result_cache
+
+
+INPUT_FILE_PATTERNS = ['*.db', '*.csv']  # files processed when a directory is given
+DEFAULT_TEMPLATE_CACHE_FILE = f'~/{TEMPLATE_CACHE_DIRECTORY}/{TEMPLATE_CACHE_FILE_NAME}'  # --template-cache without a file name
+
+
+def find_input_files(paths, patterns=INPUT_FILE_PATTERNS):
+    # Expand the directories into the db and csv files they contain
+    input_files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            for pattern in patterns:
+                input_files += sorted(path.glob(pattern))
+        else:
+            input_files.append(path)
+    return input_files
+
+
+def process_file(input_file, mode='full', output_dir=None, export_csv=False, chunk_size=DB_CHUNK_SIZE, workers=1, output_format='csv',
+                 by_template=False, index_db_file=False):
+    """
+    Create the reports of one db or csv file. Returns True if all the output files have been created.
+    """
+    # imported here so that --help and argument errors don't wait for pandas
+    from .incremental import update_iAuditor_report_incrementally
+    from .readers import create_audit_id_index, export_inspection_items_csv
+    from .report import (create_iAuditor_report_from_csv, create_iAuditor_report_from_db, create_output_file_name,
+                         print_execution_time, print_file_information)
+
+    clear_printed_text()
+    printToScreen("File selected: " + str(input_file))
+    file_created_time = print_file_information(input_file)
+    start_time = datetime.now()
+    is_db_file = input_file.suffix.lower() == '.db'
+    if is_db_file and index_db_file:
+        create_audit_id_index(input_file)
+
+    if mode == 'incremental':
+        if not is_db_file:
+            printToScreen("Incremental mode needs a db file, skipping: " + str(input_file))
+            return False
+        output_file_selected, cl_output_dir = create_output_file_name(input_file, INCREMENTAL_DIRECTORY_NAME, output_dir)
+        update_iAuditor_report_incrementally(str(input_file), output_file_selected, chunk_size, workers)
+        successful = True
+    else:
+        # One directory per input file, so several files can be processed in the same minute
+        directory_name = input_file.stem + '_' + datetime.today().strftime('%d_%b_%Y_%H_%M')
+        output_file_selected, cl_output_dir = create_output_file_name(input_file, directory_name, output_dir)
+        if is_db_file:
+            if export_csv:
+                output_file_name = export_inspection_items_csv(input_file, chunk_size)
+                printToScreen(f"\nTable {INSPECTION_ITEMS_TABLE} from the db file has been exported into file: {output_file_name}.")
+            successful = create_iAuditor_report_from_db(str(input_file), output_file_selected, chunk_size, workers, output_format, by_template)
+        else:
+            successful = create_iAuditor_report_from_csv(input_file, output_file_selected, cl_output_dir, file_created_time, workers, output_format,
+                                                         by_template)
+
+    print_execution_time(start_time)
+    return bool(successful)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m iauditor_report', description=PROGRAM_TITLE + ' (command line)')
+    parser.add_argument('paths', nargs='+', help="'sqlite.db' files, inspection_items csv files or directories containing them")
+    parser.add_argument('--mode', choices=['full', 'incremental'], default='full',
+                        help="'full' creates a new output directory per file, 'incremental' updates the database in "
+                             f"'{INCREMENTAL_DIRECTORY_NAME}' with the new and modified inspections only (db files only)")
+    parser.add_argument('--output-dir', help='directory where the output directories are created (default: next to each input file)')
+    parser.add_argument('--export-csv', action='store_true', help='also export the inspection_items table of db files to csv')
+    parser.add_argument('--index-db-file', action='store_true',
+                        help=f"create an index of '{AUDIT_ID_COLUMN}' in the db files (this writes into them, otherwise they are only "
+                             "read) so the next runs read the reports without sorting the records")
+    parser.add_argument('--chunk-size', type=int, default=DB_CHUNK_SIZE, help='number of records read from db files at a time')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of processes that wrangle and pivot the reports in parallel (0 = one per CPU core)')
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='csv', dest='output_format',
+                        help="format of the output files that are csv files by default ('parquet' and 'arrow' need pyarrow); "
+                             "the sqlite database and the MS Excel summary are not affected")
+    parser.add_argument('--outputs', nargs='+', choices=OUTPUT_ARTIFACTS, default=OUTPUT_ARTIFACTS, metavar='OUTPUT',
+                        help=f"output files that are written (default: all of them): {', '.join(OUTPUT_ARTIFACTS)}")
+    parser.add_argument('--output-writers', type=int, default=OUTPUT_WRITERS,
+                        help='number of threads that write the output files of a report at the same time')
+    parser.add_argument('--by-template', action='store_true',
+                        help="process the reports of every template on their own, with main, parts and devices output files "
+                             "and database tables per template (full mode only)")
+    parser.add_argument('--completed-from', metavar='YYYY-MM-DD',
+                        help=f"only the reports completed on or after this date ('{COMPLETED_AT_COLUMN}' of the {INSPECTIONS_TABLE} table, full mode only)")
+    parser.add_argument('--completed-to', metavar='YYYY-MM-DD', help='only the reports completed on or before this date (full mode only)')
+    parser.add_argument('--template', action='append', dest='templates', metavar='NAME_OR_ID',
+                        help='only the reports of this template name or template_id, can be repeated (full mode only)')
+    parser.add_argument('--exclude-archived', action='store_true', help='leave out the archived reports (full mode only)')
+    parser.add_argument('--exclude-deleted', action='store_true', help='leave out the deleted reports (full mode only)')
+    parser.add_argument('--template-cache', metavar='FILE', nargs='?', const=DEFAULT_TEMPLATE_CACHE_FILE, default=None,
+                        help="reuse the combined labels resolved in previous runs from a template cache file, created if it "
+                             f"doesn't exist (default file: {DEFAULT_TEMPLATE_CACHE_FILE}); the cache is not used without this option")
+    parser.add_argument('--no-template-cache', action='store_true', help=argparse.SUPPRESS)  # deprecated: the template cache is opt-in
+    parser.add_argument('--result-cache', metavar='DIR', default=None,
+                        help="directory of the results of the previous runs, reused when the same file is processed again with "
+                             f"the same options (default: ~/{TEMPLATE_CACHE_DIRECTORY}/{RESULT_CACHE_DIRECTORY_NAME})")
+    parser.add_argument('--result-cache-size', metavar='MB', type=int, default=RESULT_CACHE_MAX_MB,
+                        help='maximum size of the result cache, the least recently used results are removed above it')
+    parser.add_argument('--no-result-cache', action='store_true', help='process every file again, without the result cache')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help=f"measure the peak memory of every stage with tracemalloc (slower) for the run report '*{RUN_REPORT_SUFFIX}'")
+    parser.add_argument('--cprofile', action='store_true', help=f"also write the cProfile statistics of the run into '*{PROFILE_SUFFIX}'")
+    parser.add_argument('--quiet', action='store_true', help='only print errors and the final summary')
+    parser.add_argument('--version', action='version', version=VERSION.strip())
+    args = parser.parse_args(argv)
+
+    if args.quiet:
+        set_progress_callbacks(lambda text: None)
+    else:
+        set_progress_callbacks(print, lambda message, warning: print(f'Status: {message}'))
+
+    set_profiling_options(args.trace_memory, args.cprofile)
+    set_output_options(args.outputs, args.output_writers)
+    from .template_cache import set_template_cache_file  # imports pandas, after the arguments have been checked
+    if args.no_template_cache:
+        printToScreen("--no-template-cache is deprecated and will be removed: the template cache is only used with --template-cache.")
+    set_template_cache_file(os.path.expanduser(args.template_cache) if args.template_cache and not args.no_template_cache else None)
+    full_mode_options = [option for option, value in [('--by-template', args.by_template), ('--completed-from', args.completed_from),
+                                                       ('--completed-to', args.completed_to), ('--template', args.templates),
+                                                       ('--exclude-archived', args.exclude_archived), ('--exclude-deleted', args.exclude_deleted)]
+                         if value]
+    if args.mode == 'incremental' and full_mode_options:
+        # the incremental database has all the reports of the db file, like a full run without these options
+        parser.error(f"{', '.join(full_mode_options)} can't be used with --mode incremental (full mode only)")
+    from .inspections import set_inspection_filter  # imports pandas
+    try:
+        set_inspection_filter(args.completed_from, args.completed_to, args.templates, args.exclude_archived, args.exclude_deleted)
+    except ValueError as e:
+        parser.error(f'invalid date: {e}')
+    set_result_cache(None if args.no_result_cache else (args.result_cache or get_result_cache_directory()), args.result_cache_size)
+
+    input_files = find_input_files(args.paths)
+    if not input_files:
+        print('No db or csv files found.')
+        return 1
+
+    failed_files = []
+    for input_file in input_files:
+        try:
+            if not process_file(input_file, args.mode, args.output_dir, args.export_csv, args.chunk_size, args.workers, args.output_format,
+                                args.by_template, args.index_db_file):
+                failed_files.append(input_file)
+        except Exception as e:
+            print("Oops!", e.__class__, "occurred.")
+            PrintException()
+            failed_files.append(input_file)
+
+    print(f'{len(input_files) - len(failed_files)} of {len(input_files)} files processed.')
+    for input_file in failed_files:
+        print(f'FAILED: {input_file}')
+    return 1 if failed_files else 0
@@ -0,0 +1,147 @@
+# Columnar versions (Parquet or Arrow IPC) of the csv output files.
+# The answers of the main table are texts; in a columnar file the numeric answers are stored as numbers and the
+# answers that repeat a few values as categoricals, so the files keep the dtypes and a notebook can read only the
+# columns it needs. pyarrow is only needed (and only imported) when a columnar format is selected.
+
+import importlib.util
+
+import pandas as pd
+
+from .constants import *
+from .progress import printToScreen
+
+
+NUMBER_PATTERN = r'-?(?:0|[1-9]\d{0,14})(?:\.\d+)?'  # texts converted to numbers (no leading zeros, so serial numbers stay texts)
+
+
+def resolve_output_format(output_format):
+    # Output format that can be used: 'csv' if a columnar format is selected but pyarrow is not installed
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format '{output_format}', it must be one of: {', '.join(OUTPUT_FORMATS)}")
+    if output_format != 'csv' and importlib.util.find_spec('pyarrow') is None:
+        printToScreen(f"The '{output_format}' output format needs package pyarrow (pip install pyarrow). The output files are written as csv files.")
+        return 'csv'
+    return output_format
+
+def output_file_name(csv_file_name, output_format):
+    # Name of an output file in output_format, from the name of its csv version
+    if output_format == 'csv' or csv_file_name is None:
+        return csv_file_name
+    return str(csv_file_name)[:-4] + COLUMNAR_FILE_EXTENSIONS[output_format]
+
+def typed_columns(data_frame):
+    """
+    Copy of data_frame with dtypes for the text columns: a column whose texts are all numbers becomes numeric
+    (Int64 if they are all whole numbers), and a column with few distinct texts (CATEGORY_MAX_UNIQUE_RATIO)
+    becomes a categorical. The other columns are left as they are.
+    """
+    typed = {}
+    for position, column in enumerate(data_frame.columns):
+        values = data_frame.iloc[:, position]
+        if not (pd.api.types.is_object_dtype(values.dtype) or pd.api.types.is_string_dtype(values.dtype)):
+            typed[position] = values
+            continue
+        present = values.dropna()
+        texts = present.astype(str)
+        if present.empty:
+            typed[position] = values.astype(object)
+        elif texts.str.fullmatch(NUMBER_PATTERN).all():
+            numbers = pd.to_numeric(values)
+            typed[position] = numbers.astype('Int64') if not texts.str.contains('.', regex=False).any() else numbers
+        elif present.nunique() <= CATEGORY_MAX_UNIQUE_RATIO * len(present):
+            typed[position] = values.where(values.isna(), values.astype(str)).astype('category')
+        else:
+            typed[position] = values.where(values.isna(), values.astype(str)).astype(object)
+    result = pd.concat(typed, axis=1)
+    result.columns = data_frame.columns
+    return result
+
+def to_arrow_table(data_frame, schema=None):
+    # pyarrow table of data_frame: the object columns are written as texts, and cast to schema if given (e.g. of the first chunk)
+    import pyarrow as pa
+
+    arrays = []
+    for position in range(data_frame.shape[1]):
+        values = data_frame.iloc[:, position]
+        if pd.api.types.is_object_dtype(values.dtype):
+            values = values.where(values.isna(), values.astype(str))
+            arrays.append(pa.array(values, type=pa.string(), from_pandas=True))
+        else:
+            arrays.append(pa.array(values, from_pandas=True))
+    table = pa.Table.from_arrays(arrays, names=[str(column) for column in data_frame.columns])
+    return table.cast(schema) if schema is not None else table
+
+class TableFileWriter:
+    """
+    Writes data frames with the same columns one after the other into one output file, in csv or a columnar
+    format (one row group or record batch per data frame), e.g. the shards of the reports as they are processed.
+    Use it as a context manager, so the file is closed at the end.
+    """
+    def __init__(self, csv_file_name, output_format='csv'):
+        self.output_format = output_format
+        self.file_name = output_file_name(csv_file_name, output_format)
+        self.writer = None
+        self.schema = None
+        self.number_of_chunks = 0
+
+    def write(self, data_frame):
+        if self.output_format == 'csv':
+            data_frame.to_csv(self.file_name, mode='w' if self.number_of_chunks == 0 else 'a', header=(self.number_of_chunks == 0), index=False)
+        else:
+            table = to_arrow_table(data_frame, self.schema)
+            if self.writer is None:
+                self.schema = self.chunk_schema(table.schema)
+                self.writer = open_table_writer(self.file_name, self.output_format, self.schema)
+                table = table.cast(self.schema)
+            self.writer.write_table(table)
+        self.number_of_chunks += 1
+
+    def chunk_schema(self, schema):
+        # Schema of the file, from the schema of the first chunk. The categories of a categorical column change from
+        # chunk to chunk: parquet re-encodes every row group, but an Arrow IPC file has one dictionary per column,
+        # so there the categorical columns are written as texts
+        import pyarrow as pa
+
+        fields = []
+        for field in schema:
+            if pa.types.is_dictionary(field.type):
+                field = field.with_type(pa.dictionary(pa.int32(), pa.string()) if self.output_format == 'parquet' else pa.string())
+            fields.append(field)
+        return pa.schema(fields)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def open_table_writer(file_name, output_format, schema):
+    # pyarrow writer of a columnar output file
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    if output_format == 'parquet':
+        return pyarrow.parquet.ParquetWriter(file_name, schema, compression=COLUMNAR_COMPRESSION)
+    return pyarrow.ipc.new_file(file_name, schema, options=pyarrow.ipc.IpcWriteOptions(compression=COLUMNAR_COMPRESSION))
+
+def write_output_table(data_frame, csv_file_name, output_format='csv'):
+    """
+    Write data_frame into an output file in output_format, with typed_columns for the columnar formats.
+    Returns the name of the file written (csv_file_name with the extension of the format).
+    """
+    if output_format == 'csv':
+        data_frame.to_csv(csv_file_name, index=False)
+        return csv_file_name
+    file_name = output_file_name(csv_file_name, output_format)
+    table = to_arrow_table(typed_columns(data_frame))
+    writer = open_table_writer(file_name, output_format, table.schema)
+    try:
+        writer.write_table(table)
+    finally:
+        writer.close()
+    return file_name
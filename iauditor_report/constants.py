@@ -0,0 +1,140 @@
+# Constants shared by the GUI, the command line and the processing functions of the iAuditor report generator.
+
+VERSION = ' Version 1.9 - EXPERIMENTAL '
+PROGRAM_TITLE = "iAuditor Export Report Generator"
+
+
+# DEFINE FILE COLUMNS
+AUDIT_ID_COLUMN = 'audit_id'  # Field report identification number
+ITEM_INDEX_COLUMN ='item_index'
+QUESTION_COLUMN = 'label'
+ANSWER_COLUMN = 'response'
+QUESTION_TYPE_COLUMN = 'type'
+QUESTION_CATEGORY_COLUMN = 'category'
+QUESTION_COMBINED_LABEL_COLUMN = 'Question combined label'
+INVERTER_SN_COLUMN = 'General Information - Inverter Serial Number'
+INVERTER_MODEL_COLUMN = 'General Information - Model'
+CASE_TYPE_COLUMN = 'General Information - Type of Service'
+TECH_NAME_COLUMN = 'General Information - Technician Name*'
+SITE_NAME_COLUMN = 'Site Information - Site Name*'
+SERVICE_DATE_COLUMN = 'General Information - Service Date (YYYY-MM-DD)*'
+SERVICE_DATE_FORMATTED_COLUMN = 'Service date formatted Y-m-d'
+INVERTER_TECHNOLOGY_COLUMN = 'Inverter Preventive Actions - Checklist - Select Inverter technology'
+PARENT_IDS_COLUMN = 'parent_ids'
+ITEM_ID_COLUMN = 'item_id'
+TYPE_COLUMN = 'type'
+TEMPLATE_ID_COLUMN = 'template_id'
+MODIFIED_AT_COLUMN = 'modified_at'
+TEMPLATE_NAME_COLUMN = 'template_name'
+CONDUCTED_ON_COLUMN = 'conducted_on'
+COMPLETED_AT_COLUMN = 'date_completed'
+ARCHIVED_COLUMN = 'archived'
+DELETED_COLUMN = 'deleted'
+INSPECTION_METADATA_COLUMNS = [TEMPLATE_NAME_COLUMN, CONDUCTED_ON_COLUMN, COMPLETED_AT_COLUMN, 'duration', 'score', 'latitude', 'longitude',
+                               ARCHIVED_COLUMN, DELETED_COLUMN]  # fields of the inspections table attached to the main table
+REPORT_COLUMNS = [AUDIT_ID_COLUMN, TEMPLATE_ID_COLUMN] + INSPECTION_METADATA_COLUMNS  # columns of the main table that are not questions
+DERIVED_COLUMNS = [SERVICE_DATE_FORMATTED_COLUMN]  # columns added to the main table from the answers (see wrangling.split_main_table), not questions
+
+# DEFINE DATE PARSING. Layouts of the date answers, in the order they are tried (see iauditor_report.dates.parse_dates)
+DATE_FORMATS = ['%Y-%m-%dT%H:%M:%SZ', '%Y-%m-%dT%H:%M:%S.%fZ', '%Y-%m-%dT%H:%M:%S%z', '%Y-%m-%dT%H:%M:%S.%f%z', '%Y-%m-%d']
+
+# DEFINE REPEATING FIELD GROUPS. Columns are named '<Prefix> <n> - <Field>' after the pivot.
+PART_DATA_PREFIX = 'Part Data'
+PART_DATA_FIELDS = ['Part Designator', 'Part Number', 'Part Reference Designator (ex. PP601)', 'Quantity',
+                    'Serial number - NEW part', 'Serial number - REPLACED part']
+DEVICE_PREFIX = 'Device'
+DEVICE_FIELDS = ['Indicate type:', 'Serial Number', 'Type of tool']
+
+# DEFINE DB FILE READING
+INSPECTION_ITEMS_TABLE = 'inspection_items'
+PIPELINE_COLUMNS = [AUDIT_ID_COLUMN, TEMPLATE_ID_COLUMN, ITEM_ID_COLUMN, ITEM_INDEX_COLUMN, TYPE_COLUMN, QUESTION_CATEGORY_COLUMN,
+                    QUESTION_COLUMN, ANSWER_COLUMN, PARENT_IDS_COLUMN, MODIFIED_AT_COLUMN]  # only columns used to create the reports
+OPTIONAL_PIPELINE_COLUMNS = [TEMPLATE_ID_COLUMN, MODIFIED_AT_COLUMN]  # empty if the file doesn't have them (older exports)
+EXCLUDED_TYPES = ['information', 'section', 'signature']  # records of these types don't have data
+PIVOT_COLLISIONS_DESCRIPTION = "Answers to a question already answered in the same report"  # dropped by the pivot, the first answer is kept
+DB_CHUNK_SIZE = 100000  # number of inspection_items records read from the db file at a time
+INSPECTION_ITEMS_AUDIT_INDEX = 'idx_inspection_items_audit_id'  # index of AUDIT_ID_COLUMN created in the db file with --index-db-file (see readers.create_audit_id_index)
+# dtypes of the PIPELINE_COLUMNS read from an inspection_items csv file. Columns that repeat the same few values
+# (the template questions) are read as categoricals: one small integer code per record instead of one string.
+# AUDIT_ID_COLUMN stays a string column because the reports are pivoted and merged on it.
+INSPECTION_ITEMS_DTYPES = {AUDIT_ID_COLUMN: 'str', TEMPLATE_ID_COLUMN: 'category', ITEM_ID_COLUMN: 'category', TYPE_COLUMN: 'category',
+                           QUESTION_CATEGORY_COLUMN: 'category', QUESTION_COLUMN: 'category',
+                           ANSWER_COLUMN: 'str', PARENT_IDS_COLUMN: 'category', MODIFIED_AT_COLUMN: 'category'}
+INSPECTIONS_TABLE = 'inspections'
+
+# DEFINE INSPECTIONS METADATA. Typed fields of every report, from the inspections table of the db file or the inspections
+# csv file next to an inspection_items csv file (see iauditor_report.inspections)
+INSPECTION_DATE_COLUMNS = [CONDUCTED_ON_COLUMN, COMPLETED_AT_COLUMN]
+INSPECTION_STATUS_COLUMNS = [ARCHIVED_COLUMN, DELETED_COLUMN]  # 0/1 in the db file, FALSE/TRUE in the csv file
+INSPECTION_NUMERIC_COLUMNS = [column for column in INSPECTION_METADATA_COLUMNS
+                              if column not in INSPECTION_DATE_COLUMNS + INSPECTION_STATUS_COLUMNS + [TEMPLATE_NAME_COLUMN]]
+STATUS_VALUES = {'1': True, '1.0': True, 'true': True, '0': False, '0.0': False, 'false': False}
+
+# DEFINE TEMPLATE CACHE. Combined labels of the template questions resolved in the previous runs (see iauditor_report.template_cache)
+TEMPLATE_CACHE_DIRECTORY = '.iauditor_report'          # in the home directory of the user
+TEMPLATE_CACHE_FILE_NAME = 'template_cache.db'
+TEMPLATE_CACHE_TIMEOUT = 60  # seconds a process waits for another one that is writing into the cache
+# the combined label of a question depends only on these columns of its record and on the label of its parent question
+TEMPLATE_STRUCTURE_COLUMNS = [TEMPLATE_ID_COLUMN, ITEM_ID_COLUMN, PARENT_IDS_COLUMN, QUESTION_CATEGORY_COLUMN, QUESTION_COLUMN]
+
+# DEFINE RESULT CACHE. Results of the previous runs of the same input file with the same options (see iauditor_report.result_cache)
+RESULT_CACHE_DIRECTORY_NAME = 'results'  # in TEMPLATE_CACHE_DIRECTORY
+RESULT_CACHE_MAX_MB = 2048               # the least recently used entries are removed above this size
+RESULT_CACHE_BLOCK_SIZE = 1024 * 1024    # bytes of the input file hashed at a time
+RESULTS_FILE_NAME = 'results.pickle'     # results of an entry (the other files of the entry are output files)
+COMBINED_LABEL_ENTRY_FILE = 'combined_label'  # copy of the combined label file in an entry (with the extension of its format)
+
+# DEFINE OUTPUT FILE FORMATS. The csv outputs can be written as columnar files instead ('parquet' and 'arrow' need pyarrow)
+OUTPUT_FORMATS = ['csv', 'parquet', 'arrow']
+COLUMNAR_FILE_EXTENSIONS = {'parquet': '.parquet', 'arrow': '.arrow'}  # 'arrow' is the Arrow IPC file format (Feather v2)
+COLUMNAR_COMPRESSION = 'zstd'
+CATEGORY_MAX_UNIQUE_RATIO = 0.5  # text columns with fewer distinct values than this fraction of their values are written as categoricals
+
+# DEFINE OUTPUT FILES. Types of output files that can be turned on or off, written at the same time (see iauditor_report.outputs)
+OUTPUT_ARTIFACTS = ['combined_label',  # the wrangled records with their combined labels, before the pivot
+                    'csv',             # main table, parts replaced and devices files (in the output format)
+                    'kpis',            # KPIs JSON file
+                    'sqlite',          # sqlite database
+                    'excel']           # MS Excel summary
+OUTPUT_WRITERS = 3  # threads that write the output files of a report
+
+# DEFINE MS EXCEL SUMMARY FILE
+EXCEL_MAX_ROWS = 1048576      # rows of an Excel sheet, including the header row
+EXCEL_MAX_COLUMNS = 16384     # columns of an Excel sheet
+EXCEL_BLOCK_CELLS = 1000000   # cells converted at a time when a sheet is written (a block of whole rows)
+EXCEL_DATETIME_FORMAT = 'YYYY-MM-DD HH:MM:SS'
+EXCEL_TAB_COLORS = {'Main': 'yellow', 'KPIs': 'blue'}
+
+# DEFINE KPIs of the main table (see iauditor_report.kpis)
+KPI_COLUMNS = [INVERTER_SN_COLUMN, INVERTER_TECHNOLOGY_COLUMN, INVERTER_MODEL_COLUMN, CASE_TYPE_COLUMN, TECH_NAME_COLUMN,
+               SITE_NAME_COLUMN, SERVICE_DATE_COLUMN]  # blank entries and records per value
+KPI_SITE_NUMBER_COLUMN = SITE_NAME_COLUMN  # the site name starts with the site number
+KPI_MONTH_COLUMN = SERVICE_DATE_COLUMN     # records per year and month
+KPI_FILE_SUFFIX = '_kpis.json'
+KPI_SUMMARY_TABLE = 'kpi_summary'  # kpi, value
+KPI_COLUMNS_TABLE = 'kpi_columns'  # column, records, blank, blank_percent, distinct_values
+KPI_VALUES_TABLE = 'kpi_values'    # column, value, records
+KPI_MONTHS_TABLE = 'kpi_months'    # month, records
+
+# DEFINE RUN REPORT. Time, rows and memory of every processing stage, written next to the output files (see iauditor_report.profiling)
+RUN_REPORT_SUFFIX = '_run_report.json'
+PROFILE_SUFFIX = '_profile.prof'  # cProfile dump, written if it is turned on
+
+# DEFINE OUTPUT DATABASE TABLES
+MAIN_TABLE = 'main_table'
+REPLACED_PARTS_TABLE = 'replaced_parts'
+DEVICES_TABLE = 'devices'
+PROCESSED_INSPECTIONS_TABLE = 'processed_inspections'  # audit_id and modified_at of the inspections already in the database
+PARENT_LABELS_TABLE = 'parent_labels'  # item_id and label of the parent questions of the last incremental update (see readers.read_parent_label_index)
+TEMPLATE_TABLES_TABLE = 'template_tables'  # template_id, reports, pivoted_columns and tables of every template (reports by template)
+INCREMENTAL_DIRECTORY_NAME = 'iAuditor_incremental'  # directory, next to the db file, of the reports updated incrementally
+# Long format (one row per answer) of the main table, that has no limit on the number of questions
+ANSWERS_TABLE = 'answers'                    # audit_id, question_id, combined_label, response
+QUESTIONS_TABLE = 'questions'                # question_id, combined_label
+REPORT_TEMPLATES_TABLE = 'report_templates'  # audit_id, template_id
+TEMPLATE_VIEW_PREFIX = 'wide_'               # views '<prefix><template_id>' with the main table layout of the reports of a template
+SQLITE_MAX_COLUMNS = 2000                    # default SQLITE_MAX_COLUMN: maximum number of columns of a table or view
+INDEXED_COLUMNS = [AUDIT_ID_COLUMN, INVERTER_SN_COLUMN, SITE_NAME_COLUMN, SERVICE_DATE_COLUMN]  # indexed in every table that has them
+SQLITE_BATCH_SIZE = 10000  # rows inserted per executemany call
+# the database is rebuilt from the data frames if the load fails, so it is written without waiting for the disk
+SQLITE_BULK_LOAD_PRAGMAS = ['journal_mode = MEMORY', 'synchronous = OFF', 'temp_store = MEMORY', 'cache_size = -262144']
@@ -0,0 +1,239 @@
+# Bulk writer of the sqlite database created with the reports (the '_database.db' file).
+# The tables are loaded with executemany in batches inside one transaction, with pragmas for a bulk load,
+# and the columns the BI tools filter on are indexed after the load.
+
+import itertools
+import re
+import sqlite3
+import time
+
+import pandas as pd
+
+from .constants import *
+from .progress import PrintException, printToScreen, update_progress
+
+
+def quote_identifier(name):
+    # quote a table or column name for a sqlite query
+    return '"' + str(name).replace('"', '""') + '"'
+
+def template_slug(template_id):
+    # template_id as a name of a table, a view or a file ('no_template' for the records without template)
+    return re.sub(r'\W+', '_', str(template_id)) if template_id is not None and not pd.isna(template_id) else 'no_template'
+
+def sqlite_column_type(dtype):
+    # Declared type of a column, the same to_sql uses
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return 'TIMESTAMP'
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return 'INTEGER'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'REAL'
+    return 'TEXT'
+
+def sqlite_values(column):
+    # Values of a column as python objects sqlite3 can store: None for missing values, dates as text (as to_sql writes them)
+    if pd.api.types.is_datetime64_any_dtype(column.dtype):
+        values = column.astype(str).to_numpy(dtype=object, copy=True)
+    else:
+        values = column.to_numpy(dtype=object, copy=True)
+    values[column.isna().to_numpy()] = None
+    return values
+
+def insert_rows(conn, table_name, data_frame, batch_size=SQLITE_BATCH_SIZE, create_table=True):
+    """
+    Insert the rows of data_frame into table_name with executemany, batch_size rows at a time.
+    If create_table is True the table is (re)created with the columns of data_frame first.
+    Returns the number of rows inserted.
+    """
+    columns = ', '.join(quote_identifier(column) for column in data_frame.columns)
+    if create_table:
+        column_definitions = ', '.join(f'{quote_identifier(column)} {sqlite_column_type(dtype)}'
+                                       for column, dtype in data_frame.dtypes.items())
+        conn.execute(f'DROP TABLE IF EXISTS {quote_identifier(table_name)}')
+        conn.execute(f'CREATE TABLE {quote_identifier(table_name)} ({column_definitions})')
+
+    placeholders = ', '.join('?' for column in data_frame.columns)
+    query = f'INSERT INTO {quote_identifier(table_name)} ({columns}) VALUES ({placeholders})'
+    rows = zip(*(sqlite_values(data_frame.iloc[:, i]) for i in range(data_frame.shape[1])))
+    number_of_rows = 0
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            break
+        conn.executemany(query, batch)
+        number_of_rows += len(batch)
+        update_progress(f'Writing table {table_name}', number_of_rows, data_frame.shape[0])
+    return number_of_rows
+
+def create_indexes(conn, table_name, columns, index_columns=INDEXED_COLUMNS):
+    # Index the columns of index_columns that the table has (e.g. for the BI tools that filter on them)
+    for column in index_columns:
+        if column in columns:
+            index_name = 'idx_' + table_name + '_' + re.sub(r'\W+', '_', column).strip('_').lower()
+            conn.execute(f'CREATE INDEX IF NOT EXISTS {quote_identifier(index_name)} '
+                         f'ON {quote_identifier(table_name)} ({quote_identifier(column)})')
+
+def write_report_database(database_output_file, tables, index_columns=INDEXED_COLUMNS, batch_size=SQLITE_BATCH_SIZE, answers_of=None,
+                          replace_answers=True):
+    """
+    Write the data frames of tables ({table name: data frame}) into the sqlite database, replacing the
+    tables if they exist, in a single transaction. Each table is loaded in a savepoint, so a table that
+    can't be written (e.g. duplicate column names) is reported and the other tables are still written.
+    The columns of index_columns are indexed after the load. Tables with more columns than sqlite
+    allows (SQLITE_MAX_COLUMNS) are not written.
+    If answers_of is the name of a table of tables, that table is also stored in the long format (see write_answer_tables),
+    replacing the answers already in the database unless replace_answers is False.
+
+    Returns the number of rows written and the time it took in seconds.
+    """
+    start_time = time.perf_counter()
+    number_of_rows = 0
+    conn = sqlite3.connect(database_output_file, isolation_level=None)  # transactions are handled below
+    try:
+        for pragma in SQLITE_BULK_LOAD_PRAGMAS:
+            conn.execute('PRAGMA ' + pragma)
+        conn.execute('BEGIN')
+        for table_name, data_frame in tables.items():
+            if data_frame.shape[1] > SQLITE_MAX_COLUMNS:
+                printToScreen(f"Table {table_name} not written: it has {data_frame.shape[1]:,} columns and sqlite allows {SQLITE_MAX_COLUMNS:,}"
+                              + (f" (the answers are in table {ANSWERS_TABLE} and views {TEMPLATE_VIEW_PREFIX}<template_id>)." if table_name == answers_of else "."))
+                conn.execute(f'DROP TABLE IF EXISTS {quote_identifier(table_name)}')
+                continue
+            conn.execute('SAVEPOINT write_table')
+            try:
+                number_of_rows += insert_rows(conn, table_name, data_frame, batch_size)
+                create_indexes(conn, table_name, list(data_frame.columns), index_columns)
+                conn.execute('RELEASE write_table')
+            except sqlite3.Error as e:
+                conn.execute('ROLLBACK TO write_table')
+                conn.execute('RELEASE write_table')
+                print("Oops!", e.__class__, "occurred.")
+                PrintException()
+        if answers_of is not None:
+            conn.execute('SAVEPOINT write_answers')
+            try:
+                number_of_rows += write_answer_tables(conn, tables[answers_of], replace=replace_answers, batch_size=batch_size)
+                conn.execute('RELEASE write_answers')
+            except sqlite3.Error as e:
+                conn.execute('ROLLBACK TO write_answers')
+                conn.execute('RELEASE write_answers')
+                print("Oops!", e.__class__, "occurred.")
+                PrintException()
+        conn.execute('COMMIT')
+        conn.execute('ANALYZE')  # statistics for the query planner of the BI tools
+    finally:
+        # Close the connection (a transaction that is still open is rolled back)
+        conn.close()
+
+    seconds = time.perf_counter() - start_time
+    printToScreen(f"{number_of_rows:,} rows written in {seconds:.2f} seconds ({number_of_rows / max(seconds, 1e-9):,.0f} rows/s).")
+    return number_of_rows, seconds
+
+def sql_literal(value):
+    # quote a text value for a sqlite statement that can't have parameters (e.g. a view)
+    return "'" + str(value).replace("'", "''") + "'"
+
+def create_answer_tables(conn, replace=False):
+    # Long format tables of the main table (see write_answer_tables). If replace is True the existing tables are dropped first
+    if replace:
+        for table_name in [ANSWERS_TABLE, QUESTIONS_TABLE, REPORT_TEMPLATES_TABLE]:
+            conn.execute(f'DROP TABLE IF EXISTS {quote_identifier(table_name)}')
+    conn.execute(f'CREATE TABLE IF NOT EXISTS {QUESTIONS_TABLE} (question_id INTEGER PRIMARY KEY, combined_label TEXT NOT NULL UNIQUE)')
+    conn.execute(f'CREATE TABLE IF NOT EXISTS {ANSWERS_TABLE} ("{AUDIT_ID_COLUMN}" TEXT NOT NULL, question_id INTEGER NOT NULL, '
+                 f'combined_label TEXT NOT NULL, response TEXT, PRIMARY KEY ("{AUDIT_ID_COLUMN}", question_id)) WITHOUT ROWID')
+    conn.execute(f'CREATE TABLE IF NOT EXISTS {REPORT_TEMPLATES_TABLE} ("{AUDIT_ID_COLUMN}" TEXT PRIMARY KEY, "{TEMPLATE_ID_COLUMN}" TEXT)')
+
+def create_answer_indexes(conn):
+    # Covering indexes of the answers by question (the primary key covers the answers by report)
+    conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{ANSWERS_TABLE}_question ON {ANSWERS_TABLE} (question_id, response)')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{ANSWERS_TABLE}_combined_label ON {ANSWERS_TABLE} (combined_label, response)')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{REPORT_TEMPLATES_TABLE}_template ON {REPORT_TEMPLATES_TABLE} ("{TEMPLATE_ID_COLUMN}")')
+
+def get_question_ids(conn, combined_labels):
+    # question_id of every combined label. Labels that are not in QUESTIONS_TABLE yet are added
+    question_ids = dict((label, question_id) for question_id, label in conn.execute(f'SELECT question_id, combined_label FROM {QUESTIONS_TABLE}'))
+    new_labels = [label for label in combined_labels if label not in question_ids]
+    next_question_id = max(question_ids.values(), default=0) + 1
+    for question_id, label in enumerate(new_labels, start=next_question_id):
+        question_ids[label] = question_id
+    conn.executemany(f'INSERT INTO {QUESTIONS_TABLE} (question_id, combined_label) VALUES (?, ?)',
+                     ((question_ids[label], label) for label in new_labels))
+    return question_ids
+
+def question_columns(main_df):
+    # Columns of the main table that are questions: not the REPORT_COLUMNS nor the DERIVED_COLUMNS
+    return [column for column in main_df.columns if column not in REPORT_COLUMNS and column not in DERIVED_COLUMNS]
+
+def answers_from_main_table(main_df, question_ids):
+    # One row per non-empty question cell of the main table (see question_columns): audit_id, question_id, combined_label, response
+    audit_ids = main_df[AUDIT_ID_COLUMN].to_numpy(dtype=object)
+    answers = []
+    for column in question_columns(main_df):
+        answered = main_df[column].notna().to_numpy()
+        if answered.any():
+            answers.append(pd.DataFrame({AUDIT_ID_COLUMN: audit_ids[answered], 'question_id': question_ids[column],
+                                         'combined_label': column, 'response': sqlite_values(main_df[column])[answered]}))
+    if not answers:
+        return pd.DataFrame(columns=[AUDIT_ID_COLUMN, 'question_id', 'combined_label', 'response'])
+    return pd.concat(answers, ignore_index=True)
+
+def create_template_views(conn):
+    """
+    (Re)create one view per template, named TEMPLATE_VIEW_PREFIX + template_id, with the layout of the main table
+    (one row per report, one column per question answered in the reports of the template). Templates with more
+    questions than a view can have (SQLITE_MAX_COLUMNS) get several views: '<name>', '<name>_2', ...
+    """
+    for view_name, in conn.execute("SELECT name FROM sqlite_master WHERE type = 'view' AND name LIKE ?", (TEMPLATE_VIEW_PREFIX + '%',)).fetchall():
+        conn.execute(f'DROP VIEW {quote_identifier(view_name)}')
+
+    questions_per_template = {}
+    for template_id, question_id, label in conn.execute(
+            f'SELECT DISTINCT t."{TEMPLATE_ID_COLUMN}", a.question_id, a.combined_label FROM {ANSWERS_TABLE} a '
+            f'LEFT JOIN {REPORT_TEMPLATES_TABLE} t ON t."{AUDIT_ID_COLUMN}" = a."{AUDIT_ID_COLUMN}" ORDER BY 1, 3'):
+        questions_per_template.setdefault(template_id, []).append((question_id, label))
+
+    view_names = []
+    for template_id, questions in questions_per_template.items():
+        view_name = TEMPLATE_VIEW_PREFIX + template_slug(template_id)
+        template_filter = (f't."{TEMPLATE_ID_COLUMN}" = {sql_literal(template_id)}' if template_id is not None
+                           else f't."{TEMPLATE_ID_COLUMN}" IS NULL')
+        questions_per_view = SQLITE_MAX_COLUMNS - len(REPORT_COLUMNS)
+        for part, start in enumerate(range(0, len(questions), questions_per_view), start=1):
+            question_columns = ''.join(f', MAX(CASE WHEN a.question_id = {question_id} THEN a.response END) AS {quote_identifier(label)}'
+                                       for question_id, label in questions[start:start + questions_per_view])
+            part_view_name = view_name if part == 1 else f'{view_name}_{part}'
+            conn.execute(f'CREATE VIEW {quote_identifier(part_view_name)} AS '
+                         f'SELECT a."{AUDIT_ID_COLUMN}" AS "{AUDIT_ID_COLUMN}", t."{TEMPLATE_ID_COLUMN}" AS "{TEMPLATE_ID_COLUMN}"{question_columns} '
+                         f'FROM {ANSWERS_TABLE} a LEFT JOIN {REPORT_TEMPLATES_TABLE} t ON t."{AUDIT_ID_COLUMN}" = a."{AUDIT_ID_COLUMN}" '
+                         f'WHERE {template_filter} GROUP BY a."{AUDIT_ID_COLUMN}"')
+            view_names.append(part_view_name)
+    return view_names
+
+def write_answer_tables(conn, main_df, replace=False, batch_size=SQLITE_BATCH_SIZE):
+    """
+    Store the main table in the long format: ANSWERS_TABLE has one row per answer (audit_id, question_id, combined_label,
+    response), QUESTIONS_TABLE one row per question and REPORT_TEMPLATES_TABLE the template of each report.
+    Unlike the main table, these tables don't have a limit on the number of questions. The views of
+    create_template_views give the main table layout back for the reports of each template.
+
+    If replace is False the tables are updated: the answers of the reports in main_df are replaced and the
+    question_id of the existing questions are kept. Returns the number of answers written.
+    """
+    create_answer_tables(conn, replace)
+    question_ids = get_question_ids(conn, question_columns(main_df))
+
+    conn.execute('CREATE TEMP TABLE IF NOT EXISTS written_audits (audit_id TEXT PRIMARY KEY)')
+    conn.execute('DELETE FROM written_audits')
+    conn.executemany('INSERT OR IGNORE INTO written_audits VALUES (?)', ((audit_id,) for audit_id in main_df[AUDIT_ID_COLUMN]))
+    for table_name in [ANSWERS_TABLE, REPORT_TEMPLATES_TABLE]:
+        conn.execute(f'DELETE FROM {table_name} WHERE "{AUDIT_ID_COLUMN}" IN (SELECT audit_id FROM written_audits)')
+
+    report_templates = main_df.reindex(columns=[AUDIT_ID_COLUMN, TEMPLATE_ID_COLUMN])
+    insert_rows(conn, REPORT_TEMPLATES_TABLE, report_templates, batch_size, create_table=False)
+    number_of_answers = insert_rows(conn, ANSWERS_TABLE, answers_from_main_table(main_df, question_ids), batch_size, create_table=False)
+    create_answer_indexes(conn)
+    view_names = create_template_views(conn)
+    printToScreen(f"{number_of_answers:,} answers to {len(question_ids):,} questions written into table {ANSWERS_TABLE}, "
+                  f"with the main table layout per template in views: {', '.join(view_names)}")
+    return number_of_answers
@@ -0,0 +1,55 @@
+# Parsing of the date answers of the iAuditor forms (e.g. the service date).
+# The same date is repeated in many records, and iAuditor writes it in a few ISO layouts
+# (2024-11-12T14:01:35Z, 2024-10-11T05:58:03.949Z, ...), so every distinct text is parsed once,
+# trying the known layouts in order on all the texts left at once.
+
+import numpy as np
+import pandas as pd
+
+from .constants import *
+
+
+FREE_FORM_FORMAT = 'free-form'  # key of the per-format report for the texts parsed by the free-form parser
+UNPARSED_FORMAT = 'unparsed'    # key of the per-format report for the texts that are not dates
+
+
+def parse_dates(values, formats=DATE_FORMATS, free_form=True):
+    """
+    Parse a column of date texts into a timezone-aware (UTC) datetime column. Texts without timezone are taken as UTC.
+    Every distinct text is parsed once: the formats are tried in order, each one on all the distinct texts that
+    are not parsed yet, and the texts left are parsed one by one by the (slow) free-form parser if free_form is True.
+
+    Returns the datetime column (same index as values, NaT if the text is blank or not a date) and the
+    per-format report: {format: number of values parsed with it}, including FREE_FORM_FORMAT and UNPARSED_FORMAT.
+    """
+    values = pd.Series(values)
+    codes, unique_texts = pd.factorize(values.astype(object))  # blank values get code -1
+    unique_texts = pd.Series(unique_texts, dtype=object).astype(str).str.strip()
+    values_per_text = np.bincount(codes[codes >= 0], minlength=len(unique_texts))
+
+    parsed = pd.Series(pd.NaT, index=unique_texts.index, dtype='datetime64[ns, UTC]')
+    format_report = {}
+    left = np.ones(len(unique_texts), dtype=bool)
+    parsers = [(date_format, {'format': date_format}) for date_format in formats]
+    if free_form:
+        parsers.append((FREE_FORM_FORMAT, {'format': 'mixed'}))  # dateutil, one text at a time
+    for date_format, parser_options in parsers:
+        if not left.any():
+            break
+        result = pd.to_datetime(unique_texts[left], errors='coerce', utc=True, **parser_options)
+        hit_index = result.index[result.notna()]
+        parsed[hit_index] = result[hit_index]
+        format_report[date_format] = int(values_per_text[hit_index].sum())
+        left[hit_index] = False
+    format_report[UNPARSED_FORMAT] = int(values_per_text[left].sum())
+
+    # one value per record, taken from the distinct texts (blank values are NaT)
+    if unique_texts.empty:
+        return pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns, UTC]'), format_report
+    dates = parsed.iloc[np.where(codes >= 0, codes, 0)].set_axis(values.index).where(codes >= 0)
+    return dates, format_report
+
+def format_date_report(column_name, format_report):
+    # Text of the per-format report returned by parse_dates
+    parsed_formats = ', '.join(f"'{date_format}': {count:,}" for date_format, count in format_report.items() if count)
+    return f"Dates in column '{column_name}' per format: {parsed_formats or 'none'}"
@@ -0,0 +1,150 @@
+# Writer of the MS Excel summary file (the '_SUMMARY.xlsx' file).
+# The workbook is written in the constant memory mode of xlsxwriter: every row is written to disk when the
+# next one starts, so the workbook is never held in memory. The data frames are converted a block of rows at a
+# time (datetimes without timezone, one column at a time) and the sheets that don't fit in an Excel sheet are split.
+# xlsxwriter is only imported when a summary file is written, so importing the package doesn't load it.
+
+import numbers
+from datetime import datetime
+
+import pandas as pd
+
+from .constants import *
+from .progress import printToScreen, update_progress
+
+
+def sheet_parts(sheet_name, data_frame, max_rows=EXCEL_MAX_ROWS, max_columns=EXCEL_MAX_COLUMNS):
+    """
+    Split a data frame that doesn't fit in one Excel sheet. Returns a list of (sheet name, first row, last row + 1,
+    column positions): the first part keeps sheet_name and the others are named '<sheet_name> (2)', '<sheet_name> (3)', ...
+    When the columns are split, every part starts with the first column (AUDIT_ID_COLUMN), so the parts can be joined.
+    """
+    number_of_rows, number_of_columns = data_frame.shape
+    if number_of_columns <= max_columns:
+        column_blocks = [list(range(number_of_columns))]
+    else:
+        columns_per_sheet = max_columns - 1
+        column_blocks = [[0] + list(range(start, min(start + columns_per_sheet, number_of_columns)))
+                         for start in range(1, number_of_columns, columns_per_sheet)]
+    rows_per_sheet = max_rows - 1  # the first row is the header
+    row_blocks = [(start, min(start + rows_per_sheet, number_of_rows)) for start in range(0, max(number_of_rows, 1), rows_per_sheet)]
+
+    parts = []
+    for first_row, last_row in row_blocks:
+        for columns in column_blocks:
+            part_name = sheet_name if not parts else f'{sheet_name} ({len(parts) + 1})'
+            parts.append((part_name, first_row, last_row, columns))
+    if len(parts) > 1:
+        printToScreen(f"Sheet {sheet_name} has {number_of_rows:,} rows and {number_of_columns:,} columns, more than an Excel sheet can have: "
+                      f"it has been split into sheets {', '.join(part[0] for part in parts)}.")
+    return parts
+
+def excel_block_values(block):
+    """
+    Values of a block of rows ready for xlsxwriter (2D object array) and the cells without value. The columns of
+    datetimes lose their timezone (the time is kept, e.g. UTC) and the columns of periods are written as texts,
+    one column at a time, so the data frame is not copied.
+    """
+    values = block.to_numpy(dtype=object)
+    missing = block.isna().to_numpy()
+    for position, dtype in enumerate(block.dtypes):
+        if isinstance(dtype, pd.DatetimeTZDtype):
+            values[:, position] = block.iloc[:, position].dt.tz_localize(None).to_numpy(dtype=object)
+        elif isinstance(dtype, pd.PeriodDtype):
+            values[:, position] = block.iloc[:, position].astype(str).to_numpy(dtype=object)
+    return values, missing
+
+def write_cell(worksheet, row, column, value, datetime_format):
+    # Same cell types as DataFrame.to_excel, but texts are always written as texts (not as formulas or links)
+    if isinstance(value, str):
+        worksheet.write_string(row, column, value)
+    elif isinstance(value, bool):
+        worksheet.write_boolean(row, column, value)
+    elif isinstance(value, numbers.Number):
+        worksheet.write_number(row, column, value)
+    elif isinstance(value, datetime):
+        worksheet.write_datetime(row, column, value, datetime_format)
+    else:
+        worksheet.write_string(row, column, str(value))
+
+def write_sheet(workbook, sheet_name, data_frame, datetime_format, cells_before=0, total_cells=None):
+    """
+    Write data_frame (with a header row) into one or more sheets (see sheet_parts), row by row. The progress of
+    stage 'Writing MS Excel file' is updated after each block of rows (EXCEL_BLOCK_CELLS), in cells: cells_before are the cells of the
+    sheets already written. Returns the number of cells written.
+    """
+    cells_written = 0
+    for part_name, first_row, last_row, columns in sheet_parts(sheet_name, data_frame):
+        worksheet = workbook.add_worksheet(part_name)
+        for position, column in enumerate(columns):
+            worksheet.write_string(0, position, str(data_frame.columns[column]))
+        rows_per_block = max(1, EXCEL_BLOCK_CELLS // max(len(columns), 1))
+        for block_start in range(first_row, last_row, rows_per_block):
+            block_stop = min(block_start + rows_per_block, last_row)
+            values, missing = excel_block_values(data_frame.iloc[block_start:block_stop, columns])
+            for row in range(block_stop - block_start):
+                excel_row = block_start - first_row + row + 1
+                for position in range(len(columns)):
+                    if not missing[row, position]:
+                        write_cell(worksheet, excel_row, position, values[row, position], datetime_format)
+            cells_written += (block_stop - block_start) * len(columns)
+            update_progress('Writing MS Excel file', cells_before + cells_written, total_cells)
+        worksheet.freeze_panes(1, 0)
+        if sheet_name in EXCEL_TAB_COLORS:
+            worksheet.set_tab_color(EXCEL_TAB_COLORS[sheet_name])
+    return cells_written
+
+def write_kpis_sheet(workbook, kpis, datetime_format):
+    """
+    Write the KPIs (see kpis.compute_kpis) into sheet KPIs, one table after the other: blank entries per column,
+    site numbers, records per year and month and the records per value of every column.
+    """
+    worksheet = workbook.add_worksheet('KPIs')
+    header_format = workbook.add_format({'bold': True})
+    tables = [(['Records'], [[kpis['records']]]),
+              (['Column', 'Records', 'Blank', 'Blank %', 'Distinct values'],
+               [[column['column'], column['records'], column['blank'], round(column['blank_percent'], 2), column['distinct_values']]
+                for column in kpis['columns']])]
+    if kpis['site_numbers']:
+        site_numbers = kpis['site_numbers']
+        tables.append((['Column', 'With a site number', 'Without a site number'],
+                       [[site_numbers['column'], site_numbers['with_site_number'], site_numbers['without_site_number']]]))
+    if kpis['months']:
+        tables.append((['Year and month', 'Records'], [list(month) for month in kpis['months']['months']]
+                       + [['No service date', kpis['months']['missing']]]))
+    for column in kpis['columns']:
+        tables.append(([column['column'], 'Records'], [[value, count] for value, count in column['values']]))
+
+    row = 0
+    for header, rows in tables:
+        for position, text in enumerate(header):
+            worksheet.write_string(row, position, text, header_format)
+        for values in rows:
+            row += 1
+            for position, value in enumerate(values):
+                if pd.notna(value):
+                    if isinstance(value, pd.Timestamp):
+                        value = value.tz_localize(None) if value.tzinfo else value
+                    write_cell(worksheet, row, position, value, datetime_format)
+        row += 2
+    worksheet.set_column(0, 0, 50)
+    worksheet.set_tab_color(EXCEL_TAB_COLORS['KPIs'])
+
+def write_summary_workbook(excel_file_name, sheets, kpis):
+    """
+    Write the MS Excel summary file: one sheet per data frame of sheets ({sheet name: data frame}, in order)
+    and the sheet KPIs with the tables of kpis (see write_kpis_sheet). The workbook is written in constant memory mode.
+    """
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(excel_file_name, {'constant_memory': True})
+    try:
+        datetime_format = workbook.add_format({'num_format': EXCEL_DATETIME_FORMAT})
+        total_cells = sum(data_frame.size for data_frame in sheets.values())
+        cells_written = 0
+        for sheet_name, data_frame in sheets.items():
+            cells_written += write_sheet(workbook, sheet_name, data_frame, datetime_format, cells_written, total_cells)
+
+        write_kpis_sheet(workbook, kpis, datetime_format)
+    finally:
+        workbook.close()
@@ -0,0 +1,192 @@
+# Incremental update of the output sqlite database with the inspections that are new or have been
+# modified since the last update.
+
+import os
+import sqlite3
+
+import pandas as pd
+
+from .constants import *
+from .database import quote_identifier, insert_rows, create_indexes, create_answer_tables, write_answer_tables
+from .inspections import attach_inspection_metadata, read_inspections_db
+from .kpis import compute_kpis, kpi_tables
+from .parallel import resolve_workers
+from .profiling import run_report, span
+from .progress import printToScreen, printToScreen_with_timestamp, updateStatusBar, update_progress
+from .readers import build_main_table_from_db, connect_db_file, read_parent_label_index, read_reports_of_parents
+from .report import print_removed_records
+from .wrangling import split_main_table
+
+
+def find_relabelled_inspections(db_file, database_output_file, label_index):
+    """
+    AUDIT_ID_COLUMN of the reports of the 'sqlite.db' file whose combined labels change because label_index, the labels
+    of the parent questions (see readers.read_parent_label_index), is not the one saved in PARENT_LABELS_TABLE by the
+    last update: the first record of a parent question can be in a new or a removed report.
+    """
+    saved_index = pd.Series(dtype=object)
+    if os.path.exists(database_output_file):
+        conn = sqlite3.connect(database_output_file)
+        try:
+            if conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (PARENT_LABELS_TABLE,)).fetchone():
+                saved_df = pd.read_sql_query(f'SELECT "{ITEM_ID_COLUMN}", "{QUESTION_COLUMN}" FROM {PARENT_LABELS_TABLE}', conn)
+                saved_index = pd.Series(saved_df[QUESTION_COLUMN].to_numpy(), index=saved_df[ITEM_ID_COLUMN].to_numpy())
+        finally:
+            conn.close()
+
+    compared_df = pd.concat([label_index.astype(object), saved_index], axis=1, keys=['label', 'saved'])
+    is_same = (compared_df['label'] == compared_df['saved']) | (compared_df['label'].isna() & compared_df['saved'].isna())
+    if is_same.all():
+        return []
+    return read_reports_of_parents(db_file, compared_df.index[~is_same.to_numpy()])
+
+def find_changed_inspections(db_file, database_output_file, relabelled_audit_ids=()):
+    """ 
+    Compare the MODIFIED_AT_COLUMN of every inspection in the 'sqlite.db' file with the one saved in
+    PROCESSED_INSPECTIONS_TABLE of the output database. Returns the inspections (AUDIT_ID_COLUMN and
+    MODIFIED_AT_COLUMN) that are new or have been modified since they were processed, or are in relabelled_audit_ids
+    (see find_relabelled_inspections), and the AUDIT_ID_COLUMN of the inspections processed that are no longer in the
+    'sqlite.db' file.
+    An inspection without MODIFIED_AT_COLUMN is processed once: two missing dates are the same date.
+    """ 
+
+    conn = connect_db_file(db_file)
+    try:
+        inspections_df = pd.read_sql_query(f'SELECT "{AUDIT_ID_COLUMN}", "{MODIFIED_AT_COLUMN}" FROM {INSPECTIONS_TABLE}', conn)
+    finally:
+        conn.close()
+
+    processed_df = pd.DataFrame(columns=[AUDIT_ID_COLUMN, MODIFIED_AT_COLUMN])
+    if os.path.exists(database_output_file):
+        conn = sqlite3.connect(database_output_file)
+        try:
+            if conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (PROCESSED_INSPECTIONS_TABLE,)).fetchone():
+                processed_df = pd.read_sql_query(f'SELECT "{AUDIT_ID_COLUMN}", "{MODIFIED_AT_COLUMN}" FROM {PROCESSED_INSPECTIONS_TABLE}', conn)
+        finally:
+            conn.close()
+
+    compared_df = inspections_df.merge(processed_df, on=AUDIT_ID_COLUMN, how='outer', suffixes=('', '_processed'), indicator=True)
+    modified_at, processed_modified_at = compared_df[MODIFIED_AT_COLUMN], compared_df[MODIFIED_AT_COLUMN + '_processed']
+    is_same = (modified_at == processed_modified_at) | (modified_at.isna() & processed_modified_at.isna())
+    is_changed = (compared_df['_merge'] == 'left_only') | ((compared_df['_merge'] == 'both')
+                                                           & (~is_same | compared_df[AUDIT_ID_COLUMN].isin(relabelled_audit_ids)))
+    changed_df = compared_df.loc[is_changed, [AUDIT_ID_COLUMN, MODIFIED_AT_COLUMN]].astype(object)
+    changed_df[MODIFIED_AT_COLUMN] = changed_df[MODIFIED_AT_COLUMN].where(changed_df[MODIFIED_AT_COLUMN].notna(), None)
+    return changed_df, compared_df.loc[compared_df['_merge'] == 'right_only', AUDIT_ID_COLUMN]
+
+def upsert_table(conn, table_name, new_df):
+    """ 
+    Replace the rows of the reports in the temporary table 'changed_audits' by the rows of new_df.
+    Columns of new_df that are not in the table yet (new questions) are added to the table, unless the
+    table would have more columns than sqlite allows (SQLITE_MAX_COLUMNS): then the table is not updated.
+    The changes are committed by the caller.
+    """ 
+
+    existing_columns = [row[1] for row in conn.execute(f'PRAGMA table_info({quote_identifier(table_name)})')]
+    if not existing_columns:
+        insert_rows(conn, table_name, new_df)
+        create_indexes(conn, table_name, list(new_df.columns))
+        return
+
+    new_columns = [column for column in new_df.columns if column not in existing_columns]
+    if len(existing_columns) + len(new_columns) > SQLITE_MAX_COLUMNS:
+        printToScreen(f"Table {table_name} not updated: it would have {len(existing_columns) + len(new_columns):,} columns and sqlite allows {SQLITE_MAX_COLUMNS:,}.")
+        return
+    for column in new_columns:
+        conn.execute(f'ALTER TABLE {quote_identifier(table_name)} ADD COLUMN {quote_identifier(column)} TEXT')
+
+    conn.execute(f'DELETE FROM {quote_identifier(table_name)} WHERE "{AUDIT_ID_COLUMN}" IN (SELECT audit_id FROM changed_audits)')
+    insert_rows(conn, table_name, new_df.reindex(columns=existing_columns + new_columns), create_table=False)
+    create_indexes(conn, table_name, existing_columns + new_columns)
+
+def update_kpi_tables(conn):
+    """
+    Replace the KPI tables (see kpis.kpi_tables) by the KPIs of the whole MAIN_TABLE of the output database, the same
+    KPIs a full run computes: the reports are read in AUDIT_ID_COLUMN order and the service dates as UTC dates.
+    """
+    table_columns = [row[1] for row in conn.execute(f'PRAGMA table_info({MAIN_TABLE})')]
+    columns = [AUDIT_ID_COLUMN] + [column for column in KPI_COLUMNS if column in table_columns]
+    main_df = pd.read_sql_query(f'SELECT {", ".join(quote_identifier(column) for column in columns)} FROM {MAIN_TABLE} '
+                                f'ORDER BY "{AUDIT_ID_COLUMN}"', conn)
+    if KPI_MONTH_COLUMN in main_df.columns:
+        main_df[KPI_MONTH_COLUMN] = pd.to_datetime(main_df[KPI_MONTH_COLUMN], utc=True, format='ISO8601')
+    with span('kpis', rows_in=main_df.shape[0]):
+        kpis = compute_kpis(main_df)
+    for table_name, data_frame in kpi_tables(kpis).items():
+        insert_rows(conn, table_name, data_frame)
+
+def update_iAuditor_report_incrementally(db_file, output_file, chunk_size=DB_CHUNK_SIZE, workers=1):
+    """ 
+    Incremental version of create_iAuditor_report_from_db for an output database that is kept between runs.
+    Only the inspections that are new or have been modified since the last run are read from the
+    'sqlite.db' file, wrangled and pivoted, with the metadata of the inspections table (see inspections). Their rows are then replaced (upsert) in the tables
+    MAIN_TABLE, REPLACED_PARTS_TABLE and DEVICES_TABLE of the output database, and in the long format
+    tables of the answers (see write_answer_tables). The rows of the inspections that are no longer in the
+    'sqlite.db' file are deleted, the reports whose parent question labels have changed are processed again (see
+    find_relabelled_inspections) and the KPI tables are computed again from the whole MAIN_TABLE, so the
+    tables are the same as those of a full run.
+    With workers > 1 (0 = one per CPU core) the reports are wrangled and pivoted in a pool of processes.
+
+    The inspections processed are saved in PROCESSED_INSPECTIONS_TABLE after the tables are updated,
+    so if a run is interrupted the next run processes the same inspections again.
+
+    Returns the number of inspections updated or deleted.
+
+    """ 
+
+    with run_report(output_file, input_file=str(db_file), workers=resolve_workers(workers), incremental=True):
+        database_output_file = output_file[:-4] +  "_database.db"    
+        update_progress('Finding new and modified inspections')
+        label_index = read_parent_label_index(db_file)
+        changed_df, removed_audit_ids = find_changed_inspections(db_file, database_output_file,
+                                                                 find_relabelled_inspections(db_file, database_output_file, label_index))
+        printToScreen(f"\n{changed_df.shape[0]} inspection reports are new or have been modified since the last update.")
+        printToScreen(f"{len(removed_audit_ids)} inspection reports are no longer in the db file.")
+        if changed_df.empty and removed_audit_ids.empty:
+            return 0
+
+        if changed_df.empty:
+            sorted_df = parts_replaced_df = devices_df = pd.DataFrame(columns=[AUDIT_ID_COLUMN])
+        else:
+            printToScreen_with_timestamp("\nData wrangling in process (new and modified reports only)...")  
+            updateStatusBar("Data wrangling in process...",False)
+            sorted_df, removed_records, number_of_records = build_main_table_from_db(db_file, None, chunk_size, changed_df[AUDIT_ID_COLUMN], workers,
+                                                                                    label_index=label_index)
+            print_removed_records(removed_records, number_of_records)
+            sorted_df, parts_replaced_df, devices_df = split_main_table(attach_inspection_metadata(sorted_df, read_inspections_db(db_file)))
+
+        # the output database is updated in one transaction, so if the update is cancelled or fails nothing is changed
+        update_progress('Updating sqlite database')
+        updateStatusBar("Updating sqlite database.",False)
+        printToScreen('\nUpdating sqlite database...')
+        with span('sqlite', rows_in=parts_replaced_df.shape[0] + devices_df.shape[0] + sorted_df.shape[0]):
+            conn = sqlite3.connect(database_output_file)
+            try:
+                # the rows of the changed and of the removed reports are deleted, the rows of the changed reports inserted again
+                conn.execute('CREATE TEMP TABLE changed_audits (audit_id TEXT PRIMARY KEY)')
+                conn.executemany('INSERT INTO changed_audits VALUES (?)',
+                                 ((audit_id,) for audit_id in list(changed_df[AUDIT_ID_COLUMN]) + list(removed_audit_ids)))
+
+                upsert_table(conn, MAIN_TABLE, sorted_df)
+                upsert_table(conn, REPLACED_PARTS_TABLE, parts_replaced_df)
+                upsert_table(conn, DEVICES_TABLE, devices_df)
+
+                # answers of the changed reports (also of the reports that have no rows now)
+                create_answer_tables(conn)
+                for table_name in [ANSWERS_TABLE, REPORT_TEMPLATES_TABLE]:
+                    conn.execute(f'DELETE FROM {table_name} WHERE "{AUDIT_ID_COLUMN}" IN (SELECT audit_id FROM changed_audits)')
+                write_answer_tables(conn, sorted_df)
+                update_kpi_tables(conn)
+                insert_rows(conn, PARENT_LABELS_TABLE, pd.DataFrame({ITEM_ID_COLUMN: label_index.index.astype(object),
+                                                                     QUESTION_COLUMN: label_index.to_numpy(dtype=object)}))
+
+                conn.execute(f'CREATE TABLE IF NOT EXISTS {PROCESSED_INSPECTIONS_TABLE} ("{AUDIT_ID_COLUMN}" TEXT PRIMARY KEY, "{MODIFIED_AT_COLUMN}" TEXT)')
+                conn.execute(f'DELETE FROM {PROCESSED_INSPECTIONS_TABLE} WHERE "{AUDIT_ID_COLUMN}" IN (SELECT audit_id FROM changed_audits)')
+                conn.executemany(f'INSERT INTO {PROCESSED_INSPECTIONS_TABLE} VALUES (?, ?)', changed_df.itertuples(index=False, name=None))
+                conn.commit()
+            finally:
+                # Close the connection
+                conn.close()
+
+        printToScreen("\nSQL database file is: " + database_output_file + "\n")
+        return changed_df.shape[0] + len(removed_audit_ids)
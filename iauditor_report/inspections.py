@@ -0,0 +1,153 @@
+# Metadata of the inspections: the typed fields of every report (INSPECTION_METADATA_COLUMNS: template name, dates,
+# duration, score, location and archived/deleted status) from table INSPECTIONS_TABLE of the 'sqlite.db' file, or
+# from the inspections csv file exported next to the inspection_items csv file. One row per audit_id.
+# The metadata is read before the inspection_items records, so the reports can be selected by completion date,
+# template or status before they are wrangled and pivoted (the records of the other reports of a db file are not
+# even read), and it is attached to the main table with a join on the audit_id index of the metadata.
+
+from pathlib import Path
+
+import pandas as pd
+
+from .constants import *
+from .dates import parse_dates
+from .profiling import span
+from .progress import printToScreen
+from .readers import connect_db_file
+
+
+inspection_filter = {}  # reports selected by the next runs (see set_inspection_filter), all of them if empty
+
+
+def set_inspection_filter(completed_from=None, completed_to=None, templates=None, exclude_archived=False, exclude_deleted=False):
+    """
+    Reports processed by the next runs: completed between completed_from and completed_to (dates 'YYYY-MM-DD',
+    both included), of templates (names or template_ids) and not archived or deleted. None or False for no condition.
+    """
+    global inspection_filter
+    for date_text in (completed_from, completed_to):
+        if date_text is not None:
+            pd.Timestamp(date_text)  # ValueError if it is not a date
+    inspection_filter = dict((name, value) for name, value in [('completed_from', completed_from), ('completed_to', completed_to),
+                                                                ('templates', sorted(templates) if templates else None),
+                                                                ('exclude_archived', exclude_archived), ('exclude_deleted', exclude_deleted)]
+                             if value)
+
+def get_inspection_filter():
+    return inspection_filter
+
+def inspections_csv_file(input_file):
+    # Inspections csv file of an inspection_items csv file ('inspection_items' replaced by 'inspections' in its name, or
+    # 'inspections.csv' in the same directory), None if there is none
+    input_file = Path(input_file)
+    candidates = [input_file.with_name(input_file.name.replace(INSPECTION_ITEMS_TABLE, INSPECTIONS_TABLE)),
+                  input_file.with_name(INSPECTIONS_TABLE + '.csv')]
+    return next((candidate for candidate in candidates if candidate != input_file and candidate.is_file()), None)
+
+def typed_inspections(raw_inspections):
+    """
+    Metadata indexed by AUDIT_ID_COLUMN (the row with the latest MODIFIED_AT_COLUMN of a repeated audit_id, the last
+    one of the rows with the same date), with TEMPLATE_ID_COLUMN and the INSPECTION_METADATA_COLUMNS as UTC dates,
+    float numbers (the same type from the db file and the csv file), texts and nullable booleans (the status columns).
+    """
+    inspections = raw_inspections.reindex(columns=[AUDIT_ID_COLUMN, TEMPLATE_ID_COLUMN] + INSPECTION_METADATA_COLUMNS + [MODIFIED_AT_COLUMN])
+    if inspections[AUDIT_ID_COLUMN].duplicated().any():
+        modified_at = pd.Series(parse_dates(inspections[MODIFIED_AT_COLUMN])[0].to_numpy())
+        inspections = inspections.iloc[modified_at.sort_values(kind='stable', na_position='first').index]  # NaT is the oldest version
+    inspections = inspections.drop_duplicates(AUDIT_ID_COLUMN, keep='last').drop(columns=MODIFIED_AT_COLUMN).set_index(AUDIT_ID_COLUMN)
+    for column in INSPECTION_DATE_COLUMNS:
+        inspections[column] = parse_dates(inspections[column])[0]
+    for column in INSPECTION_NUMERIC_COLUMNS:
+        inspections[column] = pd.to_numeric(inspections[column], errors='coerce').astype('float64')
+    for column in INSPECTION_STATUS_COLUMNS:
+        inspections[column] = inspections[column].astype(str).str.strip().str.lower().map(STATUS_VALUES).astype('boolean')
+    return inspections
+
+def read_inspections_db(db_file):
+    # Metadata of the reports of a 'sqlite.db' file (see typed_inspections), None if it has no table INSPECTIONS_TABLE
+    conn = connect_db_file(db_file)
+    try:
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (INSPECTIONS_TABLE,)).fetchone() is None:
+            printToScreen(f"Table {INSPECTIONS_TABLE} not found in the db file: no inspection metadata.")
+            return None
+        table_columns = [row[1] for row in conn.execute(f'PRAGMA table_info("{INSPECTIONS_TABLE}")')]
+        columns = [column for column in [AUDIT_ID_COLUMN, TEMPLATE_ID_COLUMN] + INSPECTION_METADATA_COLUMNS + [MODIFIED_AT_COLUMN]
+                   if column in table_columns]
+        selected_columns = ', '.join(f'"{column}"' for column in columns)
+        with span('inspections') as inspections_span:
+            raw_inspections = pd.read_sql_query(f'SELECT {selected_columns} FROM {INSPECTIONS_TABLE}', conn)
+            inspections = typed_inspections(raw_inspections)
+            inspections_span.rows_out = inspections.shape[0]
+    finally:
+        conn.close()
+    return inspections
+
+def read_inspections_csv(input_file):
+    # Metadata of the reports of an inspection_items csv file (see inspections_csv_file), None if there is no inspections csv file
+    inspections_file = inspections_csv_file(input_file)
+    if inspections_file is None:
+        printToScreen(f"No {INSPECTIONS_TABLE} csv file next to the input file: no inspection metadata.")
+        return None
+    wanted_columns = set([AUDIT_ID_COLUMN, TEMPLATE_ID_COLUMN] + INSPECTION_METADATA_COLUMNS + [MODIFIED_AT_COLUMN])
+    with span('inspections') as inspections_span:
+        inspections = typed_inspections(pd.read_csv(inspections_file, usecols=lambda column: column in wanted_columns, dtype=str))
+        inspections_span.rows_out = inspections.shape[0]
+    printToScreen(f"Inspection metadata of {inspections.shape[0]:,} reports read from file: {inspections_file}")
+    return inspections
+
+def selected_reports(inspections, this_filter=None):
+    """
+    AUDIT_ID_COLUMN of the reports of inspections selected by this_filter (inspection_filter by default, see
+    set_inspection_filter), None if no condition is set (all the reports, including those without metadata).
+    A report whose metadata doesn't have the field of a condition (e.g. no completion date) is not selected.
+    """
+    this_filter = inspection_filter if this_filter is None else this_filter
+    if not this_filter:
+        return None
+    if inspections is None:
+        raise ValueError(f"The reports can't be selected by {', '.join(this_filter)}: there is no inspection metadata")
+
+    is_selected = pd.Series(True, index=inspections.index)
+    if this_filter.get('completed_from'):
+        is_selected &= inspections[COMPLETED_AT_COLUMN] >= pd.Timestamp(this_filter['completed_from'], tz='UTC')
+    if this_filter.get('completed_to'):
+        is_selected &= inspections[COMPLETED_AT_COLUMN] < pd.Timestamp(this_filter['completed_to'], tz='UTC') + pd.Timedelta(days=1)
+    if this_filter.get('templates'):
+        is_selected &= (inspections[TEMPLATE_NAME_COLUMN].isin(this_filter['templates'])
+                        | inspections[TEMPLATE_ID_COLUMN].isin(this_filter['templates']))
+    if this_filter.get('exclude_archived'):
+        is_selected &= ~inspections[ARCHIVED_COLUMN].fillna(False)
+    if this_filter.get('exclude_deleted'):
+        is_selected &= ~inspections[DELETED_COLUMN].fillna(False)
+
+    audit_ids = inspections.index[is_selected.to_numpy(dtype=bool)]
+    conditions = ', '.join(f'{name}={value}' for name, value in this_filter.items())
+    printToScreen(f"{len(audit_ids):,} of {inspections.shape[0]:,} reports selected by their inspection metadata ({conditions}).")
+    return audit_ids
+
+def select_inspection_items(this_data, audit_ids):
+    # Records of this_data of the reports of audit_ids (see selected_reports), all the records if audit_ids is None
+    if audit_ids is None:
+        return this_data
+    is_selected = this_data[AUDIT_ID_COLUMN].isin(audit_ids).to_numpy()
+    printToScreen(f"Records of the reports not selected, not processed: {(~is_selected).sum():,} of {this_data.shape[0]:,}")
+    return this_data[is_selected].reset_index(drop=True)
+
+def attach_inspection_metadata(main_df, inspections):
+    """
+    main_df with the INSPECTION_METADATA_COLUMNS of its reports after its AUDIT_ID_COLUMN and TEMPLATE_ID_COLUMN:
+    every audit_id of main_df is looked up once in the (hash) index of inspections. The reports without metadata
+    get empty fields. main_df is returned as it is if there is no metadata.
+    """
+    if inspections is None:
+        return main_df
+    with span('inspections join', rows_in=main_df.shape[0]) as join_span:
+        audit_ids = main_df[AUDIT_ID_COLUMN].astype(object)
+        metadata = inspections[INSPECTION_METADATA_COLUMNS].reindex(audit_ids).set_axis(main_df.index)
+        leading_columns = [column for column in [AUDIT_ID_COLUMN, TEMPLATE_ID_COLUMN] if column in main_df.columns]
+        other_columns = [column for column in main_df.columns if column not in leading_columns and column not in INSPECTION_METADATA_COLUMNS]
+        joined_df = pd.concat([main_df[leading_columns], metadata, main_df[other_columns]], axis=1)
+        joined_df.columns.name = main_df.columns.name
+        join_span.rows_out = int(audit_ids.isin(inspections.index).sum())
+    printToScreen(f"Inspection metadata attached to {join_span.rows_out:,} of {main_df.shape[0]:,} reports: {', '.join(INSPECTION_METADATA_COLUMNS)}")
+    return joined_df
@@ -0,0 +1,125 @@
+# Key performance indicators (KPIs) of the main table: blank entries and records per value of the columns of
+# KPI_COLUMNS, records with and without a site number and records per year and month.
+# Each column is scanned once (one factorize gives the blank entries, the distribution of the values and the
+# site numbers) and the KPIs are returned as a dictionary, that is printed and written into the KPIs sheet of
+# the MS Excel summary, the KPI tables of the sqlite database and a JSON file, without going through any text.
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from .constants import *
+from .progress import printToScreen
+
+
+def column_kpis(column):
+    """
+    Blank entries (missing or empty text) and number of records per value of a column, from one factorize
+    of the column. The values are sorted by number of records, in the same order as value_counts.
+    """
+    codes, uniques = pd.factorize(column, use_na_sentinel=True)
+    uniques = np.asarray(uniques, dtype=object)
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    is_empty_text = np.array([isinstance(value, str) and value == '' for value in uniques], dtype=bool)
+    blank = int((codes < 0).sum() + counts[is_empty_text].sum())
+    records = len(column)
+    order = np.argsort(-counts, kind='stable')
+    return {
+        'column': column.name,
+        'records': records,
+        'blank': blank,
+        'blank_percent': 100 * blank / records if records else 0.0,
+        'distinct_values': len(uniques),
+        'values': [(uniques[i], int(counts[i])) for i in order],
+    }
+
+def site_number_kpis(site_kpis):
+    # Records whose site name starts (first word) with a number or not, from the values counted by column_kpis
+    with_site_number = without_site_number = 0
+    for value, count in site_kpis['values']:
+        words = value.split() if isinstance(value, str) else []
+        if words and words[0].isnumeric():
+            with_site_number += count
+        elif words:
+            without_site_number += count
+    return {'column': site_kpis['column'], 'with_site_number': with_site_number, 'without_site_number': without_site_number}
+
+def month_kpis(dates):
+    # Records per year and month (UTC) of a column of dates, in date order
+    months = dates.dt.tz_localize(None).dt.to_period('M') if isinstance(dates.dtype, pd.DatetimeTZDtype) else dates.dt.to_period('M')
+    counts = months.value_counts(sort=False).sort_index()
+    return {'column': dates.name, 'missing': int(dates.isna().sum()),
+            'months': [(str(month), int(count)) for month, count in counts.items()]}
+
+def compute_kpis(main_df, columns=KPI_COLUMNS):
+    """
+    KPIs of the main table (one row per report):
+        records         number of records (reports)
+        columns         column_kpis of every column of columns that is in main_df
+        missing_columns columns of columns that are not in main_df
+        site_numbers    site_number_kpis of KPI_SITE_NUMBER_COLUMN (None if it is not in main_df)
+        months          month_kpis of KPI_MONTH_COLUMN (None if it is not a column of dates)
+    """
+    kpis = {'records': main_df.shape[0], 'columns': [], 'missing_columns': [], 'site_numbers': None, 'months': None}
+    for column_name in columns:
+        if column_name not in main_df.columns:
+            kpis['missing_columns'].append(column_name)
+            continue
+        kpis['columns'].append(column_kpis(main_df[column_name]))
+        if column_name == KPI_SITE_NUMBER_COLUMN:
+            kpis['site_numbers'] = site_number_kpis(kpis['columns'][-1])
+
+    if KPI_MONTH_COLUMN in main_df.columns and pd.api.types.is_datetime64_any_dtype(main_df[KPI_MONTH_COLUMN].dtype):
+        kpis['months'] = month_kpis(main_df[KPI_MONTH_COLUMN])
+    return kpis
+
+def kpi_text_lines(kpis):
+    # The KPIs as the text printed by the report (the same messages the column overview used to print)
+    lines = ['\n************ SOME DATA ANALYSIS ******************']
+    for column in kpis['columns']:
+        lines.append(f"\nNumber of blank entries in {column['column']}: {column['blank']} out of {column['records']} records, "
+                     f"or {column['blank_percent']:.2f}%")
+        values = pd.Series([count for value, count in column['values']], name='count', dtype='int64',
+                           index=pd.Index([value for value, count in column['values']], dtype=object, name=column['column']))
+        column_name_short = column['column'].split(" - ")[1] if " - " in column['column'] else column['column']
+        lines.append(f"\nNumber of records per {column_name_short} type: {values}")
+        if kpis['site_numbers'] and column['column'] == kpis['site_numbers']['column']:
+            lines.append(f"\nNumber of records without a site number: {kpis['site_numbers']['without_site_number']}")
+    if kpis['months']:
+        lines.append(f"Number of NaT instances: {kpis['months']['missing']}")
+        months = pd.Series([count for month, count in kpis['months']['months']], dtype='int64',
+                           index=pd.PeriodIndex([month for month, count in kpis['months']['months']], freq='M', name='YearMonth'))
+        lines.append(f"Number of records per year and month: {months}")
+    return lines
+
+def print_kpis(kpis):
+    for column_name in kpis['missing_columns']:
+        printToScreen(f"Column '{column_name}' does not exist in the DataFrame.")
+    for line in kpi_text_lines(kpis):
+        printToScreen(line)
+
+def kpi_tables(kpis):
+    # The KPIs as data frames, for the tables KPI_*_TABLE of the sqlite database ({table name: data frame})
+    summary = [('records', kpis['records'])]
+    if kpis['site_numbers']:
+        summary += [('records with a site number', kpis['site_numbers']['with_site_number']),
+                    ('records without a site number', kpis['site_numbers']['without_site_number'])]
+    if kpis['months']:
+        summary.append(('records without a service date', kpis['months']['missing']))
+
+    columns = [(column['column'], column['records'], column['blank'], column['blank_percent'], column['distinct_values'])
+               for column in kpis['columns']]
+    values = [(column['column'], str(value), count) for column in kpis['columns'] for value, count in column['values']]
+    months = kpis['months']['months'] if kpis['months'] else []
+    return {
+        KPI_SUMMARY_TABLE: pd.DataFrame(summary, columns=['kpi', 'value']),
+        KPI_COLUMNS_TABLE: pd.DataFrame(columns, columns=['column', 'records', 'blank', 'blank_percent', 'distinct_values']),
+        KPI_VALUES_TABLE: pd.DataFrame(values, columns=['column', 'value', 'records']),
+        KPI_MONTHS_TABLE: pd.DataFrame(months, columns=['month', 'records']),
+    }
+
+def write_kpis_json(kpis, json_file_name):
+    # The KPIs as a JSON file (values that are not texts or numbers, e.g. dates, are written as texts)
+    with open(json_file_name, 'w') as json_file:
+        json.dump(kpis, json_file, indent=2, default=str)
@@ -0,0 +1,74 @@
+# Output stage of the reports: the output files of the results of a report (csv files, KPIs, sqlite database and
+# MS Excel summary) are written as independent tasks in a bounded pool of threads. Every file is timed on its own
+# and a file that can't be written is reported without stopping the others.
+# Every type of output file can be turned off, e.g. to create the sqlite database only, without the MS Excel summary.
+# The threads share the data frames without copying them, and the writers overlap where they release the GIL
+# (file and sqlite input/output, the compression of the MS Excel file, the pyarrow writers).
+
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .constants import *
+from .profiling import span
+from .progress import PrintException, printToScreen, update_progress
+
+
+output_artifacts = list(OUTPUT_ARTIFACTS)  # types of output files written by the next runs
+output_writers = OUTPUT_WRITERS            # threads that write the output files of a report
+
+
+def set_output_options(new_output_artifacts=None, new_output_writers=OUTPUT_WRITERS):
+    # Types of output files (see OUTPUT_ARTIFACTS, None for all of them) and number of writer threads of the next runs
+    global output_artifacts, output_writers
+    unknown_artifacts = set(new_output_artifacts or []) - set(OUTPUT_ARTIFACTS)
+    if unknown_artifacts:
+        raise ValueError(f"Unknown output files {', '.join(sorted(unknown_artifacts))}, they must be some of: {', '.join(OUTPUT_ARTIFACTS)}")
+    output_artifacts = list(OUTPUT_ARTIFACTS if new_output_artifacts is None else new_output_artifacts)
+    output_writers = max(1, int(new_output_writers))
+
+def artifact_enabled(artifact):
+    # True if the output files of type artifact (one of OUTPUT_ARTIFACTS) are written
+    return artifact in output_artifacts
+
+def write_artifact(span_name, rows, write):
+    # Run write() as one execution of stage span_name. Returns the seconds it took and the exception it raised (or None)
+    start_time = time.perf_counter()
+    try:
+        with span(span_name, rows_in=rows):
+            write()
+        return time.perf_counter() - start_time, None
+    except Exception as e:
+        print("Oops!", e.__class__, "occurred.")
+        PrintException()
+        return time.perf_counter() - start_time, e
+
+def write_output_files(tasks, writers=None):
+    """
+    Write the output files of tasks, a list of (description, span name, rows, write function), in a pool of
+    writers threads (output_writers by default). The progress of stage 'Writing output files' is updated as the
+    files are finished. Returns True if all the files have been written; the time of every file is printed.
+    """
+    if not tasks:
+        printToScreen("\nNo output files selected.")
+        return True
+    writers = min(writers or output_writers, len(tasks))
+    update_progress('Writing output files', 0, len(tasks))
+    start_time = time.perf_counter()
+    timings = {}
+    executor = ThreadPoolExecutor(max_workers=writers, thread_name_prefix='output_writer')
+    try:
+        futures = dict((executor.submit(write_artifact, span_name, rows, write), description)
+                       for description, span_name, rows, write in tasks)
+        for future in as_completed(futures):
+            timings[futures[future]] = future.result()
+            update_progress('Writing output files', len(timings), len(tasks))
+    finally:
+        # if the processing is cancelled, the files not started yet are not written
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    seconds = time.perf_counter() - start_time
+    printToScreen(f"\n{len(tasks)} output files written in {seconds:.2f} seconds by {writers} writers:")
+    for description, span_name, rows, write in tasks:
+        file_seconds, error = timings[description]
+        printToScreen(f"    {description}: {file_seconds:.2f} seconds" + (f" FAILED ({error.__class__.__name__}: {error})" if error else ""))
+    return all(error is None for file_seconds, error in timings.values())
@@ -0,0 +1,113 @@
+# Parallel wrangling and pivot of the inspection_items records.
+# Every report (audit_id) is wrangled and pivoted independently of the others, so the records are split
+# into shards of complete reports that are processed in a pool of processes and merged afterwards.
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .columnar import TableFileWriter
+from .constants import *
+from .profiling import span, shard_spans, add_spans
+from .progress import printToScreen, update_progress
+from .wrangling import wrangle_inspection_items, pivot_inspection_items, merge_pivoted_chunks
+
+
+def resolve_workers(workers):
+    # Number of processes to use: 0 or None means one per CPU core
+    if not workers:
+        return os.cpu_count() or 1
+    return max(1, int(workers))
+
+def shard_by_audit_id(this_data, number_of_shards):
+    """
+    Split this_data into at most number_of_shards data frames of complete reports with about the same
+    number of records. The reports are taken in AUDIT_ID_COLUMN order, so concatenating the shards
+    keeps the records sorted by report.
+    """
+    records_per_report = this_data.groupby(AUDIT_ID_COLUMN, sort=True).size()
+    if records_per_report.empty:
+        return [this_data]
+
+    # shard number of every report, from the cumulative number of records
+    cumulative_records = records_per_report.cumsum().values
+    shard_of_report = np.minimum((cumulative_records - 1) * number_of_shards // cumulative_records[-1], number_of_shards - 1)
+    shard_of_record = this_data[AUDIT_ID_COLUMN].map(dict(zip(records_per_report.index, shard_of_report)))
+
+    return [this_data[shard_of_record == shard] for shard in np.unique(shard_of_report)]
+
+def wrangle_and_pivot(this_data, keep_wrangled_data=False, template_cache_file=None, label_index=None):
+    """
+    Wrangle and pivot a shard of complete reports. The parent questions are looked up in label_index, the
+    index of the whole input file (see wrangling.parent_label_index), so the result doesn't depend on how the
+    reports are split. The labels already resolved in previous runs are taken from template_cache_file (if any, see template_cache).
+    Returns (pivoted data frame, removed records, number of records, wrangled data or None, spans).
+    It is a module function so it can run in another process: the spans (see profiling.span) of the
+    shard are returned, to be added to the run by merge_shard_results.
+    """
+    with shard_spans() as spans:
+        data, removed_records = wrangle_inspection_items(this_data, label_index, template_cache_file)
+        with span('pivot', rows_in=data.shape[0]) as pivot_span:
+            pivoted_df, collisions = pivot_inspection_items(data)
+            pivot_span.rows_out = pivoted_df.shape[0]
+    removed_records.append((PIVOT_COLLISIONS_DESCRIPTION, collisions))
+    return pivoted_df, removed_records, this_data.shape[0], (data if keep_wrangled_data else None), spans
+
+def wrangle_and_pivot_shards(shards, workers=1, keep_wrangled_data=False, template_cache_file=None, label_index=None):
+    """
+    Generator of wrangle_and_pivot(shard, keep_wrangled_data, template_cache_file, label_index) for every shard of complete reports, in the order of shards.
+    With workers > 1 the shards are processed in a pool of processes; at most two shards per process are
+    submitted ahead, so a stream of shards (e.g. read_inspection_items_chunks) is never held in memory at once.
+    If the consumer stops (e.g. the processing is cancelled), the shards not started yet are dropped.
+    """
+    workers = resolve_workers(workers)
+    if workers == 1:
+        for shard in shards:
+            yield wrangle_and_pivot(shard, keep_wrangled_data, template_cache_file, label_index)
+        return
+
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        pending = deque()
+        for shard in shards:
+            pending.append(executor.submit(wrangle_and_pivot, shard, keep_wrangled_data, template_cache_file, label_index))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def merge_shard_results(results, combined_label_file=None, total_records=None, output_format='csv'):
+    """
+    Merge the results of wrangle_and_pivot_shards into the main table (one row per report, with the union
+    of the question columns of all shards). The wrangled data of every shard is appended to
+    combined_label_file (if any, a csv file name: see columnar.output_file_name for the other output_format),
+    and the progress of stage 'Data wrangling' is updated after each shard.
+
+    Returns the main table, the records removed and the number of records processed.
+    """
+    pivoted_chunks = []
+    removed_records = {}
+    number_of_records = 0
+    with TableFileWriter(combined_label_file, output_format) as combined_label_writer:
+        for chunk_number, (pivoted_df, chunk_removed_records, chunk_records, data, spans) in enumerate(results):
+            number_of_records += chunk_records
+            add_spans(spans)
+            for description, count in chunk_removed_records:
+                removed_records[description] = removed_records.get(description, 0) + count
+
+            if combined_label_file:
+                with span('csv', rows_in=data.shape[0]):
+                    combined_label_writer.write(data)
+
+            pivoted_chunks.append(pivoted_df)
+            printToScreen(f'Chunk {chunk_number + 1}: {chunk_records} records, {pivoted_df.shape[0]} reports')
+            update_progress('Data wrangling', number_of_records, total_records)
+
+    with span('merge', rows_in=number_of_records) as merge_span:
+        main_df = merge_pivoted_chunks(pivoted_chunks)
+        merge_span.rows_out = main_df.shape[0]
+    return main_df, list(removed_records.items()), number_of_records
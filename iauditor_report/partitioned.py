@@ -0,0 +1,90 @@
+# Template-partitioned processing of the inspection_items records.
+# An export can hold the reports of several templates (e.g. the customer activity report and test templates):
+# pivoted together, the main table has the union of the questions of all of them and is mostly empty.
+# Here the reports are split by template (TEMPLATE_ID_COLUMN) and the reports of every template are wrangled and
+# pivoted on their own, so every template gets its own narrow main table. The shards of all the templates go through
+# one pool of processes: the next templates are wrangled while the output files of a template are written.
+
+import itertools
+
+import pandas as pd
+
+from .constants import *
+from .database import template_slug
+from .parallel import shard_by_audit_id, wrangle_and_pivot_shards
+from .readers import read_inspection_items_chunks
+
+
+def template_output_file(output_file, template_id):
+    # Output file of the reports of a template: '<output file>_<template>.csv'
+    return output_file[:-4] + '_' + template_slug(template_id) + output_file[-4:]
+
+def template_key(template_id):
+    # None for the reports without template (NaN in a data frame, NULL in the db file)
+    return None if pd.isna(template_id) else template_id
+
+def report_templates(this_data):
+    """
+    Template of the report of every record of this_data: the first TEMPLATE_ID_COLUMN of the records of the report
+    that have one (the records of the title page of a report can have an empty TEMPLATE_ID_COLUMN), the same
+    template pivot_inspection_items gives the report.
+    """
+    template_of_report = this_data.groupby(AUDIT_ID_COLUMN, sort=False, observed=True)[TEMPLATE_ID_COLUMN].first()
+    return this_data[AUDIT_ID_COLUMN].map(template_of_report.astype(object))
+
+def records_per_template(this_data):
+    # Number of records of the reports of every template of this_data ({template_id: records}, in template_id order)
+    counts = this_data.groupby(report_templates(this_data), sort=True, dropna=False).size()
+    return dict((template_key(template_id), int(count)) for template_id, count in counts.items())
+
+def shard_by_template(this_data, shards_per_template=1):
+    """
+    Generator of (template_id, shard): the records of this_data split by the template of their report (see
+    report_templates), in template_id order, and the records of every template split into at most
+    shards_per_template shards of complete reports (see shard_by_audit_id).
+    """
+    for template_id, template_data in this_data.groupby(report_templates(this_data), sort=True, dropna=False):
+        for shard in shard_by_audit_id(template_data, shards_per_template):
+            yield template_key(template_id), shard
+
+def reports_per_template(reports):
+    """
+    Reports of every template ({template_id: list of AUDIT_ID_COLUMN}, in template_id order) and number of records
+    of every template ({template_id: records}), from the reports of a db file (see count_inspection_items_per_report).
+    """
+    template_reports = {}
+    template_records = {}
+    for template_id, template_data in reports.groupby(TEMPLATE_ID_COLUMN, sort=True, dropna=False):
+        template_reports[template_key(template_id)] = list(template_data[AUDIT_ID_COLUMN])
+        template_records[template_key(template_id)] = int(template_data['records'].sum())
+    return template_reports, template_records
+
+def read_template_chunks(db_file, template_reports, chunk_size=DB_CHUNK_SIZE):
+    """
+    Generator of (template_id, chunk) with the chunks of complete reports of every template of template_reports
+    ({template_id: list of AUDIT_ID_COLUMN}, see reports_per_template), one template after the other
+    (see read_inspection_items_chunks).
+    """
+    for template_id, audit_ids in template_reports.items():
+        for chunk in read_inspection_items_chunks(db_file, chunk_size, audit_ids):
+            yield template_id, chunk
+
+def wrangle_and_pivot_templates(template_shards, workers=1, keep_wrangled_data=False, template_cache_file=None, label_index=None):
+    """
+    Wrangle and pivot the (template_id, shard) pairs of template_shards, where the shards of a template are consecutive
+    (see shard_by_template and read_template_chunks). Generator of (template_id, results): results are the
+    wrangle_and_pivot results of the shards of the template (see wrangle_and_pivot_shards), to be consumed before
+    the next template, e.g. by merge_shard_results. The parent questions are looked up in label_index, the index of
+    the whole input file (see wrangling.parent_label_index), so a report gets the labels of the reports of all the templates.
+    """
+    shard_templates = []  # template of every shard, in the order the shards are submitted
+
+    def shards():
+        for template_id, shard in template_shards:
+            shard_templates.append(template_id)
+            yield shard
+
+    # a result is returned after its shard has been submitted, so its template is already in shard_templates
+    results = enumerate(wrangle_and_pivot_shards(shards(), workers, keep_wrangled_data, template_cache_file, label_index))
+    for template_id, template_results in itertools.groupby(results, key=lambda result: shard_templates[result[0]]):
+        yield template_id, (result for shard_number, result in template_results)
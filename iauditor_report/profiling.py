@@ -0,0 +1,183 @@
+# Instrumentation of the processing stages.
+# Every stage (load, filter, dedupe, combined label, pivot, parts, devices, csv, sqlite, excel, kpis) runs in a
+# named span that measures its wall time, CPU time, rows in and out and, if tracemalloc is on, its peak memory.
+# The spans of a run are added up per name and written into a JSON run report next to the output files,
+# optionally with a cProfile dump of the whole run.
+
+import cProfile
+import json
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+from .constants import *
+from .progress import printToScreen
+
+
+trace_memory = False   # measure the peak memory of the spans with tracemalloc (the processing is slower)
+write_cprofile = False  # also write a cProfile dump of the run (open it with pstats or snakeviz)
+
+current_spans = None  # {span name: totals} of the run being recorded, None if no run is recorded
+spans_lock = threading.Lock()  # the spans of threads that run at the same time (e.g. the output writers) add to the same totals
+thread_spans = threading.local()  # open: spans of a thread that have started and not finished yet, innermost last
+
+
+def set_profiling_options(new_trace_memory=False, new_write_cprofile=False):
+    # Options of the next runs (see run_report)
+    global trace_memory, write_cprofile
+    trace_memory = new_trace_memory
+    write_cprofile = new_write_cprofile
+
+
+class Span:
+    # One execution of a stage. The code in the span sets rows_out when the number of rows it returns is known
+    def __init__(self, name, rows_in=None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.peak_memory = 0
+
+def open_spans():
+    # Spans of this thread that have started and not finished yet
+    if not hasattr(thread_spans, 'open'):
+        thread_spans.open = []
+    return thread_spans.open
+
+def add_span(spans, name, wall_seconds, cpu_seconds, rows_in=None, rows_out=None, peak_memory_mb=None, calls=1):
+    # Add one or more executions of a stage to the totals of spans
+    with spans_lock:
+        totals = spans.setdefault(name, {'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'rows_in': None, 'rows_out': None,
+                                         'peak_memory_mb': None})
+        totals['calls'] += calls
+        totals['wall_seconds'] += wall_seconds
+        totals['cpu_seconds'] += cpu_seconds
+        if rows_in is not None:
+            totals['rows_in'] = (totals['rows_in'] or 0) + rows_in
+        if rows_out is not None:
+            totals['rows_out'] = (totals['rows_out'] or 0) + rows_out
+        if peak_memory_mb is not None:
+            totals['peak_memory_mb'] = max(totals['peak_memory_mb'] or 0, peak_memory_mb)
+
+def add_spans(spans):
+    # Add the spans recorded somewhere else (see shard_spans) to the run being recorded
+    if current_spans is None:
+        return
+    for name, totals in spans.items():
+        add_span(current_spans, name, totals['wall_seconds'], totals['cpu_seconds'], totals['rows_in'], totals['rows_out'],
+                 totals['peak_memory_mb'], totals['calls'])
+
+@contextmanager
+def span(name, rows_in=None):
+    """
+    Measure the code in the with block as one execution of stage name:
+
+        with span('pivot', rows_in=data.shape[0]) as pivot_span:
+            ...
+            pivot_span.rows_out = pivoted_df.shape[0]
+
+    Nothing is measured if no run is being recorded. The spans can run in several threads at the same time: their
+    CPU time is the CPU time of the process and their peak memory the peak of the process while they run.
+    """
+    this_span = Span(name, rows_in)
+    if current_spans is None:
+        yield this_span
+        return
+
+    spans = current_spans
+    enclosing_spans = open_spans()
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        # the peak of the enclosing span so far is kept before the peak is reset for this span
+        if enclosing_spans:
+            enclosing_spans[-1].peak_memory = max(enclosing_spans[-1].peak_memory, tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+    enclosing_spans.append(this_span)
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    try:
+        yield this_span
+    finally:
+        wall_seconds = time.perf_counter() - start_wall
+        cpu_seconds = time.process_time() - start_cpu
+        enclosing_spans.pop()
+        peak_memory_mb = None
+        if tracing:
+            this_span.peak_memory = max(this_span.peak_memory, tracemalloc.get_traced_memory()[1])
+            peak_memory_mb = this_span.peak_memory / (1024 * 1024)
+            if enclosing_spans:
+                enclosing_spans[-1].peak_memory = max(enclosing_spans[-1].peak_memory, this_span.peak_memory)
+        add_span(spans, name, wall_seconds, cpu_seconds, this_span.rows_in, this_span.rows_out, peak_memory_mb)
+
+@contextmanager
+def shard_spans():
+    """
+    Record the spans of the code in the with block into a new dictionary instead of the run (e.g. in a worker
+    process, where no run is recorded). The dictionary is added to the run with add_spans.
+    """
+    global current_spans
+    saved_spans = current_spans
+    current_spans = {}
+    try:
+        yield current_spans
+    finally:
+        current_spans = saved_spans
+
+@contextmanager
+def run_report(output_file, **options):
+    """
+    Record the spans of the processing in the with block and write them into the run report
+    output_file[:-4] + '_run_report.json' (and the cProfile dump output_file[:-4] + '_profile.prof' if
+    write_cprofile is on). options (e.g. workers) are written into the report.
+    A run_report inside another one records nothing: its spans belong to the outer run.
+    """
+    global current_spans
+    if current_spans is not None:
+        yield
+        return
+
+    current_spans = {}
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    profiler = cProfile.Profile() if write_cprofile else None
+    started_at = datetime.now()
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+        wall_seconds = time.perf_counter() - start_wall
+        cpu_seconds = time.process_time() - start_cpu
+        peak_memory_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024) if tracemalloc.is_tracing() else None
+        if started_tracing:
+            tracemalloc.stop()
+        spans, current_spans = current_spans, None
+        write_run_report(output_file, profiler, {
+            'version': VERSION.strip(),
+            'started_at': started_at.isoformat(timespec='seconds'),
+            'options': dict(options, trace_memory=trace_memory),
+            'wall_seconds': wall_seconds,
+            'cpu_seconds': cpu_seconds,  # of this process only: the CPU time of worker processes is in the spans
+            'peak_memory_mb': peak_memory_mb,
+            'spans': [dict(name=name, **totals) for name, totals in spans.items()],
+        })
+
+def write_run_report(output_file, profiler, report):
+    run_report_file = output_file[:-4] + RUN_REPORT_SUFFIX
+    try:
+        with open(run_report_file, 'w') as report_file:
+            json.dump(report, report_file, indent=2)
+        printToScreen("Run report (time per stage) has been written into file: " + run_report_file)
+        if profiler:
+            profile_file = output_file[:-4] + PROFILE_SUFFIX
+            profiler.dump_stats(profile_file)
+            printToScreen("cProfile statistics have been written into file: " + profile_file)
+    except OSError as e:
+        print("Oops!", e.__class__, "occurred.")
+        printToScreen(f"The run report could not be written: {e}")
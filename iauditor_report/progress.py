@@ -0,0 +1,98 @@
+# Progress reporting of the processing functions.
+# By default the messages are printed to the console. The GUI and the command line register their
+# own functions with set_progress_callbacks, so the processing functions don't depend on any widget.
+# The callbacks are called from the thread that runs the processing (the GUI runs it in a worker thread), and
+# from the threads that write the output files (see iauditor_report.outputs).
+
+import linecache
+import sys
+import threading
+from datetime import datetime
+
+
+print_callback = print   # called with each line of text
+status_callback = None   # called with (message, warning) when the processing stage changes
+progress_callback = None # called with (stage, done, total) as the current stage advances
+printed_text = []        # text printed since the last clear_printed_text() (see get_printed_text)
+cancel_requested = threading.Event()  # set by request_cancel(), from any thread
+print_lock = threading.Lock()  # one line at a time, when several threads print
+
+
+class ProcessingCancelled(Exception):
+    # Raised by update_progress when the user has cancelled the processing
+    pass
+
+
+def set_progress_callbacks(new_print_callback=None, new_status_callback=None, new_progress_callback=None):
+    """
+    Register the functions that show the progress messages.
+        new_print_callback(text)                 -> receives every line printed with printToScreen
+        new_status_callback(message, warning)    -> receives every status update (warning is True for errors)
+        new_progress_callback(stage, done, total) -> receives the progress of the current stage
+                                                    (done and total are None if it is unknown)
+    None restores the default (print to the console, no status, no progress).
+    """
+    global print_callback, status_callback, progress_callback
+    print_callback = new_print_callback if new_print_callback is not None else print
+    status_callback = new_status_callback
+    progress_callback = new_progress_callback
+
+
+def request_cancel():
+    # Ask the processing to stop at its next progress update
+    cancel_requested.set()
+
+
+def reset_cancel():
+    cancel_requested.clear()
+
+
+def update_progress(stage, done=None, total=None):
+    """
+    Report the progress of the current processing stage (e.g. 'Data wrangling', 3 of 10 chunks).
+    Every progress update is also a point where the processing can be cancelled: ProcessingCancelled
+    is raised if request_cancel() has been called.
+    """
+    if cancel_requested.is_set():
+        raise ProcessingCancelled(f'Cancelled by the user during stage: {stage}')
+    if progress_callback is not None:
+        progress_callback(stage, done, total)
+
+
+def clear_printed_text():
+    printed_text.clear()
+
+
+def get_printed_text():
+    return '\n'.join(printed_text)
+
+
+def PrintException():
+    exc_type, exc_obj, tb = sys.exc_info()
+    if exc_type is not None and issubclass(exc_type, ProcessingCancelled):
+        printToScreen(f'OPERATION CANCELLED. {exc_obj}')
+        updateStatusBar("Cancelled", True)
+        return
+    f = tb.tb_frame
+    lineno = tb.tb_lineno
+    filename = f.f_code.co_filename
+    linecache.checkcache(filename)
+    line = linecache.getline(filename, lineno, f.f_globals)
+    print('EXCEPTION IN ({}, LINE {} "{}"): {}'.format(filename, lineno, line.strip(), exc_obj))
+    exception_Info = str('OPERATION INTERRUPTED. EXCEPTION IN ({}, LINE {} "{}"): {}'.format(filename, lineno, line.strip(), exc_obj))
+    printToScreen(exception_Info)
+    updateStatusBar("Error", True)
+
+
+def printToScreen(the_text):
+    with print_lock:
+        printed_text.append(str(the_text))
+        print_callback(str(the_text))
+
+def printToScreen_with_timestamp(the_text):
+    printToScreen(str(datetime.now()) + ' -> ' + the_text)
+
+
+def updateStatusBar(message,warning):
+    if status_callback is not None:
+        status_callback(message, warning)
@@ -0,0 +1,263 @@
+# Reading of the 'sqlite.db' file and csv files exported from iAuditor.
+
+import sqlite3
+from pathlib import Path
+
+import pandas as pd
+
+from .constants import *
+from .profiling import span
+from .progress import printToScreen, update_progress
+from .parallel import wrangle_and_pivot_shards, merge_shard_results
+from .template_cache import get_template_cache_file
+from .wrangling import as_label_text, parent_item_ids, parent_label_index
+
+
+def read_inspection_items_csv(input_file):
+    """
+    Read an inspection_items csv file (exported with export_inspection_items_csv or from iAuditor).
+    Only PIPELINE_COLUMNS are read (in that order, as from the db file), with the dtypes of INSPECTION_ITEMS_DTYPES, so the
+    repetitive columns are categoricals and the columns that are not used are never loaded.
+    The OPTIONAL_PIPELINE_COLUMNS that the file doesn't have are empty; ValueError if it doesn't have one of the others.
+    Only the empty fields are missing values, as the NULL and empty texts of the db file: answers such as 'None' or 'NA' are kept.
+    """
+    with span('load') as load_span:
+        this_data = pd.read_csv(input_file, usecols=lambda column: column in PIPELINE_COLUMNS, dtype=INSPECTION_ITEMS_DTYPES,
+                                keep_default_na=False, na_values=[''])
+        check_pipeline_columns(this_data.columns, input_file)
+        for column in OPTIONAL_PIPELINE_COLUMNS:
+            if column not in this_data.columns:
+                this_data[column] = pd.Series(index=this_data.index, dtype=INSPECTION_ITEMS_DTYPES[column])
+        this_data = this_data[PIPELINE_COLUMNS]
+        load_span.rows_out = this_data.shape[0]
+    return this_data
+
+def check_pipeline_columns(columns, source):
+    # ValueError if columns (of the records of source) don't have one of the PIPELINE_COLUMNS that are not OPTIONAL_PIPELINE_COLUMNS
+    missing_columns = [column for column in PIPELINE_COLUMNS if column not in columns and column not in OPTIONAL_PIPELINE_COLUMNS]
+    if missing_columns:
+        raise ValueError(f"The records of {source} don't have the columns: {', '.join(missing_columns)}")
+
+def pipeline_column_expressions(conn):
+    """
+    SQL expression of each of the PIPELINE_COLUMNS of table INSPECTION_ITEMS_TABLE: empty strings are read as NULL, the same as
+    pd.read_csv does with the csv file, and the OPTIONAL_PIPELINE_COLUMNS that the table doesn't have are NULL.
+    ValueError if the table doesn't have one of the other columns.
+    """
+    table_columns = [row[1] for row in conn.execute(f'PRAGMA table_info({INSPECTION_ITEMS_TABLE})')]
+    check_pipeline_columns(table_columns, f'table {INSPECTION_ITEMS_TABLE}')
+    return dict((column, f'NULLIF("{column}", \'\')' if column in table_columns else 'NULL') for column in PIPELINE_COLUMNS)
+
+def select_pipeline_columns(conn):
+    # SELECT list of the PIPELINE_COLUMNS of table INSPECTION_ITEMS_TABLE (see pipeline_column_expressions)
+    return ', '.join(f'{expression} AS "{column}"' for column, expression in pipeline_column_expressions(conn).items())
+
+def filter_inspection_items(conn, audit_ids=None):
+    """
+    Return the FROM ... WHERE clause that selects the records of table INSPECTION_ITEMS_TABLE used by the
+    pipeline: records of EXCLUDED_TYPES or without label are filtered out by the query itself.
+    If audit_ids is given, only the records of those reports are selected. They are kept in a
+    temporary table of conn, so the db file is not modified.
+    """
+    where_clause = (f'FROM {INSPECTION_ITEMS_TABLE} '
+                    f'WHERE ("{TYPE_COLUMN}" IS NULL OR "{TYPE_COLUMN}" NOT IN ({", ".join("?" for question_type in EXCLUDED_TYPES)})) '
+                    f'AND "{QUESTION_COLUMN}" IS NOT NULL AND "{QUESTION_COLUMN}" <> \'\' ')
+    if audit_ids is not None:
+        conn.execute('CREATE TEMP TABLE IF NOT EXISTS selected_audits (audit_id TEXT PRIMARY KEY)')
+        conn.execute('DELETE FROM selected_audits')
+        conn.executemany('INSERT OR IGNORE INTO selected_audits VALUES (?)', ((audit_id,) for audit_id in audit_ids))
+        where_clause += f'AND "{AUDIT_ID_COLUMN}" IN (SELECT audit_id FROM selected_audits) '
+    return where_clause
+
+def connect_db_file(db_file):
+    # Read-only connection to a 'sqlite.db' file: the input file is never modified (the temporary tables are not in the file)
+    return sqlite3.connect(Path(db_file).resolve().as_uri() + '?mode=ro', uri=True)
+
+def has_audit_id_index(conn):
+    # True if table INSPECTION_ITEMS_TABLE has an index that starts with AUDIT_ID_COLUMN (e.g. the one of create_audit_id_index)
+    for index_name, in conn.execute(f'SELECT name FROM pragma_index_list(\'{INSPECTION_ITEMS_TABLE}\')').fetchall():
+        first_column = conn.execute('SELECT name FROM pragma_index_info(?) WHERE seqno = 0', (index_name,)).fetchone()
+        if first_column is not None and first_column[0] == AUDIT_ID_COLUMN:
+            return True
+    return False
+
+def create_audit_id_index(db_file):
+    """
+    Index INSPECTION_ITEMS_AUDIT_INDEX of AUDIT_ID_COLUMN of table INSPECTION_ITEMS_TABLE, created in the db file (only with
+    the option --index-db-file: it is the only function that writes into the input file), so read_inspection_items_chunks
+    reads the records report by report without sorting them. The content hash of the file changes once.
+    """
+    conn = sqlite3.connect(db_file)
+    try:
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {INSPECTION_ITEMS_AUDIT_INDEX} ON {INSPECTION_ITEMS_TABLE} ("{AUDIT_ID_COLUMN}")')
+        conn.commit()
+    except sqlite3.Error as e:
+        printToScreen(f"Index of {AUDIT_ID_COLUMN} not created in the db file ({e}): the records are sorted when they are read.")
+    finally:
+        conn.close()
+
+def count_inspection_items(db_file, audit_ids=None):
+    # Number of records read_inspection_items_chunks will read (used for the progress bar)
+    conn = connect_db_file(db_file)
+    try:
+        where_clause = filter_inspection_items(conn, audit_ids)
+        return conn.execute('SELECT COUNT(*) ' + where_clause, EXCLUDED_TYPES).fetchone()[0]
+    finally:
+        conn.close()
+
+def count_inspection_items_per_report(db_file, audit_ids=None):
+    """
+    Template and number of records read_inspection_items_chunks will read of every report, as a data frame with
+    columns AUDIT_ID_COLUMN, TEMPLATE_ID_COLUMN and 'records'. The template of a report is taken from its
+    records that have one (the records of the title page of a report can have an empty TEMPLATE_ID_COLUMN).
+    """
+    conn = connect_db_file(db_file)
+    try:
+        where_clause = filter_inspection_items(conn, audit_ids)
+        template_id = pipeline_column_expressions(conn)[TEMPLATE_ID_COLUMN]
+        return pd.read_sql_query(f'SELECT "{AUDIT_ID_COLUMN}", MIN({template_id}) AS "{TEMPLATE_ID_COLUMN}", '
+                                 f'COUNT(*) AS records ' + where_clause + f'GROUP BY "{AUDIT_ID_COLUMN}"', conn, params=EXCLUDED_TYPES)
+    finally:
+        conn.close()
+
+def read_inspection_items_chunks(db_file, chunk_size=DB_CHUNK_SIZE, audit_ids=None):
+    """
+    Read table INSPECTION_ITEMS_TABLE from a 'sqlite.db' file in chunks of about chunk_size records.
+    Only PIPELINE_COLUMNS are read, and records of EXCLUDED_TYPES or without label are filtered
+    out by the query itself (see filter_inspection_items).
+
+    Records are read ordered by AUDIT_ID_COLUMN, the records of a report in the order of the table, and the records of
+    the last report of a chunk are carried over to the next chunk, so every chunk contains complete reports and can be
+    wrangled and pivoted on its own. The order is given by an index of AUDIT_ID_COLUMN if the db file has one (see
+    create_audit_id_index); otherwise the AUDIT_ID_COLUMN and rowid of the records are copied into the temporary
+    table 'report_records' and sorted there, so only these two columns are sorted and the db file is not modified.
+
+    If audit_ids is given, only the records of those reports are read.
+
+    """
+
+    conn = connect_db_file(db_file)
+    try:
+        where_clause = filter_inspection_items(conn, audit_ids)
+        if has_audit_id_index(conn):
+            query, params = f'SELECT {select_pipeline_columns(conn)} ' + where_clause + f'ORDER BY "{AUDIT_ID_COLUMN}", rowid', EXCLUDED_TYPES
+        else:
+            conn.execute('CREATE TEMP TABLE IF NOT EXISTS report_records (report_audit_id TEXT, record INTEGER, '
+                         'PRIMARY KEY (report_audit_id, record)) WITHOUT ROWID')
+            conn.execute('DELETE FROM report_records')
+            conn.execute(f'INSERT INTO report_records SELECT "{AUDIT_ID_COLUMN}", rowid ' + where_clause, EXCLUDED_TYPES)
+            query, params = (f'SELECT {select_pipeline_columns(conn)} FROM report_records JOIN {INSPECTION_ITEMS_TABLE} '
+                             f'ON {INSPECTION_ITEMS_TABLE}.rowid = record ORDER BY report_audit_id, record'), None
+
+        carried_over = None
+        chunks = pd.read_sql_query(query, conn, params=params, chunksize=chunk_size)
+        while True:
+            with span('load') as load_span:
+                chunk = next(chunks, None)
+                load_span.rows_out = 0 if chunk is None else chunk.shape[0]
+            if chunk is None:
+                break
+            if carried_over is not None:
+                chunk = pd.concat([carried_over, chunk], ignore_index=True)
+            is_last_report = chunk[AUDIT_ID_COLUMN] == chunk[AUDIT_ID_COLUMN].iloc[-1]
+            carried_over = chunk[is_last_report]
+            if not is_last_report.all():
+                yield chunk[~is_last_report]
+
+        if carried_over is not None and not carried_over.empty:
+            yield carried_over
+    finally:
+        # Close the connection
+        conn.close()
+
+def read_child_records(conn, where_clause):
+    # Records of where_clause (see filter_inspection_items) of the questions that can have a parent question (see parent_item_ids)
+    return pd.read_sql_query(f'SELECT {select_pipeline_columns(conn)} ' + where_clause + f'AND (instr("{QUESTION_COLUMN}", ?) > 0 '
+                             f'OR instr("{QUESTION_COLUMN}", ?) > 0)', conn, params=EXCLUDED_TYPES + ['Anomaly?', 'if response is'])
+
+def read_reports_of_parents(db_file, item_ids):
+    """
+    AUDIT_ID_COLUMN of the reports of table INSPECTION_ITEMS_TABLE with child questions of the parent questions item_ids:
+    the combined labels of these reports change if the labels of item_ids in read_parent_label_index change.
+    """
+    conn = connect_db_file(db_file)
+    try:
+        child_records = read_child_records(conn, filter_inspection_items(conn))
+    finally:
+        conn.close()
+    parent_ids = parent_item_ids(child_records, as_label_text(child_records[QUESTION_COLUMN]))[1]
+    return child_records.loc[parent_ids.index[parent_ids.isin(item_ids).to_numpy()], AUDIT_ID_COLUMN].unique()
+
+def read_parent_label_index(db_file):
+    """
+    parent_label_index of all the records of table INSPECTION_ITEMS_TABLE, in the order of the table (the order of the
+    csv file of export_inspection_items_csv), so a report gets the labels of the csv file whatever reports are read.
+    Only the records of the child questions and of their parent questions are read.
+    """
+    conn = connect_db_file(db_file)
+    try:
+        with span('parent labels') as parent_span:
+            columns = select_pipeline_columns(conn)
+            where_clause = filter_inspection_items(conn)
+            child_records = read_child_records(conn, where_clause)
+            parent_ids = parent_item_ids(child_records, as_label_text(child_records[QUESTION_COLUMN]))[1].unique()
+
+            conn.execute('CREATE TEMP TABLE IF NOT EXISTS parent_items (item_id TEXT PRIMARY KEY)')
+            conn.execute('DELETE FROM parent_items')
+            conn.executemany('INSERT OR IGNORE INTO parent_items VALUES (?)', ((item_id,) for item_id in parent_ids))
+            parent_records = pd.read_sql_query(f'SELECT {columns} ' + where_clause + f'AND "{ITEM_ID_COLUMN}" IN (SELECT item_id FROM parent_items) '
+                                               'ORDER BY rowid', conn, params=EXCLUDED_TYPES)
+            label_index = parent_label_index(parent_records, parent_ids)
+            parent_span.rows_out = label_index.shape[0]
+    finally:
+        conn.close()
+    return label_index
+
+def export_inspection_items_csv(db_file, chunk_size=DB_CHUNK_SIZE):
+    """
+    Export table INSPECTION_ITEMS_TABLE of a 'sqlite.db' file to a csv file next to it.
+    The table is copied in chunks, so it is never loaded in memory at once.
+    Returns the name of the csv file.
+    """
+    output_file_name = str(db_file)[:-4] + '_' + INSPECTION_ITEMS_TABLE + "_dataframe.csv"
+
+    conn = connect_db_file(db_file)
+    try:
+        number_of_records = 0
+        total_records = conn.execute(f"SELECT COUNT(*) FROM {INSPECTION_ITEMS_TABLE}").fetchone()[0]
+        query = f"SELECT * FROM {INSPECTION_ITEMS_TABLE}"
+        for chunk in pd.read_sql_query(query, conn, chunksize=chunk_size):
+            update_progress('Exporting csv file', number_of_records, total_records)
+            chunk.index += number_of_records  # keep the row numbers of a single to_csv call
+            chunk.to_csv(output_file_name, mode='w' if number_of_records == 0 else 'a', header=(number_of_records == 0))
+            number_of_records += chunk.shape[0]
+        update_progress('Exporting csv file', number_of_records, total_records)
+    finally:
+        # Close the connection
+        conn.close()
+
+    printToScreen(f"{number_of_records:,} records exported.")
+    return output_file_name
+
+def build_main_table_from_db(db_file, combined_label_file=None, chunk_size=DB_CHUNK_SIZE, audit_ids=None, workers=1, output_format='csv',
+                             label_index=None):
+    """ 
+    Streaming version of the wrangling stage for a 'sqlite.db' file. Every chunk of complete
+    reports returned by read_inspection_items_chunks is wrangled, appended to combined_label_file
+    (if any, written in output_format) and pivoted on its own, so the whole inspection_items table is never held in memory.
+    With workers > 1 (0 = one per CPU core) the chunks are wrangled and pivoted in a pool of processes.
+    The parent questions are looked up in label_index (read_parent_label_index of the db file by default), so the main
+    table is the same as the one of the csv file exported from the db file, with any chunk size or audit_ids.
+
+    Returns the main table (one row per report), the records removed and the number of records read.
+
+    """ 
+
+    total_records = count_inspection_items(db_file, audit_ids)
+    update_progress('Data wrangling', 0, total_records)
+    if label_index is None:
+        label_index = read_parent_label_index(db_file)
+    chunks = read_inspection_items_chunks(db_file, chunk_size, audit_ids)
+    results = wrangle_and_pivot_shards(chunks, workers, keep_wrangled_data=bool(combined_label_file), template_cache_file=get_template_cache_file(),
+                                       label_index=label_index)
+    return merge_shard_results(results, combined_label_file, total_records, output_format)
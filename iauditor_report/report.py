@@ -0,0 +1,463 @@
+# Creation of the report files (csv files, sqlite database and MS Excel summary) from the inspection_items data.
+
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from .columnar import TableFileWriter, output_file_name, resolve_output_format, write_output_table
+from .constants import *
+from .progress import PrintException, printToScreen, printToScreen_with_timestamp, updateStatusBar, update_progress
+from .database import template_slug, write_report_database
+from .excel import write_summary_workbook
+from .inspections import (attach_inspection_metadata, get_inspection_filter, inspections_csv_file, read_inspections_csv, read_inspections_db,
+                          select_inspection_items, selected_reports)
+from .kpis import compute_kpis, kpi_tables, print_kpis, write_kpis_json
+from .outputs import artifact_enabled, write_output_files
+from .profiling import run_report, span
+from .parallel import resolve_workers, shard_by_audit_id, wrangle_and_pivot_shards, merge_shard_results
+from .partitioned import (read_template_chunks, records_per_template, reports_per_template, shard_by_template, template_output_file,
+                          wrangle_and_pivot_templates)
+from .readers import (build_main_table_from_db, count_inspection_items_per_report, read_inspection_items_csv,
+                      read_parent_label_index)
+from .result_cache import file_content_hash, open_result_entry
+from .template_cache import get_template_cache_file
+from .wrangling import parent_label_index, wrangle_inspection_items, pivot_inspection_items, split_main_table
+
+
+def print_file_information(filepath):
+    # Get file information
+    # Get the file's stat information
+    file_path = Path(filepath)
+    stat_info = file_path.stat()
+
+    try:
+        file_creation_time = stat_info.st_birthtime 
+    except:
+        file_creation_time = stat_info.st_mtime  # In case operating system did not like st_birthtime
+
+    # Convert to megabytes
+    size_in_mb = stat_info.st_size / (1024 * 1024)
+ 
+    # Format using time.strftime() for more control
+    file_modified_time = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(stat_info.st_mtime))
+    file_created_time = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(file_creation_time))
+
+    printToScreen(f'File size: {size_in_mb:.2f} MB')
+    printToScreen(f'Last modified: {file_modified_time}')
+    printToScreen(f'Created: {file_created_time}') 
+
+    return file_created_time
+
+def create_output_file_name(filepath, directory_name, output_dir=None):
+    # Create a directory to save the output files, next to the input file unless output_dir is given
+    cl_output_dir = Path(output_dir if output_dir else Path(filepath).parent) / directory_name
+    FILE_NAME_TEXT = ' Customer_Activity_Report'
+    os.makedirs(cl_output_dir, exist_ok=True)   
+    return os.path.join(cl_output_dir, 'iAuditor_' + FILE_NAME_TEXT + ".csv"), cl_output_dir
+
+def print_execution_time(start_time):
+    end_time = datetime.now()   
+    execution_time = end_time - start_time
+    # Convert execution time to total seconds
+    total_seconds = execution_time.total_seconds()
+
+    # Calculate hours, minutes, and seconds
+    hours, remainder = divmod(total_seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+
+    # Print the formatted execution time based on the values of hours and minutes
+    if hours > 0:
+        printToScreen(f'Execution time: {int(hours)} hours, {int(minutes)} minutes, {seconds:.2f} seconds')
+    elif minutes > 0:
+        printToScreen(f'Execution time: {int(minutes)} minutes, {seconds:.2f} seconds')
+    else:
+        printToScreen(f'Execution time: {seconds:.2f} seconds')
+
+def print_removed_records(removed_records, number_of_records):
+    for description, count in removed_records:
+        printToScreen(f"{description} have been removed: {count:,}")
+    number_of_records_removed = sum(count for description, count in removed_records)
+    printToScreen(f'Total number of records removed: {number_of_records_removed:,} out of {number_of_records:,}') 
+
+def combined_label_file_name(output_file_selected):
+    # csv name of the combined label file of output_file_selected (see columnar.output_file_name), None if it is turned off
+    return output_file_selected[:-4] +  "_combined_label.csv" if artifact_enabled('combined_label') else None
+
+def print_combined_label_file(first_output_file):
+    if first_output_file:
+        printToScreen_with_timestamp(f"\nRaw data with added column {QUESTION_COMBINED_LABEL_COLUMN} has been exported to file: " + first_output_file + "\n")
+        printToScreen(f'This file is sorted by {AUDIT_ID_COLUMN} and {ITEM_INDEX_COLUMN}')
+
+def read_parent_labels(this_data):
+    # Labels of the parent questions of all the records of an input file (see wrangling.parent_label_index)
+    with span('parent labels', rows_in=this_data.shape[0]) as parent_span:
+        label_index = parent_label_index(this_data)
+        parent_span.rows_out = label_index.shape[0]
+    return label_index
+
+def no_reports_selected(audit_ids):
+    # True (and the reason is printed) if no report has been selected by its inspection metadata (see inspections.selected_reports)
+    if audit_ids is None or len(audit_ids) > 0:
+        return False
+    printToScreen("\nNo reports selected by their inspection metadata: no output files created.")
+    updateStatusBar("No reports selected", True)
+    return True
+
+def create_iAuditor_report(this_data, output_file, output_dir, this_file_created_time, header_2, workers=1, output_format='csv',
+                           by_template=False, result_entry=None, inspections=None, label_index=None):
+    """ 
+    Wrangle and pivot the inspection_items records in this_data and create the output files.
+    With workers > 1 (0 = one per CPU core) the reports are split by AUDIT_ID_COLUMN into shards that are
+    wrangled and pivoted in a pool of processes.
+    The parent questions are looked up in label_index, the index of the whole input file if this_data is a selection of
+    its reports (see wrangling.parent_label_index), so the labels are the same with any number of workers.
+    The csv output files are written in output_format ('csv', 'parquet' or 'arrow', see OUTPUT_FORMATS).
+    With by_template the reports of every template are processed and written on their own (see create_template_reports).
+    The results are added to result_entry (if any, see result_cache.ResultEntry) and the inspection metadata of
+    inspections (if any, see inspections.typed_inspections) is attached to the main table.
+    """ 
+    try:
+        with run_report(output_file, workers=resolve_workers(workers), output_format=output_format, by_template=by_template):
+            data = this_data
+            output_file_selected = output_file
+            cl_output_dir = output_dir
+            file_created_time = this_file_created_time
+            HEADER_2 = header_2
+
+ 
+            output_format = resolve_output_format(output_format)
+            number_of_records = data.shape[0]
+            printToScreen_with_timestamp("\nData wrangling in process...it will take a few minutes...")  
+            updateStatusBar("Data wrangling in process...",False)
+            if label_index is None:
+                label_index = read_parent_labels(data)
+            if by_template:
+                return create_iAuditor_report_by_template(data, output_file_selected, workers, output_format, inspections, label_index)
+            if resolve_workers(workers) > 1:
+                return create_iAuditor_report_in_parallel(data, output_file_selected, workers, output_format, result_entry, inspections,
+                                                          label_index)
+            update_progress('Data wrangling', 0, 3)
+
+            data, removed_records = wrangle_inspection_items(data, label_index, get_template_cache_file())
+            update_progress('Data wrangling', 1, 3)
+
+            updateStatusBar("Building output files...",False)  
+            if artifact_enabled('combined_label'):
+                with span('csv', rows_in=data.shape[0]), TableFileWriter(combined_label_file_name(output_file_selected), output_format) as combined_label_writer:
+                    combined_label_writer.write(data)
+                print_combined_label_file(combined_label_writer.file_name)
+            update_progress('Data wrangling', 2, 3)
+
+            with span('pivot', rows_in=data.shape[0]) as pivot_span:
+                sorted_df, collisions = pivot_inspection_items(data)
+                pivot_span.rows_out = sorted_df.shape[0]
+            removed_records.append((PIVOT_COLLISIONS_DESCRIPTION, collisions))
+            print_removed_records(removed_records, number_of_records)
+            update_progress('Data wrangling', 3, 3)
+            if result_entry is not None:
+                result_entry.add(removed_records=removed_records, number_of_records=number_of_records)
+            return create_report_outputs(sorted_df, output_file_selected, output_format, result_entry=result_entry, inspections=inspections)
+
+    except Exception as e:
+        print("Oops!", e.__class__, "occurred.")
+        PrintException()
+
+def create_iAuditor_report_in_parallel(data, output_file_selected, workers, output_format='csv', result_entry=None, inspections=None,
+                                       label_index=None):
+    # Parallel version of the wrangling stage of create_iAuditor_report
+    number_of_workers = resolve_workers(workers)
+    printToScreen(f"Wrangling the reports in {number_of_workers} processes.")
+    update_progress('Data wrangling', 0, data.shape[0])
+
+    first_output_file = combined_label_file_name(output_file_selected)
+    # a few shards per process, so a shard with large reports doesn't keep the other processes waiting
+    shards = shard_by_audit_id(data, 4 * number_of_workers)
+    results = wrangle_and_pivot_shards(shards, number_of_workers, keep_wrangled_data=bool(first_output_file),
+                                       template_cache_file=get_template_cache_file(), label_index=label_index)
+    sorted_df, removed_records, number_of_records = merge_shard_results(results, first_output_file, data.shape[0], output_format)
+    print_removed_records(removed_records, number_of_records)
+    print_combined_label_file(output_file_name(first_output_file, output_format))
+    if result_entry is not None:
+        result_entry.add(removed_records=removed_records, number_of_records=number_of_records)
+
+    updateStatusBar("Building output files...",False)  
+    return create_report_outputs(sorted_df, output_file_selected, output_format, result_entry=result_entry, inspections=inspections)
+
+def create_iAuditor_report_by_template(data, output_file_selected, workers, output_format='csv', inspections=None, label_index=None):
+    # Template-partitioned version of the wrangling stage of create_iAuditor_report
+    number_of_workers = resolve_workers(workers)
+    template_records = records_per_template(data)
+    print_templates(template_records, number_of_workers)
+
+    # a few shards per process for the templates with many reports, as in create_iAuditor_report_in_parallel
+    template_shards = shard_by_template(data, 4 * number_of_workers if number_of_workers > 1 else 1)
+    template_results = wrangle_and_pivot_templates(template_shards, number_of_workers, keep_wrangled_data=artifact_enabled('combined_label'),
+                                                   template_cache_file=get_template_cache_file(), label_index=label_index)
+    return create_template_reports(template_results, output_file_selected, template_records, output_format, inspections)
+
+def print_templates(template_records, number_of_workers):
+    printToScreen(f"Processing the reports of {len(template_records)} templates on their own, in {number_of_workers} processes:")
+    for template_id, number_of_records in template_records.items():
+        printToScreen(f"    {template_id if template_id is not None else 'no template'}: {number_of_records:,} records")
+
+def create_template_reports(template_results, output_file_selected, template_records, output_format='csv', inspections=None):
+    """
+    Create the output files of every template of template_results (see partitioned.wrangle_and_pivot_templates).
+    The csv files, KPIs and MS Excel summary of a template are named after output_file_selected + '_<template>'
+    (see template_output_file), and its tables are written into the database of output_file_selected as
+    '<table>_<template>'. The answers of all the templates are in the long format tables of the database and
+    table TEMPLATE_TABLES_TABLE lists the tables of every template.
+    Returns True if the output files of all the templates have been created.
+    """
+    database_output_file = output_file_selected[:-4] +  "_database.db"
+    template_tables = []
+    successful = True
+    for template_number, (template_id, results) in enumerate(template_results):
+        printToScreen_with_timestamp(f"\n************ TEMPLATE {template_id if template_id is not None else 'no template'} ************")
+        template_file = template_output_file(output_file_selected, template_id)
+        first_output_file = combined_label_file_name(template_file)
+        sorted_df, removed_records, number_of_records = merge_shard_results(results, first_output_file, template_records.get(template_id),
+                                                                            output_format)
+        print_removed_records(removed_records, number_of_records)
+        print_combined_label_file(output_file_name(first_output_file, output_format))
+
+        updateStatusBar("Building output files...",False)
+        table_suffix = '_' + template_slug(template_id)
+        template_tables.append((template_id, sorted_df.shape[0], sorted_df.shape[1], MAIN_TABLE + table_suffix,
+                                REPLACED_PARTS_TABLE + table_suffix, DEVICES_TABLE + table_suffix))
+        successful = create_report_outputs(sorted_df, template_file, output_format, database_output_file, table_suffix,
+                                           replace_answers=(template_number == 0), inspections=inspections) and successful
+
+    if not artifact_enabled('sqlite'):
+        return successful
+    write_report_database(database_output_file, {TEMPLATE_TABLES_TABLE: pd.DataFrame(template_tables, columns=[
+        TEMPLATE_ID_COLUMN, 'reports', 'pivoted_columns', 'main_table', 'replaced_parts_table', 'devices_table'])})
+    printToScreen(f"\nThe tables of the {len(template_tables)} templates are listed in table {TEMPLATE_TABLES_TABLE} of database: {database_output_file}")
+    return successful
+
+def create_iAuditor_report_from_csv(input_file, output_file, output_dir, file_created_time, workers=1, output_format='csv', by_template=False):
+    """ 
+    Read the csv file of the inspection_items table exported from the 'sqlite.db' file and create the report.
+    The reports are selected and their metadata is taken from the inspections csv file next to it, if any (see inspections).
+    If the results of the same file and options are in the result cache, only the output files are written.
+    Returns True if all the output files have been created.
+    """ 
+    try:
+        output_format = resolve_output_format(output_format)
+        with run_report(output_file, input_file=str(input_file), workers=resolve_workers(workers), output_format=output_format,
+                        by_template=by_template, inspection_filter=get_inspection_filter()):
+            inspections_file = inspections_csv_file(input_file)
+            result_entry = None if by_template else open_result_entry(input_file, source='csv', output_format=output_format, combined_label=artifact_enabled('combined_label'),
+                                                                       inspections=file_content_hash(inspections_file) if inspections_file else None,
+                                                                       inspection_filter=get_inspection_filter())
+            if result_entry is not None and result_entry.hit:
+                return create_report_outputs_from_cache(result_entry, output_file, output_format)
+
+            update_progress('Reading csv file')
+            inspections = read_inspections_csv(input_file)
+            audit_ids = selected_reports(inspections)
+            if no_reports_selected(audit_ids):
+                return False
+            data_raw = read_inspection_items_csv(input_file)
+            label_index = read_parent_labels(data_raw)  # of all the reports of the file, before they are selected
+            data_raw = select_inspection_items(data_raw, audit_ids)
+
+            # Count the number of unique values in the column 'AUDIT_ID_COLUMN'
+            reports_in_file_count = data_raw[AUDIT_ID_COLUMN].nunique()
+
+            printToScreen(f"\nThere are {reports_in_file_count} inspection reports in the file.")
+            printToScreen(f"Analyzing {data_raw.shape[0]*data_raw.shape[1]:,} data points.")        
+            printToScreen_with_timestamp("\nCreating inspections database... This will take a few minutes...")
+            updateStatusBar("Creating inspections database...",False)
+
+            HEADER_2 = 'iAuditor Report: '
+            successful = create_iAuditor_report(data_raw, output_file, output_dir, file_created_time, HEADER_2, workers, output_format, by_template,
+                                                result_entry, inspections, label_index)
+            save_report_results(result_entry, successful, output_file, output_format)
+            return successful
+
+    except Exception as e:
+        print("Oops!", e.__class__, "occurred.")
+        PrintException()
+
+def create_iAuditor_report_from_db(db_file, output_file, chunk_size=DB_CHUNK_SIZE, workers=1, output_format='csv', by_template=False):
+    """ 
+    Same report as create_iAuditor_report, but the inspection_items table is read from the
+    'sqlite.db' file in chunks and each chunk goes straight to the wrangling stage (no csv file in between).
+    With workers > 1 (0 = one per CPU core) the chunks are wrangled and pivoted in a pool of processes.
+    The csv output files are written in output_format ('csv', 'parquet' or 'arrow', see OUTPUT_FORMATS).
+    With by_template the records of every template are read, processed and written on their own (see create_template_reports).
+    The reports are selected and their metadata is taken from the inspections table of the db file (see inspections):
+    the records of the reports that are not selected are not read.
+    If the results of the same file and options are in the result cache, only the output files are written.
+    """ 
+    try:
+        output_file_selected = output_file
+        output_format = resolve_output_format(output_format)
+
+        with run_report(output_file, input_file=str(db_file), workers=resolve_workers(workers), output_format=output_format,
+                        by_template=by_template, inspection_filter=get_inspection_filter()):
+            result_entry = None if by_template else open_result_entry(db_file, source='db', output_format=output_format,
+                                                                       combined_label=artifact_enabled('combined_label'),
+                                                                       inspection_filter=get_inspection_filter())
+            if result_entry is not None and result_entry.hit:
+                return create_report_outputs_from_cache(result_entry, output_file_selected, output_format)
+
+            inspections = read_inspections_db(db_file)
+            audit_ids = selected_reports(inspections)
+            if no_reports_selected(audit_ids):
+                return False
+
+            printToScreen_with_timestamp("\nData wrangling in process (streaming from the db file)...it will take a few minutes...")  
+            updateStatusBar("Data wrangling in process...",False)
+            printToScreen(f"Records of type {', '.join(EXCLUDED_TYPES)} and records without data in column 'label' are filtered out when reading the db file.")
+
+            if by_template:
+                template_reports, template_records = reports_per_template(count_inspection_items_per_report(db_file, audit_ids))
+                print_templates(template_records, resolve_workers(workers))
+                # one query per template, so the chunks of a template are consecutive
+                template_results = wrangle_and_pivot_templates(read_template_chunks(db_file, template_reports, chunk_size), workers,
+                                                               keep_wrangled_data=artifact_enabled('combined_label'),
+                                                               template_cache_file=get_template_cache_file(),
+                                                               label_index=read_parent_label_index(db_file))
+                return create_template_reports(template_results, output_file_selected, template_records, output_format, inspections)
+
+            first_output_file = combined_label_file_name(output_file_selected)
+            sorted_df, removed_records, number_of_records = build_main_table_from_db(db_file, first_output_file, chunk_size, audit_ids, workers,
+                                                                                     output_format)
+            print_removed_records(removed_records, number_of_records)
+            print_combined_label_file(output_file_name(first_output_file, output_format))
+            if result_entry is not None:
+                result_entry.add(removed_records=removed_records, number_of_records=number_of_records)
+
+            updateStatusBar("Building output files...",False)  
+            successful = create_report_outputs(sorted_df, output_file_selected, output_format, result_entry=result_entry, inspections=inspections)
+            save_report_results(result_entry, successful, output_file_selected, output_format)
+            return successful
+
+    except Exception as e:
+        print("Oops!", e.__class__, "occurred.")
+        PrintException()
+
+def build_report_results(sorted_df):
+    # Split the main table (see split_main_table) and compute its KPIs: {'main', 'parts', 'devices', 'kpis'}
+    sorted_df, parts_replaced_df, devices_df = split_main_table(sorted_df)
+    with span('kpis', rows_in=sorted_df.shape[0]):
+        kpis = compute_kpis(sorted_df)
+    return {'main': sorted_df, 'parts': parts_replaced_df, 'devices': devices_df, 'kpis': kpis}
+
+def create_report_outputs(sorted_df, output_file_selected, output_format='csv', database_output_file=None, table_suffix='', replace_answers=True,
+                          result_entry=None, inspections=None):
+    """
+    Create the output files of the main table sorted_df, with the metadata of its reports in inspections (if any,
+    see inspections.attach_inspection_metadata): the csv files (in output_format), the KPIs, the sqlite
+    database (output_file_selected + '_database.db' unless database_output_file is given, with table_suffix added
+    to the names of the tables) and the MS Excel summary. The results are added to result_entry (if any, see
+    result_cache.ResultEntry). Returns True if all the output files have been created.
+    """
+    try:
+        update_progress('Building output files', 0, 1)
+        results = build_report_results(attach_inspection_metadata(sorted_df, inspections))
+        if result_entry is not None:
+            result_entry.add(**results)
+        update_progress('Building output files', 1, 1)
+        return write_report_outputs(results, output_file_selected, output_format, database_output_file, table_suffix, replace_answers)
+
+    except Exception as e:
+        print("Oops!", e.__class__, "occurred.")
+        PrintException()
+
+def create_report_outputs_from_cache(result_entry, output_file_selected, output_format='csv'):
+    # Output files of a file whose results are in the result cache: the combined label file is copied from the cache
+    try:
+        results = result_entry.results
+        print_removed_records(results['removed_records'], results['number_of_records'])
+        first_output_file = output_file_name(combined_label_file_name(output_file_selected), output_format)
+        if first_output_file:
+            with span('csv'):
+                result_entry.restore_file(COMBINED_LABEL_ENTRY_FILE + Path(first_output_file).suffix, first_output_file)
+            print_combined_label_file(first_output_file)
+
+        updateStatusBar("Building output files...",False)
+        update_progress('Building output files', 1, 1)
+        return write_report_outputs(results, output_file_selected, output_format)
+
+    except Exception as e:
+        print("Oops!", e.__class__, "occurred.")
+        PrintException()
+
+def save_report_results(result_entry, successful, output_file_selected, output_format='csv'):
+    # Save the results of a run that has created all its output files into the result cache, with its combined label file (if any)
+    if result_entry is None or not successful:
+        return
+    first_output_file = output_file_name(combined_label_file_name(output_file_selected), output_format)
+    result_entry.save({COMBINED_LABEL_ENTRY_FILE + Path(first_output_file).suffix: first_output_file} if first_output_file else {})
+
+def write_report_outputs(results, output_file_selected, output_format='csv', database_output_file=None, table_suffix='', replace_answers=True):
+    """
+    Write the output files of the results of build_report_results (see create_report_outputs) that are turned on
+    (see outputs.set_output_options), at the same time in the pool of output writers. A file that can't be written
+    is reported and the others are still written. Returns True if all of them have been created.
+    """
+    try:
+        sorted_df, parts_replaced_df, devices_df, kpis = results['main'], results['parts'], results['devices'], results['kpis']
+        number_of_rows = parts_replaced_df.shape[0] + devices_df.shape[0] + sorted_df.shape[0]
+
+        printToScreen(f"\nNumber of records: {sorted_df.shape[0]}.")
+        # ANALIZE THE DATA IN THE FILE (one pass over each column, see compute_kpis), printed before the writers start
+        with span('kpis output', rows_in=sorted_df.shape[0]):
+            print_kpis(kpis)
+
+        def write_table_file(data_frame, csv_file_name, message):
+            printToScreen(message + write_output_table(data_frame, csv_file_name, output_format))
+
+        def write_kpis_file():
+            kpi_file_name = output_file_selected[:-4] + KPI_FILE_SUFFIX
+            write_kpis_json(kpis, kpi_file_name)
+            printToScreen("\nKPIs have been written into file: " + kpi_file_name)
+
+        def write_database():
+            # *********** CREATE SQLITE DATABASE **************************************
+            printToScreen('\nCreating sqlite database...')
+            database_file = database_output_file or output_file_selected[:-4] +  "_database.db"
+            # Write the 3 tables and the KPIs in one transaction (a table that fails is reported and the others are still written)
+            tables = {MAIN_TABLE: sorted_df, REPLACED_PARTS_TABLE: parts_replaced_df, DEVICES_TABLE: devices_df, **kpi_tables(kpis)}
+            write_report_database(database_file, dict((table_name + table_suffix, data_frame) for table_name, data_frame in tables.items()),
+                                  answers_of=MAIN_TABLE + table_suffix, replace_answers=replace_answers)
+            printToScreen("\nSQL database file is: " + database_file + "\n")
+
+        def write_excel_file():
+            # Create MSExcel file with the 3 dataframes and the KPIs, written row by row (see write_summary_workbook)
+            excel_file_name = output_file_selected[:-4] + "_SUMMARY.xlsx"
+            excel_main_df = sorted_df
+            if SERVICE_DATE_COLUMN in sorted_df.columns:
+                # Convert to Year-Month period (UTC), on a copy so the results keep the columns of the main table
+                excel_main_df = sorted_df.assign(YearMonth=sorted_df[SERVICE_DATE_COLUMN].dt.tz_localize(None).dt.to_period('M'))
+            write_summary_workbook(excel_file_name, {'Parts Replaced': parts_replaced_df, 'Devices': devices_df, 'Main': excel_main_df}, kpis)
+            printToScreen("\n A summary MS Excel file has been created. It contains all the data and it can be used for further analysis: " + excel_file_name + "\n")
+
+        # (description, span, rows, write function) of every output file that is turned on, the longest first
+        tasks = []
+        if artifact_enabled('excel'):
+            tasks.append(('MS Excel summary', 'excel', number_of_rows, write_excel_file))
+        if artifact_enabled('sqlite'):
+            tasks.append(('sqlite database', 'sqlite', number_of_rows, write_database))
+        if artifact_enabled('csv'):
+            tasks += [('main table file', 'csv', sorted_df.shape[0], lambda: write_table_file(sorted_df, output_file_selected,
+                           "\n File with one row per inspection and inspection questions as columns has been created: ")),
+                      ('parts replaced file', 'csv', parts_replaced_df.shape[0], lambda: write_table_file(parts_replaced_df,
+                           output_file_selected[:-4] + "_PartsReplaced.csv", "Parts replaced data have been extracted into file: ")),
+                      ('devices file', 'csv', devices_df.shape[0], lambda: write_table_file(devices_df,
+                           output_file_selected[:-4] + "_devices.csv", "Devices data have been extracted into file: "))]
+        if artifact_enabled('kpis'):
+            tasks.append(('KPIs file', 'kpis', sorted_df.shape[0], write_kpis_file))
+
+        updateStatusBar("Writing output files...",False)
+        return write_output_files(tasks)
+
+    except Exception as e:
+        print("Oops!", e.__class__, "occurred.")
+        PrintException()
@@ -0,0 +1,195 @@
+# Result cache of the reports of an input file.
+# Analysts run the same export many times a day. The results of a run (main table, parts replaced, devices, KPIs,
+# records removed and the combined label file) are saved in one directory per key: the sha256 of the content of the
+# input file, the version of the pipeline (VERSION and the source code of this package) and the options that change
+# the results. A run of the same file with the same options takes the results from the cache and only writes the
+# output files; a file or pipeline that has changed gets another key and is processed again.
+# The results are pickled (a fast binary format) and the least recently used entries are removed when the cache is
+# bigger than its maximum size. Loading a pickle can run any code, so the cache directory must be trusted: it is the
+# cache of the user, and a directory that other users can write to is not used (see trusted_directory).
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import stat
+from datetime import datetime
+from pathlib import Path
+
+from .constants import *
+from .profiling import span
+from .progress import printToScreen
+
+
+result_cache_directory = os.path.join(os.path.expanduser('~'), TEMPLATE_CACHE_DIRECTORY, RESULT_CACHE_DIRECTORY_NAME)
+result_cache_max_mb = RESULT_CACHE_MAX_MB
+source_version = None  # hash of the source code of the package, computed once
+
+
+def set_result_cache(new_result_cache_directory, new_result_cache_max_mb=RESULT_CACHE_MAX_MB):
+    # Cache directory (None to process every file again) and maximum size of the next runs
+    global result_cache_directory, result_cache_max_mb
+    result_cache_directory = new_result_cache_directory
+    result_cache_max_mb = new_result_cache_max_mb
+
+def get_result_cache_directory():
+    return result_cache_directory
+
+def file_content_hash(file_name, block_size=RESULT_CACHE_BLOCK_SIZE):
+    # sha256 of the content of a file, read block_size bytes at a time
+    digest = hashlib.sha256()
+    with open(file_name, 'rb') as input_file:
+        for block in iter(lambda: input_file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def pipeline_version():
+    # VERSION and the hash of the source code of the package: any change of the processing invalidates the cache
+    global source_version
+    if source_version is None:
+        digest = hashlib.sha256()
+        for source_file in sorted(Path(__file__).parent.glob('*.py')):
+            digest.update(source_file.name.encode() + source_file.read_bytes())
+        source_version = digest.hexdigest()
+    return VERSION.strip() + ' ' + source_version[:16]
+
+def result_cache_key(input_file, **options):
+    # Key of the results of input_file processed with options (e.g. the output format)
+    key = {'content': file_content_hash(input_file), 'pipeline': pipeline_version(), 'options': options}
+    return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class EntryTooLargeError(Exception):
+    pass
+
+
+class LimitedFile:
+    # Binary file that raises EntryTooLargeError as soon as more than max_bytes would be written into it
+    def __init__(self, file, max_bytes):
+        self.file = file
+        self.max_bytes = max_bytes
+        self.size = 0
+
+    def write(self, data):
+        self.size += memoryview(data).nbytes
+        if self.size > self.max_bytes:
+            raise EntryTooLargeError(f"the results are larger than the {self.max_bytes / 1024 / 1024:,.0f} MB of the result cache")
+        return self.file.write(data)
+
+
+def trusted_directory(directory):
+    # False if directory (or the nearest directory of it that exists) can be written by other users
+    path = Path(directory)
+    while not path.exists() and path != path.parent:
+        path = path.parent
+    return os.name != 'posix' or not path.stat().st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+class ResultEntry:
+    """
+    Entry of the result cache for an input file and options. If the entry exists, load fills results and hit is True;
+    otherwise the run adds its results with add and they are written into the cache with save.
+    """
+    def __init__(self, directory, key):
+        self.path = Path(directory) / key
+        self.results = {}
+        self.hit = False
+
+    def load(self):
+        results_file = self.path / RESULTS_FILE_NAME
+        if not results_file.exists():
+            return False
+        try:
+            with open(results_file, 'rb') as cached_file:
+                self.results = pickle.load(cached_file)
+            os.utime(results_file)  # the time of the last use, for the eviction
+            self.hit = True
+        except Exception as e:
+            # e.g. an entry written by another version of pandas: it is processed again and replaced
+            print("Oops!", e.__class__, "occurred.")
+            printToScreen(f"Result cache entry {self.path} can't be read: {e}")
+            self.results = {}
+        return self.hit
+
+    def add(self, **results):
+        self.results.update(results)
+
+    def save(self, files):
+        """
+        Write the results and a copy of files ({name in the entry: file name}, e.g. the combined label file) into the
+        cache, then remove the least recently used entries above the maximum size of the cache.
+        An entry larger than the cache is not saved: the size of files is checked before they are copied, and the
+        results stop being written as soon as the entry is larger than the cache.
+        """
+        max_bytes = result_cache_max_mb * 1024 * 1024
+        temporary_path = self.path.with_name(f'{self.path.name}.{os.getpid()}.tmp')
+        try:
+            files_size = sum(os.path.getsize(file_name) for file_name in files.values())
+            if files_size > max_bytes:
+                raise EntryTooLargeError(f"the output files are larger than the {result_cache_max_mb:,} MB of the result cache")
+            shutil.rmtree(temporary_path, ignore_errors=True)
+            temporary_path.mkdir(parents=True)
+            for name, file_name in files.items():
+                shutil.copyfile(file_name, temporary_path / name)
+            self.results['saved_at'] = datetime.now().isoformat(timespec='seconds')
+            with open(temporary_path / RESULTS_FILE_NAME, 'wb') as cached_file:
+                pickle.dump(self.results, LimitedFile(cached_file, max_bytes - files_size), protocol=pickle.HIGHEST_PROTOCOL)
+            # the entry appears complete or not at all (another process may be saving the same entry)
+            shutil.rmtree(self.path, ignore_errors=True)
+            os.replace(temporary_path, self.path)
+        except EntryTooLargeError as e:
+            printToScreen(f"The results are not saved into the result cache: {e}")
+            shutil.rmtree(temporary_path, ignore_errors=True)
+            return
+        except OSError as e:
+            print("Oops!", e.__class__, "occurred.")
+            printToScreen(f"The results could not be saved into the result cache: {e}")
+            shutil.rmtree(temporary_path, ignore_errors=True)
+            return
+        printToScreen("Results saved into the result cache: " + str(self.path))
+        evict_entries(self.path.parent, result_cache_max_mb)
+
+    def restore_file(self, name, file_name):
+        # Copy file name of the entry (see save) to file_name
+        shutil.copyfile(self.path / name, file_name)
+        return file_name
+
+
+def evict_entries(directory, max_mb=RESULT_CACHE_MAX_MB):
+    # Remove the least recently used entries of the cache directory until it is not bigger than max_mb
+    entries = []
+    for path in Path(directory).iterdir():
+        results_file = path / RESULTS_FILE_NAME
+        if path.is_dir() and results_file.exists():
+            size = sum(entry_file.stat().st_size for entry_file in path.iterdir())
+            entries.append((results_file.stat().st_mtime, size, path))
+    total_size = sum(size for last_used, size, path in entries)
+    for last_used, size, path in sorted(entries):
+        if total_size <= max_mb * 1024 * 1024:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total_size -= size
+        printToScreen(f"Result cache entry removed (least recently used, the cache is limited to {max_mb:,} MB): {path.name}")
+
+def open_result_entry(input_file, **options):
+    """
+    Entry of the result cache for input_file processed with options, with the results loaded if they are in the
+    cache (see ResultEntry). None if the result cache is turned off, its directory can be written by other users
+    or the file can't be read.
+    """
+    if not result_cache_directory:
+        return None
+    if not trusted_directory(result_cache_directory):
+        printToScreen(f"Result cache not used: {result_cache_directory} can be written by other users.")
+        return None
+    with span('result cache'):
+        try:
+            entry = ResultEntry(result_cache_directory, result_cache_key(input_file, **options))
+        except OSError as e:
+            print("Oops!", e.__class__, "occurred.")
+            printToScreen(f"Result cache not used: {e}")
+            return None
+        if entry.load():
+            printToScreen(f"\nThe results of this file are taken from the result cache (saved on {entry.results.get('saved_at')}): {entry.path}")
+    return entry
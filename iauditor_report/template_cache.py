@@ -0,0 +1,128 @@
+# Persistent cache of the combined labels of the template questions (see wrangling.resolve_combined_labels).
+# The combined label of a record depends only on the structure of its template: the TEMPLATE_STRUCTURE_COLUMNS of
+# the record and the label of its parent question. The thousands of reports of a template repeat the same few
+# questions, so the labels resolved in a run are saved in a sqlite file per (template_id, item_id), with a
+# structural hash of those values and the parent item_id. The next runs resolve the records of the questions
+# already seen with one join against the cache. A question whose structure has changed (e.g. renamed in the
+# template, or its parent question renamed) has another structural hash: it is resolved again and its entry replaced.
+
+import os
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .constants import *
+from .progress import printToScreen
+from .wrangling import as_label_text, build_item_label_index, parent_item_ids, resolve_combined_labels
+
+
+template_cache_file = None  # the cache is only used if it is turned on (see set_template_cache_file)
+
+
+def set_template_cache_file(new_template_cache_file):
+    # Cache file of the next runs (the command line uses TEMPLATE_CACHE_FILE_NAME in TEMPLATE_CACHE_DIRECTORY of the home
+    # directory), None to resolve all the labels without cache
+    global template_cache_file
+    template_cache_file = new_template_cache_file
+
+def get_template_cache_file():
+    return template_cache_file
+
+def open_template_cache(cache_file):
+    # Connection to the cache file, created with its tables the first time
+    cache_directory = os.path.dirname(os.path.abspath(cache_file))
+    os.makedirs(cache_directory, exist_ok=True)
+    conn = sqlite3.connect(cache_file, timeout=TEMPLATE_CACHE_TIMEOUT)
+    conn.execute(f'''CREATE TABLE IF NOT EXISTS template_items (
+                         "{TEMPLATE_ID_COLUMN}" TEXT, "{ITEM_ID_COLUMN}" TEXT, structure_hash INTEGER, parent_item_id TEXT,
+                         combined_label TEXT, PRIMARY KEY ("{TEMPLATE_ID_COLUMN}", "{ITEM_ID_COLUMN}"))''')
+    conn.execute(f'''CREATE TABLE IF NOT EXISTS templates (
+                         "{TEMPLATE_ID_COLUMN}" TEXT PRIMARY KEY, questions INTEGER, updated_at TEXT)''')
+    return conn
+
+def template_structure(this_data):
+    """
+    Distinct question structures (TEMPLATE_STRUCTURE_COLUMNS) of the records of this_data, from one hash per record
+    (the hash of a value is the same for text, object and categorical columns).
+    Returns the first record of every structure, its hash and the position of the structure of every record.
+    """
+    record_hash = pd.util.hash_pandas_object(this_data[TEMPLATE_STRUCTURE_COLUMNS], index=False).to_numpy()
+    is_first = ~pd.Series(record_hash).duplicated().to_numpy()
+    position = pd.Index(record_hash[is_first]).get_indexer(record_hash)
+    return this_data[is_first], record_hash[is_first], position
+
+def structure_hashes(structure, structure_hash, label_index):
+    """
+    Structural hash of every question of structure (see template_structure): the hash of its TEMPLATE_STRUCTURE_COLUMNS
+    and of the label of its parent question in label_index (the labels resolve_combined_labels uses). Returns the hashes,
+    the parent item_id of every question and a mask of the questions that can be cached: the questions whose item_id,
+    and the item_id of their parent, have one structure in this data.
+    """
+    parent_id = parent_item_ids(structure, as_label_text(structure[QUESTION_COLUMN]))[1].reindex(structure.index)
+    parent_label = parent_id.map(label_index)
+
+    item_ids = structure[ITEM_ID_COLUMN].astype(object)
+    is_ambiguous = item_ids.duplicated(keep=False)
+    key_values = pd.DataFrame({'structure': structure_hash, 'parent label': parent_label.values})
+    hashes = pd.util.hash_pandas_object(key_values, index=False).to_numpy().view(np.int64)
+    cacheable = (~is_ambiguous & ~parent_id.isin(set(item_ids[is_ambiguous]))).to_numpy()
+    return hashes, parent_id, cacheable
+
+def resolve_combined_labels_with_cache(this_data, cache_file, label_index=None):
+    """
+    Same values as resolve_combined_labels(this_data, label_index=label_index), with the labels of the
+    questions found in the template cache cache_file taken from it. The labels of the other questions are resolved
+    and saved into the cache. If the cache can't be read or written, the labels are still resolved without it.
+    """
+    if this_data.empty or any(column not in this_data.columns for column in TEMPLATE_STRUCTURE_COLUMNS):
+        return resolve_combined_labels(this_data, label_index=label_index)
+
+    label_index = build_item_label_index(this_data) if label_index is None else label_index
+    structure, structure_hash, position = template_structure(this_data)
+    hashes, parent_id, cacheable = structure_hashes(structure, structure_hash, label_index)
+    template_ids = structure[TEMPLATE_ID_COLUMN].astype(object)
+    cacheable = cacheable & template_ids.notna().to_numpy()  # the questions of the records without template (e.g. of the title page) are not cached
+    try:
+        conn = open_template_cache(cache_file)
+    except (sqlite3.Error, OSError) as e:
+        printToScreen(f"Template cache {cache_file} can't be opened ({e.__class__.__name__}: {e}): the labels are resolved without it.")
+        return resolve_combined_labels(this_data, label_index=label_index)
+
+    try:
+        templates = sorted(set(template_ids[cacheable]))
+        cached = pd.read_sql_query('SELECT structure_hash, combined_label FROM template_items WHERE '
+                                   f'"{TEMPLATE_ID_COLUMN}" IN ({", ".join("?" for template in templates)})', conn, params=templates)
+        cached_position = pd.Index(cached['structure_hash'].to_numpy(dtype=np.int64)).get_indexer(hashes)
+        is_hit = cacheable & (cached_position >= 0)
+
+        combined = np.full(this_data.shape[0], None, dtype=object)
+        record_is_hit = is_hit[position]
+        cached_labels = cached['combined_label'].to_numpy(dtype=object)
+        cached_labels[pd.isna(cached_labels)] = None  # questions that can't be resolved (as resolve_combined_labels returns them)
+        combined[record_is_hit] = cached_labels[cached_position[position[record_is_hit]]]
+        if not record_is_hit.all():
+            combined[~record_is_hit] = resolve_combined_labels(this_data, label_index=label_index,
+                                                               rows=~record_is_hit).to_numpy(dtype=object)
+        printToScreen(f'Template cache: {record_is_hit.sum():,} of {this_data.shape[0]:,} records resolved from the cache.')
+
+        # questions resolved in this run (the label of a structure is the label of its first record)
+        is_new = cacheable & ~is_hit
+        if is_new.any():
+            first_record = np.flatnonzero(~pd.Series(position).duplicated().to_numpy())  # structure order
+            new_items = zip(template_ids[is_new], structure.loc[is_new, ITEM_ID_COLUMN].astype(object), hashes[is_new].tolist(),
+                            parent_id[is_new].where(parent_id[is_new].notna(), None), combined[first_record[is_new]])
+            conn.executemany('INSERT OR REPLACE INTO template_items VALUES (?, ?, ?, ?, ?)', new_items)
+            updated_at = datetime.now().isoformat(timespec='seconds')
+            conn.executemany(f'''INSERT OR REPLACE INTO templates VALUES (?, (SELECT COUNT(*) FROM template_items
+                                 WHERE "{TEMPLATE_ID_COLUMN}" = ?), ?)''',
+                             [(template, template, updated_at) for template in sorted(set(template_ids[is_new]))])
+            conn.commit()
+    except sqlite3.Error as e:
+        printToScreen(f"Template cache {cache_file} can't be used ({e.__class__.__name__}: {e}): the labels are resolved without it.")
+        return resolve_combined_labels(this_data, label_index=label_index)
+    finally:
+        conn.close()
+
+    return pd.Series(combined, index=this_data.index, dtype=object)
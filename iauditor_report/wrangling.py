@@ -0,0 +1,541 @@
+# Data wrangling of the inspection_items table exported from iAuditor: combined question labels,
+# pivot to one row per report and extraction of the part and device groups.
+
+import re
+
+import numpy as np
+import pandas as pd
+
+from .constants import *
+from .dates import parse_dates, format_date_report
+from .profiling import span
+from .progress import PrintException, printToScreen, printToScreen_with_timestamp, updateStatusBar
+
+
+def extract_repeating_group(the_data_frame, prefix, fields, carry_columns, required_fields=None):
+    """ 
+    The iAuditor form repeats groups of fields for parts, devices, etc. After the pivot each
+    group becomes a set of columns named '<Prefix> <n> - <Field>' where <n> is the index of
+    the group (1, 2, 3, ...).
+
+    This function parses those column names once and reshapes the wide columns into one row
+    per (row of the_data_frame, group index) in a single pass. carry_columns (e.g. AUDIT_ID_COLUMN)
+    are repeated on every new row. New columns are named '<Prefix> - <Field>'.
+
+    Empty groups are dropped with a mask: a group is kept when any of required_fields
+    (all fields if None) has a value.
+
+    """ 
+
+    pattern = re.compile(r'^' + re.escape(prefix) + r' (\d+) - (.+)$')
+    group_columns = {}  # (group index, field) -> column name
+    for name in the_data_frame.columns:
+        match = pattern.match(str(name))
+        if match and match.group(2) in fields:
+            group_columns[(int(match.group(1)), match.group(2))] = name
+
+    group_numbers = sorted({number for number, field in group_columns})
+    printToScreen(f'{prefix}: {len(group_numbers)} groups found')
+    number_of_rows = the_data_frame.shape[0]
+    number_of_groups = len(group_numbers)
+
+    # Fill one (rows x groups) block per field. Group i of row r ends up at position r * groups + i
+    blocks = {}
+    for field in fields:
+        block = np.full((number_of_rows, number_of_groups), np.nan, dtype=object)
+        for position, number in enumerate(group_numbers):
+            name = group_columns.get((number, field))
+            if name is not None:
+                block[:, position] = the_data_frame[name].to_numpy(dtype=object)
+        blocks[field] = block
+
+    if required_fields is None:
+        required_fields = fields
+    has_data = np.zeros((number_of_rows, number_of_groups), dtype=bool)
+    for field in required_fields:
+        has_data |= ~pd.isna(blocks[field])
+    keep = has_data.ravel()
+
+    new_df = pd.DataFrame({
+        column: np.repeat(the_data_frame[column].to_numpy(dtype=object) if column in the_data_frame.columns
+                          else np.full(number_of_rows, np.nan, dtype=object), number_of_groups)[keep]
+        for column in carry_columns
+    })
+    for field in fields:
+        new_df[f'{prefix} - {field}'] = blocks[field].ravel()[keep]
+
+    return new_df
+
+def get_device_data(the_data_frame):
+    """ 
+    The iAuditor form collects information about devices used during the intervention. 
+    There are 3 fields devices (listed below where [nn] is the index of the part. The
+    first device is 1, the second device is 2, and so on). 
+        Device [nn] - Indicate type:
+        Device [nn] - Serial Number
+        Device [nn] - Type of tool
+
+    This function extract the information about devices by AUDIT_ID_COLUMN.
+
+    """ 
+
+
+    try:
+
+        # One row per AUDIT_ID_COLUMN and device, devices without any value are dropped
+        new_df = extract_repeating_group(the_data_frame, DEVICE_PREFIX, DEVICE_FIELDS, [AUDIT_ID_COLUMN])
+        return new_df
+
+    except Exception as e:
+        print("Oops!", e.__class__, "occurred.")
+        PrintException() 
+
+def get_part_replace_data(the_data_frame):
+    """ 
+    The iAuditor form collects information about parts replaced during the intervention. 
+    There are six fields per part (listed below where [nn] is the index of the part. The
+    first part is 1, the second part is 2, and so on). 
+        Part Data [nn] - Part Designator
+        Part Data [nn] - Part Number
+    	Part Data [nn] - Part Reference Designator (ex. PP601)
+        Part Data [nn] - Quantity	
+        Part Data [nn] - Serial number - NEW part	
+        Part Data [nn] - Serial number - REPLACED part
+
+    This function extract the information about parts replaced by AUDIT_ID_COLUMN.
+
+    """ 
+
+
+    try:
+
+        printToScreen_with_timestamp("Starting part replacement checks...")
+
+        # One row per AUDIT_ID_COLUMN and part. A part is kept if it has a part number or a quantity
+        new_df = extract_repeating_group(the_data_frame, PART_DATA_PREFIX, PART_DATA_FIELDS,
+                                         [AUDIT_ID_COLUMN, SERVICE_DATE_COLUMN],
+                                         required_fields=['Part Number', 'Quantity'])
+
+        printToScreen_with_timestamp("Completed part replacement checks!")
+
+        # Columns to be created
+        new_columns = [AUDIT_ID_COLUMN] + [f'{PART_DATA_PREFIX} - {field}' for field in PART_DATA_FIELDS] + [SERVICE_DATE_COLUMN]
+        return new_df[new_columns]
+
+    except Exception as e:
+        print("Oops!", e.__class__, "occurred.")
+        PrintException() 
+
+def create_combined_label(row, this_data):
+    try:
+
+        if "Anomaly?" in str(row[QUESTION_COLUMN]): # second parent ID tells the question which is the parent
+            # Split PARENT_IDS_COLUMN and get the second item (index 1)
+            parent_ids = row[PARENT_IDS_COLUMN].split(',')
+            if len(parent_ids) > 1:  # Check if there is a second item
+                second_parent_id = parent_ids[1]
+                # Find the QUESTION_COLUMN for the matching ITEM_ID_COLUMN
+                parent_row = this_data[this_data[ITEM_ID_COLUMN] == second_parent_id]
+                if not parent_row.empty:  # Check if the parent row exists
+                    parent_question = parent_row[QUESTION_COLUMN].values[0]  # Get the QUESTION_COLUMN value
+                    return f"{parent_question} - {row[QUESTION_COLUMN]}"
+                else:       
+                    return f"{second_parent_id} - {row[QUESTION_COLUMN]}"
+        elif "if response is" in str(row[QUESTION_COLUMN]): # first parent ID tells the question which is the parent
+            # Split PARENT_IDS_COLUMN and get the second item (index 1)
+            parent_ids = row[PARENT_IDS_COLUMN].split(',')
+            if len(parent_ids) > 1:  # Check if there is a second item
+                first_parent_id = parent_ids[0]
+                # Find the QUESTION_COLUMN for the matching ITEM_ID_COLUMN
+                parent_row = this_data[this_data[ITEM_ID_COLUMN] == first_parent_id]
+                if not parent_row.empty:  # Check if the parent row exists
+                    parent_question = parent_row[QUESTION_COLUMN].values[0]  # Get the QUESTION_COLUMN value
+                    return f"{parent_question} - {row[QUESTION_COLUMN]}"
+                else:       
+                    return f"{first_parent_id} - {row[QUESTION_COLUMN]}"
+        else:
+            return f"{row[QUESTION_CATEGORY_COLUMN]} - {row[QUESTION_COLUMN]}"
+
+    except Exception as e:
+        print("Oops!", e.__class__, "occurred.")
+        PrintException()
+
+def create_combined_label_by_parentIDs(row, this_data):
+    try:
+
+        if "Anomaly?" in str(row[QUESTION_COLUMN]): # second parent ID tells the question which is the parent
+            # Split PARENT_IDS_COLUMN and get the second item (index 1)
+            parent_ids = row[PARENT_IDS_COLUMN].split(',')
+            if len(parent_ids) > 1:  # Check if there is a second item
+                second_parent_id = parent_ids[1]
+                # Find the QUESTION_COLUMN for the matching ITEM_ID_COLUMN
+                parent_row = this_data[this_data[ITEM_ID_COLUMN] == second_parent_id]
+                if not parent_row.empty:  # Check if the parent row exists
+                    parent_question = parent_row[QUESTION_COLUMN].values[0]  # Get the QUESTION_COLUMN value
+                    return f"{parent_question} - {row[QUESTION_COLUMN]} - {row[ITEM_ID_COLUMN]}"
+                else:       
+                    return f"{second_parent_id} - {row[QUESTION_COLUMN]} - {row[ITEM_ID_COLUMN]}"
+        elif "if response is" in str(row[QUESTION_COLUMN]): # first parent ID tells the question which is the parent
+            # Split PARENT_IDS_COLUMN and get the second item (index 1)
+            parent_ids = row[PARENT_IDS_COLUMN].split(',')
+            if len(parent_ids) > 1:  # Check if there is a second item
+                first_parent_id = parent_ids[0]
+                # Find the QUESTION_COLUMN for the matching ITEM_ID_COLUMN
+                parent_row = this_data[this_data[ITEM_ID_COLUMN] == first_parent_id]
+                if not parent_row.empty:  # Check if the parent row exists
+                    parent_question = parent_row[QUESTION_COLUMN].values[0]  # Get the QUESTION_COLUMN value
+                    return f"{parent_question} - {row[QUESTION_COLUMN]} - {row[ITEM_ID_COLUMN]}"
+                else:       
+                    return f"{first_parent_id} - {row[QUESTION_COLUMN]} - {row[ITEM_ID_COLUMN]}"
+        else:
+            return f"{row[QUESTION_CATEGORY_COLUMN]} - {row[QUESTION_COLUMN]} - {row[ITEM_ID_COLUMN]}"
+
+    except Exception as e:
+        print("Oops!", e.__class__, "occurred.")
+        PrintException()
+
+def as_label_text(series):
+    """
+    Convert a column to the text an f-string would produce for each value, so that
+    missing values become 'nan' or 'None' exactly as in create_combined_label.
+    """
+    text = series.astype(object).copy()
+    present = text.notna()
+    text[present] = text[present].astype(str)
+    text[~present] = text[~present].map(str)
+    return text
+
+def build_item_label_index(this_data):
+    """
+    Build the ITEM_ID_COLUMN -> QUESTION_COLUMN lookup used to resolve parent questions.
+    The first occurrence of each item_id wins, which is the row the boolean scan in
+    create_combined_label returns.
+    """
+    first_rows = ~this_data.duplicated(subset=[ITEM_ID_COLUMN], keep='first')
+    index = pd.Index(this_data.loc[first_rows, ITEM_ID_COLUMN].values)
+    return pd.Series(as_label_text(this_data[QUESTION_COLUMN])[first_rows].values, index=index)
+
+def parent_item_ids(this_data, label_text):
+    """
+    item_id of the parent question of the rows of this_data that have one (label_text is
+    as_label_text(this_data[QUESTION_COLUMN])):
+        "Anomaly?"        -> second parent ID is the parent question
+        "if response is"  -> first parent ID is the parent question
+    Returns a mask of the child rows and the parent item_id of the child rows that have a second parent ID.
+    """
+    is_anomaly = label_text.str.contains("Anomaly?", regex=False)
+    is_response = ~is_anomaly & label_text.str.contains("if response is", regex=False)
+    is_child = is_anomaly | is_response
+
+    parent_id = pd.Series(dtype=object)
+    if is_child.any():
+        parent_ids = this_data.loc[is_child, PARENT_IDS_COLUMN].dropna().astype(str)
+        split_ids = parent_ids.str.split(',', n=2, expand=True)
+        if not parent_ids.empty and split_ids.shape[1] > 1:
+            split_ids = split_ids[split_ids[1].notna()]  # only rows with a second parent ID are resolved
+            parent_id = split_ids[0].where(is_response[split_ids.index], split_ids[1]).astype(object)
+    return is_child, parent_id
+
+def parent_label_index(this_data, parent_ids=None):
+    """
+    build_item_label_index of the parent questions of this_data, the records of a whole input file in the order of
+    the file, as wrangle_inspection_items resolves them: the first record of every parent item_id that is not
+    filtered out or removed as a duplicate. parent_ids are the item_ids of the parent questions (by default, those of
+    the child records of this_data, see parent_item_ids).
+    The shards and chunks of an input file are wrangled with the index of the whole file (see resolve_combined_labels),
+    so every report gets the same labels however the reports are split, and a report gets the same labels whether
+    the other reports are processed in the same run or not (e.g. reports selected by their inspection metadata).
+    """
+    if parent_ids is None:
+        parent_ids = parent_item_ids(this_data, as_label_text(this_data[QUESTION_COLUMN]))[1].unique()
+    is_parent = (this_data[ITEM_ID_COLUMN].isin(parent_ids) & ~this_data[TYPE_COLUMN].isin(EXCLUDED_TYPES)
+                 & this_data[QUESTION_COLUMN].notna()).to_numpy()
+    parents = deduplicate_inspection_items(this_data[is_parent])[0]
+    return build_item_label_index(parents)
+
+def resolve_combined_labels(this_data, include_item_id=False, label_index=None, rows=None):
+    """
+    Vectorized version of create_combined_label (and of create_combined_label_by_parentIDs
+    when include_item_id is True). It returns the same values as
+    this_data.apply(create_combined_label, axis=1, args=(this_data,))
+    but the parent question of every row is found with one lookup in an item_id index
+    instead of a full scan of the data frame per row.
+        "Anomaly?"        -> second parent ID is the parent question
+        "if response is"  -> first parent ID is the parent question
+        anything else     -> QUESTION_CATEGORY_COLUMN - QUESTION_COLUMN
+    Rows that cannot be resolved (no second parent ID, blank parent IDs) are None.
+
+    The parent questions are looked up in label_index (see parent_label_index) if it is given, e.g. when this_data
+    is a shard of the reports of a file, and in the whole of this_data otherwise.
+
+    If rows (a boolean mask) is given, only those rows are resolved (the parent questions are still
+    looked up in the whole of this_data).
+    """
+    target = this_data if rows is None else this_data[rows]
+    label_text = as_label_text(target[QUESTION_COLUMN])
+    is_child, parent_id = parent_item_ids(target, label_text)
+
+    combined = pd.Series(None, index=target.index, dtype=object)
+    combined[~is_child] = as_label_text(target.loc[~is_child, QUESTION_CATEGORY_COLUMN]) + " - " + label_text[~is_child]
+
+    if not parent_id.empty:
+        parent_question = parent_id.map(build_item_label_index(this_data) if label_index is None else label_index)
+        parent_text = parent_question.where(parent_question.notna(), parent_id)
+        combined[parent_id.index] = parent_text + " - " + label_text[parent_id.index]
+
+    if include_item_id:
+        resolved = combined.notna()
+        combined[resolved] = combined[resolved] + " - " + as_label_text(target.loc[resolved, ITEM_ID_COLUMN])
+
+    return combined
+
+def determine_auditID_by_year(dataframe, year):
+
+    SERVICE_DATE_LABEL = 'Service Date (YYYY-MM-DD)*'
+    
+    
+    try:
+        
+        data_in_year = dataframe[dataframe[QUESTION_COLUMN] == SERVICE_DATE_LABEL] 
+        # data_in_year[ANSWER_COLUMN] = pd.to_datetime(data_in_year[ANSWER_COLUMN], errors='coerce')
+        data_in_year[ANSWER_COLUMN], format_report = parse_dates(data_in_year[ANSWER_COLUMN])
+        printToScreen(format_date_report(SERVICE_DATE_LABEL, format_report))
+        
+       # data_in_year.to_csv('datetime_transform.csv') # for debugging
+
+        # Count the number of NaT values in ANSWER_COLUMN
+        num_invalid_dates = data_in_year[ANSWER_COLUMN].isna().sum()
+        printToScreen(f'num_invalid_dates: {num_invalid_dates}')
+        # Drop rows with NaT values in ANSWER_COLUMN
+        data_in_year = data_in_year.dropna(subset=[ANSWER_COLUMN])
+        data_in_year = data_in_year[data_in_year[ANSWER_COLUMN].dt.year == year]
+        unique_audit_ids = data_in_year[AUDIT_ID_COLUMN].unique()
+        
+        return unique_audit_ids
+        
+    except Exception as e:
+        print("Oops!", e.__class__, "occurred.")
+        PrintException()
+
+def deduplicate_inspection_items(data):
+    """
+    Keep one record per item of a report (AUDIT_ID_COLUMN and ITEM_ID_COLUMN, the id of the record): the one with the
+    latest MODIFIED_AT_COLUMN, e.g. when the records of several exports are combined. The keys are hashed in one pass
+    and the dates are parsed only for the items that have more than one record, so nothing is sorted.
+    Records without ITEM_ID_COLUMN are only removed if they are identical to another one.
+
+    Returns the data without MODIFIED_AT_COLUMN, the number of duplicate records (same version as the record kept)
+    and the number of stale versions (older MODIFIED_AT_COLUMN than the record kept) removed.
+    """
+    keep = np.ones(data.shape[0], dtype=bool)
+    duplicates = stale_versions = 0
+
+    has_key = data[ITEM_ID_COLUMN].notna().to_numpy()
+    keys = data[[AUDIT_ID_COLUMN, ITEM_ID_COLUMN]] if has_key.all() else data.loc[has_key, [AUDIT_ID_COLUMN, ITEM_ID_COLUMN]]
+    key_codes = pd.factorize(pd.util.hash_pandas_object(keys, index=False).to_numpy())[0]
+    is_repeated = has_key.copy()
+    is_repeated[has_key] = np.bincount(key_codes)[key_codes] > 1 if key_codes.size else False
+    if is_repeated.any():
+        repeated_codes = key_codes[is_repeated[has_key]]
+        if MODIFIED_AT_COLUMN in data.columns:
+            modified_at = parse_dates(data.loc[is_repeated, MODIFIED_AT_COLUMN])[0]
+            modified_at = modified_at.dt.tz_localize(None).to_numpy().view(np.int64)  # NaT is the smallest value
+        else:
+            modified_at = np.zeros(len(repeated_codes), dtype=np.int64)
+        is_latest = modified_at == pd.Series(modified_at).groupby(repeated_codes, sort=False).transform('max').to_numpy()
+        # the latest version can be in several exports: the first record is kept
+        is_kept = is_latest & ~pd.Series(np.where(is_latest, repeated_codes, -1)).duplicated().to_numpy()
+        keep[is_repeated] = is_kept
+        stale_versions = int((~is_latest).sum())
+        duplicates = int((is_latest & ~is_kept).sum())
+
+    if not has_key.all():
+        is_copy = data[~has_key].duplicated().to_numpy()
+        keep[~has_key] = ~is_copy
+        duplicates += int(is_copy.sum())
+
+    columns = [column for column in data.columns if column != MODIFIED_AT_COLUMN]
+    return data.loc[keep, columns], duplicates, stale_versions
+
+def wrangle_inspection_items(this_data, label_index=None, template_cache_file=None):
+    """ 
+    Remove the records that don't have data (types in EXCLUDED_TYPES, blank labels), the duplicates and the stale
+    versions of the records (see deduplicate_inspection_items), add QUESTION_COMBINED_LABEL_COLUMN and sort the records by AUDIT_ID_COLUMN and ITEM_INDEX_COLUMN.
+
+    The parent questions are looked up in label_index (see parent_label_index) if this_data is a part of the reports of a file.
+    If template_cache_file is given, the combined labels of the questions already resolved in previous runs
+    are taken from that template cache (see template_cache.resolve_combined_labels_with_cache).
+
+    Returns the wrangled data frame and a list of (description, number of records removed).
+
+    """ 
+
+    data = this_data
+    removed_records = []
+
+    with span('filter', rows_in=data.shape[0]) as filter_span:
+        # One boolean mask for all the filters, so the data frame is copied once. The records are counted in the order
+        # the filters used to be applied (a record of type 'section' without label counts as a record without label).
+        # remove records of type = 'information' as they don't have data. This is to reduce number of unnecessary columns when creating QUESTION_COMBINED_LABEL_COLUMN
+        keep = (data[TYPE_COLUMN] != 'information').to_numpy(copy=True)
+        removed_records.append(("Records of type 'information'", int((~keep).sum())))
+
+        has_label = data[QUESTION_COLUMN].notna().values  # if the question is blank, there is no valid answer. 
+        removed_records.append(("Records without data in column 'label'", int((keep & ~has_label).sum())))
+        keep &= has_label
+
+        for question_type in ['section', 'signature']:
+            is_type = (data[TYPE_COLUMN] == question_type).values
+            removed_records.append((f"Records of type '{question_type}'", int((keep & is_type).sum())))
+            keep &= ~is_type
+
+        data = data[keep]
+        filter_span.rows_out = data.shape[0]
+
+    # Count and remove duplicates and stale versions, one record per item of a report
+    with span('dedupe', rows_in=data.shape[0]) as dedupe_span:
+        data, duplicates, stale_versions = deduplicate_inspection_items(data)
+        removed_records.append(("Duplicate records", duplicates))
+        removed_records.append(("Stale versions of records (older modified_at)", stale_versions))
+        dedupe_span.rows_out = data.shape[0]
+
+    # Resolve the new column with one item_id -> label index (same output as applying create_combined_label row by row)
+    with span('combined label', rows_in=data.shape[0]) as label_span:
+        if template_cache_file:
+            from .template_cache import resolve_combined_labels_with_cache  # template_cache imports this module
+            data[QUESTION_COMBINED_LABEL_COLUMN] = resolve_combined_labels_with_cache(data, template_cache_file, label_index)
+        else:
+            data[QUESTION_COMBINED_LABEL_COLUMN] = resolve_combined_labels(data, label_index=label_index)
+        data = data.sort_values(by=[AUDIT_ID_COLUMN, ITEM_INDEX_COLUMN])
+        label_span.rows_out = data.shape[0]
+
+    return data, removed_records
+
+def pivot_inspection_items(data):
+    """ 
+    Pivot the dataframe to transform QUESTION_COMBINED_LABEL_COLUMN values into columns while keeping AUDIT_ID_COLUMN.
+    The result has one row per report, sorted by AUDIT_ID_COLUMN.
+
+    Same table as data.pivot_table(index=AUDIT_ID_COLUMN, columns=QUESTION_COMBINED_LABEL_COLUMN,
+    values=ANSWER_COLUMN, aggfunc='first'), built without the groupby-aggregate: reports and questions
+    are factorized into integer codes and the answers are scattered into the table, the first answer of
+    each (report, question) wins. Only the answered records are used, so reports and questions without
+    any answer are left out, as pivot_table does. The question columns are object columns.
+
+    The answers are scattered at once into one dense object array of questions x reports, the layout pandas
+    keeps the block of the columns in, so the data frame wraps it without a copy and every column is
+    contiguous. The table is dense: it takes one pointer per (question, report) cell, answered or not, so
+    the memory grows with the number of reports times the number of questions of all their templates
+    (see the reports by template for exports with many templates).
+
+    If data has TEMPLATE_ID_COLUMN, the template of each report is the column after AUDIT_ID_COLUMN.
+
+    Returns the table and the number of answers dropped because the question had already been answered in the report.
+    """ 
+
+    answered = data[ANSWER_COLUMN].notna() & data[AUDIT_ID_COLUMN].notna() & data[QUESTION_COMBINED_LABEL_COLUMN].notna()
+    answered_data = data[answered]
+
+    audit_codes, audit_ids = pd.factorize(answered_data[AUDIT_ID_COLUMN], sort=True)
+    label_codes, labels = pd.factorize(answered_data[QUESTION_COMBINED_LABEL_COLUMN], sort=True)
+
+    # first answer of every (report, question), in the order of the records
+    is_first = ~pd.Series(audit_codes.astype(np.int64) * len(labels) + label_codes).duplicated(keep='first').values
+    collisions = int((~is_first).sum())
+
+    question_columns = np.full((len(labels), len(audit_ids)), np.nan, dtype=object)
+    question_columns[label_codes[is_first], audit_codes[is_first]] = answered_data[ANSWER_COLUMN].to_numpy(dtype=object)[is_first]
+
+    # object columns: converting the whole table to the 'str' dtype would take longer than the pivot itself
+    pivoted_df = pd.DataFrame(question_columns.T, columns=pd.Index(labels, name=QUESTION_COMBINED_LABEL_COLUMN), dtype=object, copy=False)
+    pivoted_df.insert(0, AUDIT_ID_COLUMN, pd.Series(audit_ids).astype(answered_data[AUDIT_ID_COLUMN].dtype))
+    if TEMPLATE_ID_COLUMN in answered_data.columns:
+        template_of_report = answered_data[TEMPLATE_ID_COLUMN].astype(object).groupby(audit_codes).first()
+        pivoted_df.insert(1, TEMPLATE_ID_COLUMN, template_of_report.reindex(range(len(audit_ids))).to_numpy())
+
+    return pivoted_df, collisions
+
+def merge_pivoted_chunks(pivoted_chunks):
+    """ 
+    Concatenate the tables returned by pivot_inspection_items for chunks of complete reports.
+    The columns are the union of the questions of all chunks, in the same order pivot_table
+    would have produced for the whole data set, and the rows are sorted by AUDIT_ID_COLUMN.
+    The questions of every chunk are copied once into one dense object array of questions x reports
+    (see pivot_inspection_items), in the sorted order of the rows, so the table is one block of
+    columns that is not fragmented and is not copied again to be sorted. Like the table of
+    pivot_inspection_items, it is dense.
+    """ 
+
+    if not pivoted_chunks:
+        return pd.DataFrame(columns=[AUDIT_ID_COLUMN])
+
+    chunk_columns = [[column for column in chunk.columns if column not in REPORT_COLUMNS] for chunk in pivoted_chunks]
+    report_columns = [column for column in REPORT_COLUMNS if any(column in chunk.columns for chunk in pivoted_chunks)]
+    labels = sorted(set().union(*chunk_columns))
+    label_positions = pd.Index(labels)
+
+    audit_ids = pd.concat([chunk[AUDIT_ID_COLUMN] for chunk in pivoted_chunks], ignore_index=True)
+    order = audit_ids.argsort(kind='stable').to_numpy()
+    row_positions = np.empty(len(order), dtype=np.intp)
+    row_positions[order] = np.arange(len(order))
+
+    question_columns = np.full((len(labels), len(order)), np.nan, dtype=object)
+    start = 0
+    for chunk, columns in zip(pivoted_chunks, chunk_columns):
+        rows = row_positions[start:start + chunk.shape[0]]
+        start += chunk.shape[0]
+        if columns:
+            question_columns[np.ix_(label_positions.get_indexer(columns), rows)] = chunk[columns].to_numpy(dtype=object).T
+
+    merged_df = pd.DataFrame(question_columns.T, columns=pd.Index(labels, name=QUESTION_COMBINED_LABEL_COLUMN), dtype=object, copy=False)
+    for position, column in enumerate(report_columns):
+        values = pd.concat([chunk[column] if column in chunk.columns else pd.Series(np.nan, index=chunk.index, dtype=object)
+                            for chunk in pivoted_chunks], ignore_index=True)
+        merged_df.insert(position, column, values.iloc[order].reset_index(drop=True))
+    return merged_df
+
+def split_main_table(sorted_df):
+    """ 
+    Move the part and device groups of the pivoted table into their own tables and add the
+    service date columns. Returns the main table, the parts replaced and the devices.
+    """ 
+
+    # extract the information about parts replaced
+    printToScreen_with_timestamp("\nExtracting parts replaced data...")
+    updateStatusBar("Extracting parts replaced data...",False)        
+    with span('parts', rows_in=sorted_df.shape[0]) as parts_span:
+        parts_replaced_df = get_part_replace_data(sorted_df)
+
+        printToScreen_with_timestamp("\nParts replace extraction completed!")
+        printToScreen("Removing columns that start with 'Part Data'...")
+        # remove columns that start with 'Part Data'
+        sorted_df = sorted_df.loc[:, ~sorted_df.columns.str.startswith('Part Data')]
+        parts_span.rows_out = parts_replaced_df.shape[0]
+
+
+    # extract the information about devices
+    printToScreen_with_timestamp("\nExtracting devices data...")
+    updateStatusBar("Extracting devices data...",False)        
+    with span('devices', rows_in=sorted_df.shape[0]) as devices_span:
+        devices_df = get_device_data(sorted_df)
+
+        printToScreen_with_timestamp("\nDevices extraction completed!")
+        printToScreen("Removing columns that start with 'Device'...")
+        # remove columns that start with 'Device'
+        sorted_df = sorted_df.loc[:, ~sorted_df.columns.str.startswith('Device')]
+        devices_span.rows_out = devices_df.shape[0]
+
+
+    if SERVICE_DATE_COLUMN not in sorted_df.columns:
+        # e.g. the main table of a test template, when the reports are processed by template
+        printToScreen(f"\n Column '{SERVICE_DATE_COLUMN}' not found: no date columns added.")
+        return sorted_df, parts_replaced_df, devices_df
+
+    # Add date column (timezone-aware, UTC). Each distinct date text is parsed once
+    sorted_df[SERVICE_DATE_COLUMN], format_report = parse_dates(sorted_df[SERVICE_DATE_COLUMN])
+    printToScreen(format_date_report(SERVICE_DATE_COLUMN, format_report))
+    # Add a new column with the date in "%Y-%m-%d" format
+    sorted_df[SERVICE_DATE_FORMATTED_COLUMN] = sorted_df[SERVICE_DATE_COLUMN].dt.strftime('%Y-%m-%d')
+    printToScreen(f"\n Column '{SERVICE_DATE_FORMATTED_COLUMN}' added.")
+
+    return sorted_df, parts_replaced_df, devices_df
@@ -0,0 +1,23 @@
+# Checks of the long format tables of the output database (see iauditor_report.database).
+
+import sqlite3
+
+import pandas as pd
+
+from iauditor_report.constants import *
+from iauditor_report.database import write_answer_tables
+
+
+def test_answers_are_the_question_columns_only():
+    main_df = pd.DataFrame({AUDIT_ID_COLUMN: ['a', 'b'], TEMPLATE_ID_COLUMN: ['t', 't'], TEMPLATE_NAME_COLUMN: ['Template', 'Template'],
+                            'Question - Answer': ['yes', None], SERVICE_DATE_COLUMN: pd.to_datetime(['2024-01-02', None], utc=True),
+                            SERVICE_DATE_FORMATTED_COLUMN: ['2024-01-02', None]})
+    conn = sqlite3.connect(':memory:')
+    try:
+        assert write_answer_tables(conn, main_df) == 2
+        assert conn.execute(f'SELECT combined_label FROM {QUESTIONS_TABLE} ORDER BY question_id').fetchall() == [
+            ('Question - Answer',), (SERVICE_DATE_COLUMN,)]
+        assert sorted(conn.execute(f'SELECT "{AUDIT_ID_COLUMN}", combined_label, response FROM {ANSWERS_TABLE}').fetchall()) == [
+            ('a', SERVICE_DATE_COLUMN, '2024-01-02 00:00:00+00:00'), ('a', 'Question - Answer', 'yes')]
+    finally:
+        conn.close()
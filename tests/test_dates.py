@@ -0,0 +1,28 @@
+# Checks of the parsing of the date answers (see iauditor_report.dates).
+
+import pandas as pd
+
+from iauditor_report.constants import *
+from iauditor_report.dates import FREE_FORM_FORMAT, UNPARSED_FORMAT, format_date_report, parse_dates
+
+
+def test_formats_are_tried_in_order_then_free_form():
+    values = pd.Series(['2024-11-12T14:01:35Z', '2024-10-11T05:58:03.949Z', '2024-11-12T14:01:35Z', '5 March 2024 10:00', None, 'not a date'],
+                       index=[10, 11, 12, 13, 14, 15])
+    dates, format_report = parse_dates(values)
+
+    assert dates.index.tolist() == values.index.tolist()
+    assert str(dates.dtype) == 'datetime64[ns, UTC]'
+    assert dates.iloc[:4].tolist() == [pd.Timestamp(text, tz='UTC') for text in ['2024-11-12 14:01:35', '2024-10-11 05:58:03.949',
+                                                                                  '2024-11-12 14:01:35', '2024-03-05 10:00:00']]
+    assert dates.iloc[4:].isna().all()
+    # one count per value (the repeated text counts twice), the blank value is not counted
+    assert format_report == {DATE_FORMATS[0]: 2, DATE_FORMATS[1]: 1, **dict((date_format, 0) for date_format in DATE_FORMATS[2:]),
+                             FREE_FORM_FORMAT: 1, UNPARSED_FORMAT: 1}
+    assert format_date_report('date', format_report) == (
+        f"Dates in column 'date' per format: '{DATE_FORMATS[0]}': 2, '{DATE_FORMATS[1]}': 1, '{FREE_FORM_FORMAT}': 1, '{UNPARSED_FORMAT}': 1")
+
+def test_free_form_parser_is_optional():
+    dates, format_report = parse_dates(['2024-11-12T14:01:35Z', '5 March 2024 10:00'], free_form=False)
+    assert dates.isna().tolist() == [False, True]
+    assert FREE_FORM_FORMAT not in format_report and format_report[UNPARSED_FORMAT] == 1
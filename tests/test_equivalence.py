@@ -0,0 +1,262 @@
+# Equivalence checks of the processing modes on the sample export (inspection_items.csv, inspections.csv and sqlite.db
+# in the root of the repository): every mode must create the same output files as the serial processing of the csv
+# file, and the serial processing must give the labels and the table of the original row by row functions.
+
+import shutil
+import sqlite3
+import warnings
+import zipfile
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from iauditor_report.cli import main
+from iauditor_report.constants import *
+from iauditor_report.progress import clear_printed_text, get_printed_text
+from iauditor_report.readers import export_inspection_items_csv, read_inspection_items_csv
+from iauditor_report.report import create_iAuditor_report_from_csv
+from iauditor_report.wrangling import create_combined_label, wrangle_inspection_items, pivot_inspection_items, merge_pivoted_chunks
+
+
+SAMPLE_DIRECTORY = Path(__file__).resolve().parent.parent
+SAMPLE_FILES = ['inspection_items.csv', 'inspections.csv', 'sqlite.db']
+
+
+@pytest.fixture
+def sample(tmp_path):
+    # Copy of the sample export, so the runs don't write next to the files of the repository
+    for file_name in SAMPLE_FILES:
+        shutil.copy(SAMPLE_DIRECTORY / file_name, tmp_path / file_name)
+    return tmp_path
+
+@pytest.fixture
+def exported_sample(sample):
+    # The sample db file and the csv files of its inspection_items and inspections tables, exported next to it
+    inspection_items_file = Path(export_inspection_items_csv(sample / 'sqlite.db'))
+    conn = sqlite3.connect(sample / 'sqlite.db')
+    try:
+        pd.read_sql_query(f'SELECT * FROM {INSPECTIONS_TABLE}', conn).to_csv(
+            inspection_items_file.with_name(inspection_items_file.name.replace(INSPECTION_ITEMS_TABLE, INSPECTIONS_TABLE)))
+    finally:
+        conn.close()
+    return sample / 'sqlite.db', inspection_items_file
+
+def run(input_file, output_dir, *options, result_cache=None):
+    # Output directory of a command line run (without the template cache unless it is in options), with the result cache result_cache
+    cache_options = ['--result-cache', str(result_cache)] if result_cache else ['--no-result-cache']
+    assert main([str(input_file), '--output-dir', str(output_dir), *cache_options, '--quiet', *options]) == 0
+    output_directories = [path for path in Path(output_dir).iterdir() if path.is_dir()]
+    assert len(output_directories) == 1
+    return output_directories[0]
+
+def output_contents(output_directory):
+    # Content of every output file (tables of the databases, files of the MS Excel workbooks), without the run report
+    contents = {}
+    for path in sorted(Path(output_directory).iterdir()):
+        if path.name.endswith(RUN_REPORT_SUFFIX):
+            continue
+        if path.suffix == '.db':
+            conn = sqlite3.connect(path)
+            try:
+                names = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view') ORDER BY name")]
+                contents[path.name] = dict((name, conn.execute(f'SELECT * FROM "{name}"').fetchall()) for name in names)
+            finally:
+                conn.close()
+        elif path.suffix == '.xlsx':
+            with zipfile.ZipFile(path) as workbook:
+                contents[path.name] = dict((name, workbook.read(name)) for name in workbook.namelist() if not name.startswith('docProps'))
+        else:
+            contents[path.name] = path.read_bytes()
+    return contents
+
+def assert_same_outputs(output_directory, expected_directory):
+    contents, expected = output_contents(output_directory), output_contents(expected_directory)
+    assert sorted(contents) == sorted(expected)
+    for name in expected:
+        assert contents[name] == expected[name], name
+
+
+def test_serial_labels_and_pivot_equal_row_by_row_functions(sample):
+    data, removed_records = wrangle_inspection_items(read_inspection_items_csv(sample / 'inspection_items.csv'))
+    records = data.drop(columns=[QUESTION_COMBINED_LABEL_COLUMN])
+    expected_labels = records.apply(create_combined_label, axis=1, args=(records.sort_index(),))
+    assert data[QUESTION_COMBINED_LABEL_COLUMN].equals(expected_labels.astype(object))
+
+    pivoted_df, collisions = pivot_inspection_items(data)
+    expected_df = data.pivot_table(index=AUDIT_ID_COLUMN, columns=QUESTION_COMBINED_LABEL_COLUMN, values=ANSWER_COLUMN, aggfunc='first')
+    questions = pivoted_df.drop(columns=[AUDIT_ID_COLUMN, TEMPLATE_ID_COLUMN]).set_index(pivoted_df[AUDIT_ID_COLUMN])
+    pd.testing.assert_frame_equal(questions, expected_df, check_dtype=False, check_names=False,
+                                  check_index_type=False, check_column_type=False)
+
+def test_merged_chunks_equal_pivot_of_all_reports(sample):
+    data = wrangle_inspection_items(read_inspection_items_csv(sample / 'inspection_items.csv'))[0]
+    audit_ids = data[AUDIT_ID_COLUMN].unique()
+    chunks = [data[data[AUDIT_ID_COLUMN].isin(audit_ids[start::3])] for start in [2, 0, 1]]  # complete reports, not in order
+    merged_df = merge_pivoted_chunks([pivot_inspection_items(chunk)[0] for chunk in chunks])
+    pd.testing.assert_frame_equal(merged_df, pivot_inspection_items(data)[0], check_column_type=False)
+
+def test_merged_chunks_are_not_fragmented():
+    # one report and one question of its own per chunk, as the chunks of the reports of many templates
+    chunks = [pd.DataFrame({AUDIT_ID_COLUMN: pd.Series([f'audit_{number:03d}'], dtype='str'), TEMPLATE_ID_COLUMN: ['template'],
+                            f'Question {number:03d}': ['yes'], 'Shared question': [str(number)]}, dtype=object).astype({AUDIT_ID_COLUMN: 'str'})
+              for number in range(150, 0, -1)]
+    merged_df = merge_pivoted_chunks(chunks)
+    assert list(merged_df.columns) == ([AUDIT_ID_COLUMN, TEMPLATE_ID_COLUMN] + [f'Question {number:03d}' for number in range(1, 151)]
+                                       + ['Shared question'])
+    assert list(merged_df[AUDIT_ID_COLUMN]) == [f'audit_{number:03d}' for number in range(1, 151)]
+    assert list(merged_df['Shared question']) == [str(number) for number in range(1, 151)]
+    assert merged_df['Question 007'].notna().sum() == 1 and merged_df.loc[6, 'Question 007'] == 'yes'
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', pd.errors.PerformanceWarning)
+        merged_df[SERVICE_DATE_FORMATTED_COLUMN] = '2024-01-01'  # a column added as split_main_table does
+
+def test_parallel_csv_equals_serial_csv(sample):
+    serial = run(sample / 'inspection_items.csv', sample / 'serial', '--workers', '1')
+    parallel = run(sample / 'inspection_items.csv', sample / 'parallel', '--workers', '3')
+    assert_same_outputs(parallel, serial)
+
+def test_db_equals_csv_exported_from_it(exported_sample):
+    db_file, csv_file = exported_sample
+    from_csv = run(csv_file, db_file.parent / 'csv', '--workers', '1')
+    assert_same_outputs(run(db_file, db_file.parent / 'db', '--workers', '1'), from_csv)
+    assert_same_outputs(run(db_file, db_file.parent / 'db_chunks', '--workers', '3', '--chunk-size', '40'), from_csv)
+
+def test_template_cache_is_opt_in_and_equals_no_cache(sample, monkeypatch):
+    monkeypatch.setenv('HOME', str(sample / 'home'))
+    expected = run(sample / 'inspection_items.csv', sample / 'no_cache')
+    assert not (sample / 'home').exists()
+
+    cache_file = sample / 'template_cache.db'
+    for workers in ['1', '3', '1']:  # the first run fills the cache, the next ones resolve the labels from it
+        assert_same_outputs(run(sample / 'inspection_items.csv', sample / f'cache_{len(list(sample.iterdir()))}', '--workers', workers,
+                                '--template-cache', str(cache_file)), expected)
+    assert cache_file.exists()
+
+def test_template_cache_that_cant_be_opened_is_reported_on_screen(sample, capfd):
+    cache_file = sample / 'template_cache_directory'
+    cache_file.mkdir()  # a directory can't be opened as a sqlite file
+    expected = run(sample / 'inspection_items.csv', sample / 'no_cache')
+    assert_same_outputs(run(sample / 'inspection_items.csv', sample / 'cache', '--template-cache', str(cache_file)), expected)
+    assert f"Template cache {cache_file} can't be opened" in get_printed_text()
+    assert capfd.readouterr().out == '1 of 1 files processed.\n' * 2  # the message goes to the screen of the GUI, not stdout with --quiet
+
+    assert main([str(sample / 'inspection_items.csv'), '--output-dir', str(sample / 'deprecated'), '--no-result-cache', '--no-template-cache']) == 0
+    assert '--no-template-cache is deprecated' in capfd.readouterr().out
+
+@pytest.mark.parametrize('input_file, options', [('inspection_items.csv', ['--workers', '1']), ('inspection_items.csv', ['--workers', '3']),
+                                                 ('sqlite.db', ['--workers', '3', '--chunk-size', '40']), ('sqlite.db', ['--by-template'])])
+def test_quiet_run_prints_only_the_summary(sample, capfd, input_file, options):
+    run(sample / input_file, sample / 'quiet', *options, '--template-cache', str(sample / 'template_cache.db'))
+    out, err = capfd.readouterr()
+    assert out == '1 of 1 files processed.\n'
+    assert err == ''
+
+def database_contents(database_file):
+    # Rows of the tables of an output database that a full run and the incremental updates must have the same, in the
+    # same order: the main table without its empty columns, the tables in audit_id order and the answers by label
+    conn = sqlite3.connect(database_file)
+    try:
+        main_df = pd.read_sql_query(f'SELECT * FROM {MAIN_TABLE}', conn).dropna(axis=1, how='all')
+        contents = {MAIN_TABLE: main_df[sorted(main_df.columns)].sort_values(AUDIT_ID_COLUMN).to_dict('records')}
+        for table_name in [REPLACED_PARTS_TABLE, DEVICES_TABLE, REPORT_TEMPLATES_TABLE]:
+            contents[table_name] = sorted(map(repr, pd.read_sql_query(f'SELECT * FROM {table_name}', conn).to_dict('records')))
+        contents[ANSWERS_TABLE] = sorted(conn.execute(f'SELECT a."{AUDIT_ID_COLUMN}", q.combined_label, a.response FROM {ANSWERS_TABLE} a '
+                                                      f'JOIN {QUESTIONS_TABLE} q ON q.question_id = a.question_id').fetchall())
+        for table_name in [KPI_SUMMARY_TABLE, KPI_COLUMNS_TABLE, KPI_VALUES_TABLE, KPI_MONTHS_TABLE]:
+            contents[table_name] = conn.execute(f'SELECT * FROM {table_name}').fetchall()
+    finally:
+        conn.close()
+    return contents
+
+def test_incremental_updates_equal_full_run(sample):
+    from iauditor_report.incremental import find_changed_inspections
+
+    db_file = sample / 'sqlite.db'
+    conn = sqlite3.connect(db_file)
+    try:
+        audit_ids = [row[0] for row in conn.execute(f'SELECT "{AUDIT_ID_COLUMN}" FROM {INSPECTIONS_TABLE} ORDER BY rowid')]
+        added_audit_id, removed_audit_id, changed_audit_id, undated_audit_id = audit_ids[:4]
+        conn.execute(f"ATTACH DATABASE '{SAMPLE_DIRECTORY / 'sqlite.db'}' AS original")
+        with conn:  # first version of the db file: without a report, and a report without modified_at
+            for table_name in [INSPECTIONS_TABLE, INSPECTION_ITEMS_TABLE]:
+                conn.execute(f'DELETE FROM {table_name} WHERE "{AUDIT_ID_COLUMN}" = ?', (added_audit_id,))
+            conn.execute(f'UPDATE {INSPECTIONS_TABLE} SET "{MODIFIED_AT_COLUMN}" = NULL WHERE "{AUDIT_ID_COLUMN}" = ?', (undated_audit_id,))
+        incremental = run(db_file, sample / 'incremental', '--mode', 'incremental')
+        database_file = next(incremental.glob('*_database.db'))
+
+        with conn:  # next version: a new report, a report deleted and an answer modified
+            for table_name in [INSPECTIONS_TABLE, INSPECTION_ITEMS_TABLE]:
+                conn.execute(f'INSERT INTO {table_name} SELECT * FROM original.{table_name} WHERE "{AUDIT_ID_COLUMN}" = ?', (added_audit_id,))
+                conn.execute(f'DELETE FROM {table_name} WHERE "{AUDIT_ID_COLUMN}" = ?', (removed_audit_id,))
+            conn.execute(f"UPDATE {INSPECTION_ITEMS_TABLE} SET response = 'modified answer' WHERE rowid = (SELECT MIN(rowid) FROM "
+                         f"{INSPECTION_ITEMS_TABLE} WHERE \"{AUDIT_ID_COLUMN}\" = ? AND type = 'text' AND response <> '')", (changed_audit_id,))
+            conn.execute(f"UPDATE {INSPECTIONS_TABLE} SET \"{MODIFIED_AT_COLUMN}\" = '2030-01-01 00:00:00+00:00' "
+                         f"WHERE \"{AUDIT_ID_COLUMN}\" = ?", (changed_audit_id,))
+    finally:
+        conn.close()
+    assert run(db_file, sample / 'incremental', '--mode', 'incremental') == incremental
+
+    changed_df, removed_audit_ids = find_changed_inspections(db_file, database_file)
+    assert changed_df.empty and removed_audit_ids.empty  # the report without modified_at is not processed again
+    full_database_file = next(run(db_file, sample / 'full').glob('*_database.db'))
+    assert database_contents(database_file) == database_contents(full_database_file)
+
+def test_older_export_without_optional_columns(exported_sample):
+    db_file, csv_file = exported_sample
+    conn = sqlite3.connect(db_file)
+    try:
+        for index_name, in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL").fetchall():
+            conn.execute(f'DROP INDEX "{index_name}"')
+        for column in OPTIONAL_PIPELINE_COLUMNS:
+            conn.execute(f'ALTER TABLE {INSPECTION_ITEMS_TABLE} DROP COLUMN "{column}"')
+        conn.commit()
+    finally:
+        conn.close()
+    pd.read_csv(csv_file, dtype=str, keep_default_na=False).drop(columns=OPTIONAL_PIPELINE_COLUMNS).to_csv(csv_file, index=False)
+
+    records = read_inspection_items_csv(csv_file)
+    assert list(records.columns) == PIPELINE_COLUMNS and records[OPTIONAL_PIPELINE_COLUMNS].isna().all().all()
+    from_csv = run(csv_file, db_file.parent / 'csv', '--workers', '1')
+    assert_same_outputs(run(db_file, db_file.parent / 'db', '--workers', '3', '--chunk-size', '40'), from_csv)
+    run(db_file, db_file.parent / 'by_template', '--by-template', '--template-cache', str(db_file.parent / 'template_cache.db'))
+
+    pd.read_csv(csv_file, dtype=str).drop(columns=[PARENT_IDS_COLUMN]).to_csv(csv_file, index=False)
+    with pytest.raises(ValueError, match=PARENT_IDS_COLUMN):
+        read_inspection_items_csv(csv_file)
+    # the csv entry point (called by the GUI) reports the error like the db one instead of raising it
+    clear_printed_text()
+    assert not create_iAuditor_report_from_csv(csv_file, str(db_file.parent / 'missing_column'), str(db_file.parent), '')
+    assert 'OPERATION INTERRUPTED' in get_printed_text() and PARENT_IDS_COLUMN in get_printed_text()
+
+def test_result_cache_hit_equals_miss(sample):
+    result_cache = sample / 'results'
+    expected = run(sample / 'inspection_items.csv', sample / 'no_cache')
+    assert_same_outputs(run(sample / 'inspection_items.csv', sample / 'miss', result_cache=result_cache), expected)
+    assert len(list(result_cache.iterdir())) == 1
+    assert_same_outputs(run(sample / 'inspection_items.csv', sample / 'hit', result_cache=result_cache), expected)
+
+def test_db_file_is_not_modified(sample):
+    db_file = sample / 'sqlite.db'
+    content = db_file.read_bytes()
+    full = run(db_file, sample / 'full', '--workers', '3', '--chunk-size', '40')
+    run(db_file, sample / 'by_template', '--by-template')
+    run(db_file, sample / 'incremental', '--mode', 'incremental')
+    assert db_file.read_bytes() == content
+
+    db_file.chmod(0o444)  # a db file that can't be written is processed the same
+    try:
+        assert_same_outputs(run(db_file, sample / 'read_only'), full)
+    finally:
+        db_file.chmod(0o644)
+
+def test_indexed_db_file_equals_not_indexed(sample):
+    db_file = sample / 'sqlite.db'
+    expected = run(db_file, sample / 'not_indexed', '--chunk-size', '40')
+    indexed = run(db_file, sample / 'indexed', '--chunk-size', '40', '--index-db-file')
+    conn = sqlite3.connect(db_file)
+    try:
+        assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (INSPECTION_ITEMS_AUDIT_INDEX,)).fetchone()
+    finally:
+        conn.close()
+    assert_same_outputs(indexed, expected)
@@ -0,0 +1,34 @@
+# Checks of the MS Excel summary writer (see iauditor_report.excel).
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+from iauditor_report.constants import *
+from iauditor_report.excel import sheet_parts
+
+
+def test_package_is_imported_without_the_excel_writer():
+    # xlsxwriter is only imported when a summary file is written (the GUI imports the package in the background)
+    code = "import sys, iauditor_report.report, iauditor_report.incremental; assert 'xlsxwriter' not in sys.modules"
+    subprocess.run([sys.executable, '-c', code], cwd=Path(__file__).resolve().parent.parent, check=True)
+
+def test_large_sheet_is_split_into_parts_that_start_with_audit_id():
+    data_frame = pd.DataFrame({AUDIT_ID_COLUMN: [f'audit_{row}' for row in range(5)], **dict((f'Question {column}', range(5)) for column in range(4))})
+    parts = sheet_parts('Main', data_frame, max_rows=3, max_columns=3)  # 2 rows (and the header) and 3 columns per sheet
+
+    assert [part[0] for part in parts] == ['Main'] + [f'Main ({number})' for number in range(2, 7)]
+    assert [(first_row, last_row) for _, first_row, last_row, _ in parts] == [(0, 2), (0, 2), (2, 4), (2, 4), (4, 5), (4, 5)]
+    assert [columns for *_, columns in parts] == [[0, 1, 2], [0, 3, 4]] * 3
+    # the parts of the same rows are joined back on AUDIT_ID_COLUMN
+    row_parts = {}
+    for _, first_row, last_row, columns in parts:
+        row_parts.setdefault(first_row, []).append(data_frame.iloc[first_row:last_row, columns].set_index(AUDIT_ID_COLUMN))
+    joined = pd.concat([pd.concat(column_parts, axis=1) for column_parts in row_parts.values()])
+    pd.testing.assert_frame_equal(joined.reset_index(), data_frame)
+
+def test_sheet_that_fits_is_not_split():
+    data_frame = pd.DataFrame({AUDIT_ID_COLUMN: ['a', 'b'], 'Question': [1, 2]})
+    assert sheet_parts('Main', data_frame, max_rows=3, max_columns=2) == [('Main', 0, 2, [0, 1])]
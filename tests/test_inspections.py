@@ -0,0 +1,21 @@
+# Checks of the inspection metadata (see iauditor_report.inspections).
+
+import pandas as pd
+
+from iauditor_report.constants import *
+from iauditor_report.inspections import typed_inspections
+
+
+def test_repeated_audit_id_keeps_the_latest_modified_at():
+    raw_inspections = pd.DataFrame({AUDIT_ID_COLUMN: ['a', 'a', 'b', 'a', 'c', 'c'],
+                                    'score': ['1', '2', '3', '4', '5', '6'],
+                                    MODIFIED_AT_COLUMN: ['2024-01-03T00:00:00Z', '2024-01-05T00:00:00Z', '2024-01-01T00:00:00Z', None,
+                                                         '2024-01-01T00:00:00Z', '2024-01-01T00:00:00Z']})
+    inspections = typed_inspections(raw_inspections)
+    assert inspections['score'].to_dict() == {'a': 2.0, 'b': 3.0, 'c': 6.0}  # a row without date is the oldest, the last of the same date wins
+    assert MODIFIED_AT_COLUMN not in inspections.columns
+
+def test_numbers_have_the_same_type_from_csv_and_db_files():
+    from_csv = typed_inspections(pd.DataFrame({AUDIT_ID_COLUMN: ['a'], 'score': ['2'], 'duration': ['188']}))
+    from_db = typed_inspections(pd.DataFrame({AUDIT_ID_COLUMN: ['a'], 'score': [2.0], 'duration': [188]}))
+    pd.testing.assert_frame_equal(from_csv, from_db)
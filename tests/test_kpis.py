@@ -0,0 +1,69 @@
+# Checks of the KPIs (see iauditor_report.kpis) against the values the column overview of the report used to print,
+# computed here the same way on the main table of the sample export (inspection_items.csv in the root of the repository).
+
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+import iauditor_report.report as report
+from iauditor_report.cli import main
+from iauditor_report.constants import *
+from iauditor_report.dates import parse_dates
+from iauditor_report.kpis import compute_kpis
+
+
+SAMPLE_DIRECTORY = Path(__file__).resolve().parent.parent
+# The questions of the sample form don't have the '*' of the KPI_COLUMNS
+SAMPLE_KPI_COLUMNS = {'General Information - Inverter Serial Number': INVERTER_SN_COLUMN, 'General Information - Inverter Model': INVERTER_MODEL_COLUMN,
+                      'General Information - Technician Name': TECH_NAME_COLUMN, 'Site Information - Site Name': SITE_NAME_COLUMN,
+                      'General Information - Service Date (YYYY-MM-DD)': SERVICE_DATE_COLUMN}
+
+
+@pytest.fixture
+def sample_main_table(tmp_path, monkeypatch):
+    # Main table of the report of the sample csv file, with the KPI_COLUMNS and a blank and two numbered site names
+    for file_name in ['inspection_items.csv', 'inspections.csv']:
+        shutil.copy(SAMPLE_DIRECTORY / file_name, tmp_path / file_name)
+    main_tables = []
+    build_report_results = report.build_report_results
+    def keep_main_table(sorted_df):
+        main_tables.append(sorted_df)
+        return build_report_results(sorted_df)
+    monkeypatch.setattr(report, 'build_report_results', keep_main_table)
+    assert main([str(tmp_path / 'inspection_items.csv'), '--output-dir', str(tmp_path / 'output'), '--no-result-cache', '--quiet']) == 0
+
+    main_df = main_tables[0].rename(columns=SAMPLE_KPI_COLUMNS)
+    main_df[SERVICE_DATE_COLUMN] = parse_dates(main_df[SERVICE_DATE_COLUMN])[0]
+    main_df.loc[main_df.index[:3], SITE_NAME_COLUMN] = ['12 Site C', '', '7 site C']
+    return main_df
+
+def column_overview(column_name, data_frame):
+    # Blank entries and records per value, as the column overview computed them
+    blank_count = data_frame[column_name].isnull().sum() + (data_frame[column_name] == '').sum()
+    return int(blank_count), dict(data_frame[column_name].value_counts())
+
+
+def test_kpis_equal_column_overview(sample_main_table):
+    main_df = sample_main_table
+    kpis = compute_kpis(main_df)
+
+    assert kpis['records'] == main_df.shape[0]
+    assert kpis['missing_columns'] == [INVERTER_TECHNOLOGY_COLUMN, CASE_TYPE_COLUMN]
+    assert [column['column'] for column in kpis['columns']] == [column for column in KPI_COLUMNS if column in main_df.columns]
+    for column in kpis['columns']:
+        blank_count, value_counts = column_overview(column['column'], main_df)
+        assert column['blank'] == blank_count
+        assert column['blank_percent'] == pytest.approx((blank_count / main_df.shape[0]) * 100)
+        assert dict(column['values']) == value_counts
+        assert [count for value, count in column['values']] == sorted(value_counts.values(), reverse=True)
+
+    site_names = main_df.dropna(subset=[SITE_NAME_COLUMN])
+    non_numeric_count = site_names[site_names[SITE_NAME_COLUMN].str.split().str[0].str.isnumeric() == False].shape[0]
+    assert kpis['site_numbers']['without_site_number'] == non_numeric_count == main_df.shape[0] - 3
+    assert kpis['site_numbers']['with_site_number'] == 2
+
+    assert kpis['months']['missing'] == main_df[SERVICE_DATE_COLUMN].isna().sum()
+    count_by_year_month = main_df.groupby(main_df[SERVICE_DATE_COLUMN].dt.tz_localize(None).dt.to_period('M')).size()
+    assert kpis['months']['months'] == [(str(month), count) for month, count in count_by_year_month.items()]
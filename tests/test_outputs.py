@@ -0,0 +1,47 @@
+# Checks of the output stage (see iauditor_report.outputs): an output file that can't be written is reported
+# and the other files are still written.
+
+import shutil
+from pathlib import Path
+
+import pytest
+
+import iauditor_report.report as report
+from iauditor_report.cli import main
+from iauditor_report.outputs import write_artifact, write_output_files
+from iauditor_report.progress import clear_printed_text, get_printed_text
+
+
+SAMPLE_DIRECTORY = Path(__file__).resolve().parent.parent
+
+
+def write_file(path):
+    return lambda: path.write_text(path.name)
+
+def fail():
+    raise OSError('disk full')
+
+
+def test_write_artifact_returns_the_exception():
+    seconds, error = write_artifact('csv', 1, fail)
+    assert seconds >= 0 and isinstance(error, OSError)
+    assert write_artifact('csv', 1, lambda: None)[1] is None
+
+@pytest.mark.parametrize('writers', [1, 3])
+def test_file_that_fails_does_not_stop_the_others(tmp_path, writers):
+    tasks = [('first file', 'csv', 1, write_file(tmp_path / 'first.csv')), ('failed file', 'excel', 1, fail),
+             ('last file', 'kpis', 1, write_file(tmp_path / 'last.json'))]
+    clear_printed_text()
+    assert write_output_files(tasks, writers) is False
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['first.csv', 'last.json']
+    assert "failed file: " in get_printed_text() and "FAILED (OSError: disk full)" in get_printed_text()
+    assert write_output_files(tasks[:1] + tasks[2:], writers) is True
+
+def test_report_without_excel_summary_has_the_other_files(tmp_path, monkeypatch):
+    for file_name in ['inspection_items.csv', 'inspections.csv']:
+        shutil.copy(SAMPLE_DIRECTORY / file_name, tmp_path / file_name)
+    monkeypatch.setattr(report, 'write_summary_workbook', lambda *args: fail())
+    assert main([str(tmp_path / 'inspection_items.csv'), '--output-dir', str(tmp_path / 'output'), '--no-result-cache', '--quiet']) == 1
+    output_directory, = (tmp_path / 'output').iterdir()
+    suffixes = sorted(path.name.rsplit('Report', 1)[1] for path in output_directory.iterdir())
+    assert suffixes == ['.csv', '_PartsReplaced.csv', '_combined_label.csv', '_database.db', '_devices.csv', '_kpis.json', '_run_report.json']
@@ -0,0 +1,40 @@
+# Checks of the result cache (see iauditor_report.result_cache).
+
+import pandas as pd
+import pytest
+
+from iauditor_report.result_cache import ResultEntry, get_result_cache_directory, open_result_entry, set_result_cache
+
+
+@pytest.fixture
+def result_cache(tmp_path):
+    # Result cache in tmp_path, turned off again after the test
+    previous_directory = get_result_cache_directory()
+    cache_directory = tmp_path / 'results'
+    yield cache_directory
+    set_result_cache(previous_directory)
+
+def test_entry_larger_than_the_cache_is_not_written(tmp_path, result_cache):
+    set_result_cache(str(result_cache), 1)
+    entry = ResultEntry(result_cache, 'key')
+    entry.add(main=pd.DataFrame({'answer': ['x' * 1000] * 2000}))  # about 2 MB
+    entry.save({})
+    assert not result_cache.exists() or list(result_cache.iterdir()) == []
+
+    (tmp_path / 'large_file').write_bytes(b'x' * (2 * 1024 * 1024))
+    entry = ResultEntry(result_cache, 'key')
+    entry.save({'combined_label.csv': tmp_path / 'large_file'})
+    assert not result_cache.exists() or list(result_cache.iterdir()) == []
+
+    entry.results = {'main': pd.DataFrame({'answer': ['x']})}
+    entry.save({})
+    assert ResultEntry(result_cache, 'key').load()
+
+def test_directory_other_users_can_write_is_not_used(tmp_path, result_cache):
+    input_file = tmp_path / 'inspection_items.csv'
+    input_file.write_text('audit_id\n')
+    result_cache.mkdir()
+    set_result_cache(str(result_cache))
+    assert open_result_entry(input_file) is not None
+    result_cache.chmod(0o777)
+    assert open_result_entry(input_file) is None
@@ -0,0 +1,44 @@
+# Checks of the removal of the duplicates and stale versions of the records (see iauditor_report.wrangling).
+
+import pandas as pd
+
+from iauditor_report.constants import *
+from iauditor_report.wrangling import deduplicate_inspection_items, wrangle_inspection_items
+
+
+def inspection_items(rows):
+    # Records of the inspection_items table (PIPELINE_COLUMNS) from rows of (audit_id, item_id, item_index, label, response, modified_at)
+    records = pd.DataFrame(rows, columns=[AUDIT_ID_COLUMN, ITEM_ID_COLUMN, ITEM_INDEX_COLUMN, QUESTION_COLUMN, ANSWER_COLUMN, MODIFIED_AT_COLUMN],
+                           dtype=object)
+    records[TEMPLATE_ID_COLUMN] = 't'
+    records[TYPE_COLUMN] = 'text'
+    records[QUESTION_CATEGORY_COLUMN] = 'General Information'
+    records[PARENT_IDS_COLUMN] = None
+    return records[PIPELINE_COLUMNS]
+
+RECORDS = [
+    ('a', 'i1', '1', 'Question', 'first', '2024-01-01T08:00:00.000Z'),   # stale
+    ('a', 'i1', '1', 'Question', 'latest', '2024-03-01T08:00:00.000Z'),
+    ('a', 'i1', '1', 'Question', 'second', '2024-02-01 08:00:00'),       # stale, the other layout of modified_at
+    ('a', 'i2', '2', 'Other question', 'same', '2024-01-01T08:00:00.000Z'),
+    ('a', 'i2', '2', 'Other question', 'same', '2024-01-01T08:00:00.000Z'),   # duplicate of the same version
+    ('b', 'i1', '1', 'Question', 'other report', '2024-01-01T08:00:00.000Z'),  # same item_id in another report
+    ('b', None, '2', 'No id', 'copy', None),
+    ('b', None, '2', 'No id', 'copy', None),  # exact copy of the record above
+    ('b', None, '3', 'No id', 'not a copy', None),
+]
+
+
+def test_latest_version_of_every_item_is_kept():
+    data, duplicates, stale_versions = deduplicate_inspection_items(inspection_items(RECORDS))
+    assert (duplicates, stale_versions) == (2, 2)
+    assert MODIFIED_AT_COLUMN not in data.columns
+    assert data[[AUDIT_ID_COLUMN, ITEM_ID_COLUMN, ANSWER_COLUMN]].values.tolist() == [
+        ['a', 'i1', 'latest'], ['a', 'i2', 'same'], ['b', 'i1', 'other report'], ['b', None, 'copy'], ['b', None, 'not a copy']]
+
+def test_removed_records_are_reported():
+    data, removed_records = wrangle_inspection_items(inspection_items(RECORDS))
+    removed_records = dict(removed_records)
+    assert removed_records["Duplicate records"] == 2
+    assert removed_records["Stale versions of records (older modified_at)"] == 2
+    assert data.shape[0] == len(RECORDS) - 4